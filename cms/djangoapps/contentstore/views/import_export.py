@@ -34,6 +34,7 @@ from extract_tar import safetar_extractall
 from student import auth
 from student.roles import CourseInstructorRole, CourseStaffRole, GlobalStaff
 from util.json_request import JsonResponse
+from django_comment_common.utils import invalidate_discussion_info
 
 from contentstore.utils import reverse_course_url, reverse_usage_url
 
@@ -227,6 +228,7 @@ def import_handler(request, course_key_string):
                     )
 
                     new_location = course_items[0].location
+                    invalidate_discussion_info(course_key)
                     logging.debug('new course at {0}'.format(new_location))
 
                     session_status[key] = 3
@@ -26,6 +26,7 @@ from xmodule.modulestore.inheritance import own_metadata
 from xmodule.video_module import manage_video_subtitles_save
 
 from util.json_request import expect_json, JsonResponse
+from django_comment_common.utils import invalidate_discussion_info
 from util.string_utils import str_to_bool
 
 from ..utils import get_modulestore
@@ -124,9 +125,9 @@ def xblock_handler(request, usage_key_string):
             delete_children = str_to_bool(request.REQUEST.get('recurse', 'False'))
             delete_all_versions = str_to_bool(request.REQUEST.get('all_versions', 'False'))
 
-            return _delete_item_at_location(usage_key, delete_children, delete_all_versions, request.user)
+            response = _delete_item_at_location(usage_key, delete_children, delete_all_versions, request.user)
         else:  # Since we have a usage_key, we are updating an existing xblock.
-            return _save_item(
+            response = _save_item(
                 request,
                 usage_key,
                 data=request.json.get('data'),
@@ -136,6 +137,9 @@ def xblock_handler(request, usage_key_string):
                 grader_type=request.json.get('graderType'),
                 publish=request.json.get('publish'),
             )
+        # the LMS's forum pages list the course's discussion modules
+        invalidate_discussion_info(usage_key.course_key)
+        return response
     elif request.method in ('PUT', 'POST'):
         if 'duplicate_source_locator' in request.json:
             parent_usage_key = UsageKey.from_string(request.json['parent_locator'])
@@ -147,6 +151,7 @@ def xblock_handler(request, usage_key_string):
                 request.json.get('display_name'),
                 request.user,
             )
+            invalidate_discussion_info(dest_usage_key.course_key)
 
             return JsonResponse({"locator": unicode(dest_usage_key)})
         else:
@@ -433,6 +438,7 @@ def _create_item(request):
     if not 'detached' in parent.runtime.load_block_type(category)._class_tags:
         parent.children.append(dest_usage_key)
         get_modulestore(parent.location).update_item(parent, request.user.id)
+    invalidate_discussion_info(dest_usage_key.course_key)
 
     return JsonResponse({"locator": unicode(dest_usage_key), "courseKey": unicode(dest_usage_key.course_key)})
 
@@ -0,0 +1,119 @@
+"""
+A local disk cache for large static content, which is too big for memcached.
+
+Files are named by the md5 digest of their content, so a file can never be
+stale: changed content gets a new name. Nothing is ever evicted; point the
+cache at a directory which is cleaned up by other means (e.g. tmpreaper).
+"""
+import logging
+import os
+import tempfile
+
+log = logging.getLogger(__name__)
+
+# Content smaller than this is cached in memcached instead.
+DEFAULT_MIN_SIZE = 1048576
+
+# How much of a file to read at once when streaming it out.
+CHUNK_SIZE = 65536
+
+
+class DiskCache(object):
+    """
+    Keeps copies of static content in `directory`, for content of at least
+    `min_size` bytes.
+    """
+    def __init__(self, directory, min_size=DEFAULT_MIN_SIZE):
+        self.directory = directory
+        self.min_size = min_size
+
+    def _path(self, digest):
+        """
+        The path of the file holding the content with md5 `digest`.
+        """
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def should_cache(self, content):
+        """
+        Return whether `content` belongs in this cache.
+        """
+        return (
+            getattr(content, 'content_digest', None) is not None and
+            content.length is not None and
+            content.length >= self.min_size
+        )
+
+    def stream(self, content, first_byte=0, last_byte=None):
+        """
+        Return an iterator over the cached copy of `content` from `first_byte`
+        to `last_byte` (inclusive, defaulting to the end), or None if there
+        isn't a copy.
+        """
+        if not self.should_cache(content):
+            return None
+        try:
+            cached_file = open(self._path(content.content_digest), 'rb')
+        except IOError:
+            return None
+        if last_byte is None:
+            last_byte = content.length - 1
+        return self._read(cached_file, first_byte, last_byte)
+
+    def _read(self, cached_file, first_byte, last_byte):
+        """
+        Yield the bytes from `first_byte` to `last_byte` of `cached_file`,
+        closing it when done.
+        """
+        try:
+            cached_file.seek(first_byte)
+            remaining = last_byte - first_byte + 1
+            while remaining > 0:
+                chunk = cached_file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            cached_file.close()
+
+    def fill(self, content, chunks):
+        """
+        Yield `chunks`, the whole of `content`'s data, saving them to the
+        cache along the way. The copy is only kept if all of the data goes
+        through (e.g. the client doesn't hang up first).
+        """
+        path = self._path(content.content_digest)
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            temp_file = tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False)
+        except (IOError, OSError):
+            log.exception("Couldn't cache %s on disk", content.location)
+            for chunk in chunks:
+                yield chunk
+            return
+
+        written = 0
+        caching = True
+        try:
+            for chunk in chunks:
+                if caching:
+                    try:
+                        temp_file.write(chunk)
+                    except IOError:
+                        # e.g. the disk is full; the client still gets the data
+                        log.exception("Couldn't cache %s on disk", content.location)
+                        caching = False
+                written += len(chunk)
+                yield chunk
+            if caching and written == content.length:
+                temp_file.close()
+                # Renaming is atomic, so readers see all of the file or none of it
+                os.rename(temp_file.name, path)
+        finally:
+            try:
+                temp_file.close()
+            except IOError:
+                pass
+            if os.path.exists(temp_file.name):
+                os.remove(temp_file.name)
@@ -1,9 +1,13 @@
+import re
+
+from django.conf import settings
 from django.http import (HttpResponse, HttpResponseNotModified,
     HttpResponseForbidden)
 from student.models import CourseEnrollment
 
+from contentserver.disk_cache import DiskCache
 from xmodule.contentstore.django import contentstore
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError, InvalidKeyError
 from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.exceptions import NotFoundError
@@ -11,7 +15,61 @@ from xmodule.exceptions import NotFoundError
 # TODO: Soon as we have a reasonable way to serialize/deserialize AssetKeys, we need
 # to change this file so instead of using course_id_partial, we're just using asset keys
 
+# a single range of bytes, e.g. "bytes=0-499", "bytes=500-" or "bytes=-500"
+BYTE_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    """
+    Raised when a requested byte range lies entirely outside of the content.
+    """
+    pass
+
+
+def parse_byte_range(header, length):
+    """
+    Return the (first, last) bytes, inclusive, of the range requested by a
+    Range `header` for content of `length` bytes, or None if the whole content
+    should be returned (e.g. the header is malformed, or asks for several
+    ranges, which we don't support).
+
+    Raises RangeNotSatisfiable if the range is outside of the content.
+    """
+    match = BYTE_RANGE_RE.match(header.strip().replace(' ', ''))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first == '' and last == '':
+        return None
+    if first == '':
+        # the last `last` bytes
+        suffix_length = int(last)
+        if suffix_length == 0 or length == 0:
+            raise RangeNotSatisfiable()
+        return max(length - suffix_length, 0), length - 1
+    first = int(first)
+    last = length - 1 if last == '' else min(int(last), length - 1)
+    if first > last:
+        if first >= length:
+            raise RangeNotSatisfiable()
+        return None
+    return first, last
+
+
+def etag_matches(header, etag):
+    """
+    Return whether an If-None-Match `header` matches `etag`.
+    """
+    if header.strip() == '*':
+        return True
+    return etag in [tag.strip() for tag in header.split(',')]
+
+
 class StaticContentServer(object):
+    def __init__(self):
+        disk_cache_settings = getattr(settings, 'STATIC_CONTENT_DISK_CACHE', None)
+        self.disk_cache = DiskCache(**disk_cache_settings) if disk_cache_settings else None
+
     def process_request(self, request):
         # look to see if the request is prefixed with 'c4x' tag
         if request.path.startswith('/' + XASSET_LOCATION_TAG + '/'):
@@ -58,14 +116,67 @@ class StaticContentServer(object):
             # timestamp, so we can simply compare the strings
             last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
 
+            # the md5 of the content makes a strong ETag (cached content may predate digests)
+            content_digest = getattr(content, 'content_digest', None)
+            etag = '"{}"'.format(content_digest) if content_digest else None
+
             # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            # ETags or timestamps, if they are the same then just return a 304 (Not Modified)
+            if etag and 'HTTP_IF_NONE_MATCH' in request.META:
+                if etag_matches(request.META['HTTP_IF_NONE_MATCH'], etag):
+                    return HttpResponseNotModified()
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
                 if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
                 if if_modified_since == last_modified_at_str:
                     return HttpResponseNotModified()
 
-            response = HttpResponse(content.stream_data(), content_type=content.content_type)
+            # work out which bytes of the content the client wants, if not all of them
+            byte_range = None
+            if 'HTTP_RANGE' in request.META and content.length is not None:
+                # If-Range makes the range conditional on the client's copy being current
+                if_range = request.META.get('HTTP_IF_RANGE')
+                if if_range is None or if_range in (etag, last_modified_at_str):
+                    try:
+                        byte_range = parse_byte_range(request.META['HTTP_RANGE'], content.length)
+                    except RangeNotSatisfiable:
+                        response = HttpResponse()
+                        response.status_code = 416
+                        response['Content-Range'] = 'bytes */{}'.format(content.length)
+                        return response
+
+            if byte_range is not None:
+                first_byte, last_byte = byte_range
+                response = HttpResponse(
+                    self.stream_data(content, first_byte, last_byte), content_type=content.content_type
+                )
+                response.status_code = 206
+                response['Content-Range'] = 'bytes {}-{}/{}'.format(first_byte, last_byte, content.length)
+                response['Content-Length'] = str(last_byte - first_byte + 1)
+            else:
+                response = HttpResponse(self.stream_data(content), content_type=content.content_type)
+                if content.length is not None:
+                    response['Content-Length'] = str(content.length)
+
             response['Last-Modified'] = last_modified_at_str
+            response['Accept-Ranges'] = 'bytes'
+            if etag:
+                response['ETag'] = etag
 
             return response
+
+    def stream_data(self, content, first_byte=None, last_byte=None):
+        """
+        Return an iterator over the content's data, or the part of it from
+        `first_byte` to `last_byte` inclusive, streamed from the local disk
+        cache if it has a copy, or else straight from the content store.
+        """
+        if self.disk_cache is not None and isinstance(content, StaticContentStream):
+            cached = self.disk_cache.stream(content, first_byte or 0, last_byte)
+            if cached is not None:
+                return cached
+            if first_byte is None and self.disk_cache.should_cache(content):
+                return self.disk_cache.fill(content, content.stream_data())
+
+        if first_byte is None:
+            return content.stream_data()
+        return content.stream_data_in_range(first_byte, last_byte)
@@ -3,12 +3,15 @@ Tests for StaticContentServer
 """
 import copy
 import logging
+import shutil
+import tempfile
 from uuid import uuid4
 from path import path
 from pymongo import MongoClient
 
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.test import TestCase
 from django.test.client import Client
 from django.test.utils import override_settings
 
@@ -22,6 +25,9 @@ from xmodule.modulestore.tests.django_utils import (studio_store_config,
     ModuleStoreTestCase)
 from xmodule.modulestore.xml_importer import import_from_xml
 
+from contentserver.disk_cache import DiskCache
+from contentserver.middleware import parse_byte_range, RangeNotSatisfiable
+
 log = logging.getLogger(__name__)
 
 TEST_DATA_CONTENTSTORE = copy.deepcopy(settings.CONTENTSTORE)
@@ -131,3 +137,109 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200) # pylint: disable=E1103
 
+    def test_range_request(self):
+        """
+        Test that a byte range of an asset is served as partial content.
+        """
+        expected = self.contentstore.find(self.unlocked_asset).data[:100]
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-99')
+        self.assertEqual(resp.status_code, 206)  # pylint: disable=E1103
+        self.assertEqual(resp['Content-Range'], 'bytes 0-99/{}'.format(self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], '100')
+        self.assertEqual(resp.content, expected)  # pylint: disable=E1103
+
+    def test_range_request_suffix(self):
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=-10')
+        self.assertEqual(resp.status_code, 206)  # pylint: disable=E1103
+        self.assertEqual(
+            resp['Content-Range'],
+            'bytes {}-{}/{}'.format(self.length_unlocked - 10, self.length_unlocked - 1, self.length_unlocked)
+        )
+        self.assertEqual(len(resp.content), 10)  # pylint: disable=E1103
+
+    def test_range_request_not_satisfiable(self):
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={}-'.format(self.length_unlocked))
+        self.assertEqual(resp.status_code, 416)  # pylint: disable=E1103
+        self.assertEqual(resp['Content-Range'], 'bytes */{}'.format(self.length_unlocked))
+
+    def test_if_range_mismatch(self):
+        """
+        Test that the whole asset is served if the client's copy is out of date.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-99', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(resp.status_code, 200)  # pylint: disable=E1103
+        self.assertEqual(len(resp.content), self.length_unlocked)  # pylint: disable=E1103
+
+    def test_etag(self):
+        """
+        Test that assets have a strong ETag which can be used to avoid
+        downloading them again.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp['Accept-Ranges'], 'bytes')
+        etag = resp['ETag']
+        self.assertTrue(etag.startswith('"'))
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)  # pylint: disable=E1103
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(resp.status_code, 200)  # pylint: disable=E1103
+
+    @property
+    def length_unlocked(self):
+        """
+        The length of the unlocked asset.
+        """
+        return self.contentstore.find(self.unlocked_asset).length
+
+
+class ParseByteRangeTest(TestCase):
+    """
+    Tests for parse_byte_range.
+    """
+    def test_ranges(self):
+        self.assertEqual(parse_byte_range('bytes=0-499', 1000), (0, 499))
+        self.assertEqual(parse_byte_range('bytes=500-', 1000), (500, 999))
+        self.assertEqual(parse_byte_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_byte_range('bytes=900-2000', 1000), (900, 999))
+        self.assertEqual(parse_byte_range('bytes=-2000', 1000), (0, 999))
+
+    def test_ignored(self):
+        for header in ('bytes=0-1,5-6', 'pages=1-2', 'bytes=-', 'bytes=5-1'):
+            self.assertIsNone(parse_byte_range(header, 1000))
+
+    def test_not_satisfiable(self):
+        for header in ('bytes=1000-', 'bytes=1000-1001', 'bytes=-0'):
+            with self.assertRaises(RangeNotSatisfiable):
+                parse_byte_range(header, 1000)
+
+
+class DiskCacheTest(TestCase):
+    """
+    Tests for the local disk cache of large assets.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = DiskCache(self.directory, min_size=10)
+        location = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall').make_asset_key('asset', 'letters.txt')
+        self.content = StaticContent(
+            location, 'letters.txt', 'text/plain', None, length=26, content_digest='c3fcd3d76192e4007dfb496cca67e13b'
+        )
+        self.chunks = ['abcdefghij', 'klmnopqrst', 'uvwxyz']
+
+    def test_fill_then_stream(self):
+        self.assertIsNone(self.cache.stream(self.content))
+        self.assertEqual(list(self.cache.fill(self.content, iter(self.chunks))), self.chunks)
+        self.assertEqual(''.join(self.cache.stream(self.content)), ''.join(self.chunks))
+        self.assertEqual(''.join(self.cache.stream(self.content, 3, 5)), 'def')
+
+    def test_incomplete_fill_not_kept(self):
+        chunks = self.cache.fill(self.content, iter(self.chunks))
+        next(chunks)
+        chunks.close()
+        self.assertIsNone(self.cache.stream(self.content))
+
+    def test_small_content_not_cached(self):
+        self.content.length = 5
+        self.assertFalse(self.cache.should_cache(self.content))
@@ -56,20 +56,31 @@ class CourseMode(models.Model):
 
         If no modes have been set in the table, returns the default mode
         """
+        return cls.modes_for_courses([course_id])[course_id]
+
+    @classmethod
+    def modes_for_courses(cls, course_ids):
+        """
+        Returns a dict of the lists of non-expired modes for each of the given
+        course ids (see modes_for_course), found with one query
+        """
         now = datetime.now(pytz.UTC)
-        found_course_modes = cls.objects.filter(Q(course_id=course_id) &
+        found_course_modes = cls.objects.filter(Q(course_id__in=course_ids) &
                                                 (Q(expiration_datetime__isnull=True) |
                                                 Q(expiration_datetime__gte=now)))
-        modes = ([Mode(
-            mode.mode_slug,
-            mode.mode_display_name,
-            mode.min_price,
-            mode.suggested_prices,
-            mode.currency,
-            mode.expiration_datetime
-        ) for mode in found_course_modes])
-        if not modes:
-            modes = [cls.DEFAULT_MODE]
+        modes = {course_id: [] for course_id in course_ids}
+        for mode in found_course_modes:
+            modes[mode.course_id].append(Mode(
+                mode.mode_slug,
+                mode.mode_display_name,
+                mode.min_price,
+                mode.suggested_prices,
+                mode.currency,
+                mode.expiration_datetime
+            ))
+        for course_id in modes:
+            if not modes[course_id]:
+                modes[course_id] = [cls.DEFAULT_MODE]
         return modes
 
     @classmethod
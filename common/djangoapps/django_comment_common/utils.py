@@ -1,4 +1,11 @@
+from uuid import uuid4
+
 from django_comment_common.models import Role
+from util.cache import cache
+
+# How long the LMS keeps what it's worked out about a course's discussion
+# modules, at most, if nothing says they've changed.
+DISCUSSION_INFO_CACHE_TIMEOUT = 60 * 10
 
 _STUDENT_ROLE_PERMISSIONS = ["vote", "update_thread", "follow_thread", "unfollow_thread",
                              "update_comment", "create_sub_comment", "unvote", "create_thread",
@@ -74,3 +81,35 @@ def are_permissions_roles_seeded(course_id):
             return False
 
     return True
+
+
+def _discussion_info_version_key(course_key):
+    """
+    The cache key for the version of the course's discussion info.
+    """
+    return u'discussion_info_version.{}'.format(course_key.to_deprecated_string())
+
+
+def get_discussion_info_version(course_key):
+    """
+    Return a token for the current version of the course's content, as far as
+    its discussion modules go, for keying cached discussion info. The token
+    changes when invalidate_discussion_info is called, or after
+    DISCUSSION_INFO_CACHE_TIMEOUT.
+    """
+    key = _discussion_info_version_key(course_key)
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        # If another process just made one, use theirs
+        cache.add(key, version, DISCUSSION_INFO_CACHE_TIMEOUT)
+        version = cache.get(key) or version
+    return version
+
+
+def invalidate_discussion_info(course_key):
+    """
+    Note that the course's content has changed, so that cached discussion
+    info for it is no longer used.
+    """
+    cache.delete(_discussion_info_version_key(course_key))
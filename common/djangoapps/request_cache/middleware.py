@@ -13,8 +13,11 @@ class RequestCache(object):
 
     def process_request(self, request):
         self.clear_request_cache()
+        # Lets caches tell whether the request cache will be cleared
+        _request_cache_threadlocal.in_request = True
         return None
 
     def process_response(self, request, response):
         self.clear_request_cache()
+        _request_cache_threadlocal.in_request = False
         return response
\ No newline at end of file
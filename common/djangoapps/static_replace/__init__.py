@@ -1,5 +1,7 @@
 import logging
 import re
+import threading
+from collections import OrderedDict
 
 from staticfiles.storage import staticfiles_storage
 from staticfiles import finders
@@ -11,6 +13,13 @@ from xmodule.contentstore.content import StaticContent
 
 log = logging.getLogger(__name__)
 
+# How many courses' rewriters to keep, and how many urls each remembers
+MAX_STATIC_URL_REWRITERS = 200
+MAX_STATIC_URLS = 1000
+
+_rewriters = OrderedDict()
+_rewriters_lock = threading.Lock()
+
 
 def _url_replace_regex(prefix):
     """
@@ -28,6 +37,10 @@ def _url_replace_regex(prefix):
         """.format(prefix=prefix)
 
 
+JUMP_TO_ID_URL_RE = re.compile(_url_replace_regex('/jump_to_id/'))
+COURSE_URL_RE = re.compile(_url_replace_regex('/course/'))
+
+
 def try_staticfiles_lookup(path):
     """
     Try to lookup a path in staticfiles_storage.  If it fails, return
@@ -69,7 +82,7 @@ def replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):
         rest = match.group('rest')
         return "".join([quote, jump_to_id_base_url + rest, quote])
 
-    return re.sub(_url_replace_regex('/jump_to_id/'), replace_jump_to_id_url, text)
+    return JUMP_TO_ID_URL_RE.sub(replace_jump_to_id_url, text)
 
 
 def replace_course_urls(text, course_key):
@@ -89,7 +102,7 @@ def replace_course_urls(text, course_key):
         rest = match.group('rest')
         return "".join([quote, '/courses/' + course_id + '/', rest, quote])
 
-    return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
+    return COURSE_URL_RE.sub(replace_course_url, text)
 
 
 def replace_static_urls(text, data_directory, course_id=None, static_asset_path=''):
@@ -104,8 +117,75 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
     course_id: The course identifier used to distinguish static content for this course in studio
     static_asset_path: Path for static assets, which overrides data_directory and course_namespace, if nonempty
     """
+    return get_static_url_rewriter(data_directory, course_id, static_asset_path).replace(text)
+
+
+def get_static_url_rewriter(data_directory, course_id=None, static_asset_path=''):
+    """
+    Return the StaticUrlRewriter for these arguments (see replace_static_urls),
+    making one if there isn't one already.
 
-    def replace_static_url(match):
+    Rewriters are kept per storage and modulestore as well as per course, since
+    what they remember came from those.
+    """
+    store = modulestore() if course_id and not static_asset_path else None
+    key = (staticfiles_storage, store, settings.STATIC_URL, data_directory, course_id, static_asset_path)
+    with _rewriters_lock:
+        rewriter = _rewriters.pop(key, None)
+        if rewriter is None:
+            rewriter = StaticUrlRewriter(data_directory, course_id, static_asset_path, store)
+        _rewriters[key] = rewriter
+        while len(_rewriters) > MAX_STATIC_URL_REWRITERS:
+            _rewriters.popitem(last=False)
+    return rewriter
+
+
+def clear_static_url_cache(course_id=None):
+    """
+    Forget the urls remembered for the course `course_id`, or for all courses.
+
+    Call this when a course's assets change. The urls of Mongo courses only
+    depend on which files collectstatic found, so this matters for rendering
+    in the same process (e.g. Studio previews) rather than for other processes.
+    """
+    with _rewriters_lock:
+        for key in _rewriters.keys():
+            if course_id is None or key[4] == course_id:
+                del _rewriters[key]
+
+
+class StaticUrlRewriter(object):
+    """
+    Replaces /static/ urls for one course (see replace_static_urls).
+
+    The pattern is compiled once, and the url that each path resolves to is
+    remembered (for up to MAX_STATIC_URLS paths), so that rendering many
+    blocks of a course doesn't look the same files up in storage over and over.
+    Nothing is remembered in debug mode, where static files come and go.
+    """
+    def __init__(self, data_directory, course_id=None, static_asset_path='', store=None):
+        self.data_directory = data_directory
+        self.course_id = course_id
+        self.static_asset_path = static_asset_path
+        self.store = store
+        self.regex = re.compile(_url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
+            static_url=settings.STATIC_URL,
+            data_dir=static_asset_path or data_directory
+        )))
+        self._is_xml_course = None
+        self._urls = OrderedDict()
+        self._lock = threading.Lock()
+
+    def replace(self, text):
+        """
+        Return `text` with its /static/ urls replaced.
+        """
+        return self.regex.sub(self.replace_static_url, text)
+
+    def replace_static_url(self, match):
+        """
+        The replacement for one /static/ url matched by self.regex.
+        """
         original = match.group(0)
         prefix = match.group('prefix')
         quote = match.group('quote')
@@ -115,11 +195,38 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
         if rest.endswith('?raw'):
             return original
 
-        # In debug mode, if we can find the url as is,
-        if settings.DEBUG and finders.find(rest, True):
-            return original
+        if settings.DEBUG:
+            # In debug mode, if we can find the url as is,
+            if finders.find(rest, True):
+                return original
+            return "".join([quote, self.resolve(prefix, rest), quote])
+
+        key = (prefix, rest)
+        with self._lock:
+            url = self._urls.pop(key, None)
+        if url is None:
+            url = self.resolve(prefix, rest)
+        with self._lock:
+            self._urls[key] = url
+            while len(self._urls) > MAX_STATIC_URLS:
+                self._urls.popitem(last=False)
+
+        return "".join([quote, url, quote])
+
+    def is_xml_course(self):
+        """
+        Whether the course is in an XML modulestore, looked up once.
+        """
+        if self._is_xml_course is None:
+            self._is_xml_course = self.store.get_modulestore_type(self.course_id) == XML_MODULESTORE_TYPE
+        return self._is_xml_course
+
+    def resolve(self, prefix, rest):
+        """
+        The url for the static file `rest`, which was found after `prefix`.
+        """
         # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) and course_id and modulestore().get_modulestore_type(course_id) != XML_MODULESTORE_TYPE:
+        if (not self.static_asset_path) and self.course_id and not self.is_xml_course():
             # first look in the static file pipeline and see if we are trying to reference
             # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
 
@@ -131,33 +238,22 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
                     rest, str(err)))
 
             if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
+                return staticfiles_storage.url(rest)
             else:
                 # if not, then assume it's courseware specific content and then look in the
                 # Mongo-backed database
-                url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
+                return StaticContent.convert_legacy_static_url_with_course_id(rest, self.course_id)
         # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
         else:
-            course_path = "/".join((static_asset_path or data_directory, rest))
+            course_path = "/".join((self.static_asset_path or self.data_directory, rest))
 
             try:
                 if staticfiles_storage.exists(rest):
-                    url = staticfiles_storage.url(rest)
+                    return staticfiles_storage.url(rest)
                 else:
-                    url = staticfiles_storage.url(course_path)
+                    return staticfiles_storage.url(course_path)
             # And if that fails, assume that it's course content, and add manually data directory
             except Exception as err:
                 log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
                     rest, str(err)))
-                url = "".join([prefix, course_path])
-
-        return "".join([quote, url, quote])
-
-    return re.sub(
-        _url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
-            static_url=settings.STATIC_URL,
-            data_dir=static_asset_path or data_directory
-        )),
-        replace_static_url,
-        text
-    )
+                return "".join([prefix, course_path])
@@ -2,7 +2,7 @@ import re
 
 from nose.tools import assert_equals, assert_true, assert_false  # pylint: disable=E0611
 from static_replace import (replace_static_urls, replace_course_urls,
-                            _url_replace_regex)
+                            _url_replace_regex, clear_static_url_cache)
 from mock import patch, Mock
 
 from xmodule.modulestore.locations import SlashSeparatedCourseKey
@@ -80,6 +80,39 @@ def test_data_dir_fallback(mock_storage, mock_modulestore, mock_settings):
     assert_equals('"/static/data_dir/file.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
 
 
+@patch('static_replace.staticfiles_storage')
+def test_storage_lookups_remembered(mock_storage):
+    """
+    Make sure each path is only looked up once, until the course's assets change
+    """
+    mock_storage.exists.return_value = True
+    mock_storage.url.return_value = '/static/file.png'
+
+    for __ in range(3):
+        assert_equals('"/static/file.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
+    assert_equals(mock_storage.exists.call_count, 1)
+
+    clear_static_url_cache()
+    mock_storage.url.return_value = '/static/file.abc123.png'
+    assert_equals('"/static/file.abc123.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
+    assert_equals(mock_storage.exists.call_count, 2)
+
+
+@patch('static_replace.StaticContent')
+@patch('static_replace.modulestore')
+def test_modulestore_type_looked_up_once(mock_modulestore, mock_static_content):
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+    mock_static_content.convert_legacy_static_url_with_course_id.return_value = "c4x://mock_url"
+
+    text = '"/static/a.png" "/static/b.png" "/static/c.png"'
+    assert_equals(
+        '"c4x://mock_url" "c4x://mock_url" "c4x://mock_url"',
+        replace_static_urls(text, DATA_DIRECTORY, COURSE_KEY)
+    )
+    assert_equals(mock_modulestore.return_value.get_modulestore_type.call_count, 1)
+    clear_static_url_cache(COURSE_KEY)
+
+
 def test_raw_static_check():
     """
     Make sure replace_static_urls leaves alone things that end in '.raw'
@@ -29,6 +29,10 @@ from student.models import anonymous_id_for_user, user_by_anonymous_id, CourseEn
 from student.views import (process_survey_link, _cert_info,
                            change_enrollment, complete_course_mode_info)
 from student.tests.factories import UserFactory, CourseModeFactory
+from course_modes.models import CourseMode
+from certificates.models import (GeneratedCertificate, CertificateStatuses,
+                                 certificate_status_for_student, certificate_statuses_for_student)
+from bulk_email.models import CourseAuthorization
 
 import shoppingcart
 
@@ -231,6 +235,40 @@ class DashboardTest(TestCase):
         verified_mode.save()
         self.assertFalse(enrollment.refundable())
 
+    @unittest.skipUnless(settings.ROOT_URLCONF == 'lms.urls', 'Test only valid in lms')
+    @patch.dict("django.conf.settings.FEATURES", {'REQUIRE_COURSE_EMAIL_AUTH': True})
+    def test_bulk_lookups(self):
+        # Seed the user with a number of enrollments, some of them in verified
+        # courses, with certificates or with email enabled.
+        courses = [self.course] + [
+            CourseFactory.create(org=self.COURSE_ORG, number="course{}".format(index)) for index in range(9)
+        ]
+        course_ids = [course.id for course in courses]
+        for index, course in enumerate(courses):
+            CourseEnrollment.enroll(self.user, course.id)
+            if index % 2:
+                CourseModeFactory.create(course_id=course.id, mode_slug='verified', mode_display_name='Verified')
+            if index % 3 == 0:
+                GeneratedCertificate.objects.create(
+                    user=self.user, course_id=course.id, status=CertificateStatuses.downloadable,
+                    download_url='http://example.com/{}'.format(index), grade='0.9'
+                )
+            if index % 4 == 0:
+                CourseAuthorization.objects.create(course_id=course.id, email_enabled=True)
+
+        with self.assertNumQueries(1):
+            modes = CourseMode.modes_for_courses(course_ids)
+        with self.assertNumQueries(1):
+            certificate_statuses = certificate_statuses_for_student(self.user, course_ids)
+        with self.assertNumQueries(1):
+            email_enabled = CourseAuthorization.instructor_email_enabled_courses(course_ids)
+
+        # They find the same as looking the courses up one by one
+        for course_id in course_ids:
+            self.assertEqual(modes[course_id], CourseMode.modes_for_course(course_id))
+            self.assertEqual(certificate_statuses[course_id], certificate_status_for_student(self.user, course_id))
+            self.assertEqual(course_id in email_enabled, CourseAuthorization.instructor_email_enabled(course_id))
+
 
 
 class EnrollInCourseTest(TestCase):
@@ -46,7 +46,7 @@ from student.models import (
 from student.forms import PasswordResetFormNoActive
 
 from verify_student.models import SoftwareSecurePhotoVerification, MidcourseReverificationWindow
-from certificates.models import CertificateStatuses, certificate_status_for_student
+from certificates.models import CertificateStatuses, certificate_status_for_student, certificate_statuses_for_student
 from dark_lang.models import DarkLangConfig
 
 from xmodule.course_module import CourseDescriptor
@@ -159,7 +159,7 @@ def process_survey_link(survey_link, user):
     return survey_link.format(UNIQUE_ID=unique_id_for_user(user))
 
 
-def cert_info(user, course):
+def cert_info(user, course, cert_status=None):
     """
     Get the certificate info needed to render the dashboard section for the given
     student and course.  Returns a dictionary with keys:
@@ -171,11 +171,16 @@ def cert_info(user, course):
     'show_survey_button': bool
     'survey_url': url, only if show_survey_button is True
     'grade': if status is not 'processing'
+
+    `cert_status` is the student's certificate status for the course (see
+    certificate_status_for_student), if it has been looked up already.
     """
     if not course.may_certify():
         return {}
 
-    return _cert_info(user, course, certificate_status_for_student(user, course.id))
+    if cert_status is None:
+        cert_status = certificate_status_for_student(user, course.id)
+    return _cert_info(user, course, cert_status)
 
 
 def reverification_info(course_enrollment_pairs, user, statuses):
@@ -222,10 +227,11 @@ def single_course_reverification_info(user, course, enrollment):  # pylint: disa
         ReverifyInfo: (course_id, course_name, course_number, date, status)
         OR, None: None if there is no re-verification info for this enrollment
     """
+    # If the user is not verified OR there's no window, we don't get reverification info
+    if enrollment.mode != "verified":
+        return None
     window = MidcourseReverificationWindow.get_window(course.id, datetime.datetime.now(UTC))
-
-    # If there's no window OR the user is not verified, we don't get reverification info
-    if (not window) or (enrollment.mode != "verified"):
+    if not window:
         return None
     return ReverifyInfo(
         course.id, course.display_name, course.number,
@@ -396,7 +402,7 @@ def register_user(request, extra_context=None):
     return render_to_response('register.html', context)
 
 
-def complete_course_mode_info(course_id, enrollment):
+def complete_course_mode_info(course_id, enrollment, modes=None):
     """
     We would like to compute some more information from the given course modes
     and the user's current enrollment
@@ -404,8 +410,12 @@ def complete_course_mode_info(course_id, enrollment):
     Returns the given information:
         - whether to show the course upsell information
         - numbers of days until they can't upsell anymore
+
+    `modes` is the course's modes by slug (see CourseMode.modes_for_course_dict),
+    if they have been looked up already.
     """
-    modes = CourseMode.modes_for_course_dict(course_id)
+    if modes is None:
+        modes = CourseMode.modes_for_course_dict(course_id)
     mode_info = {'show_upsell': False, 'days_for_upsell': None}
     # we want to know if the user is already verified and if verified is an
     # option
@@ -458,17 +468,31 @@ def dashboard(request):
     show_courseware_links_for = frozenset(course.id for course, _enrollment in course_enrollment_pairs
                                           if has_access(request.user, 'load', course))
 
-    course_modes = {course.id: complete_course_mode_info(course.id, enrollment) for course, enrollment in course_enrollment_pairs}
-    cert_statuses = {course.id: cert_info(request.user, course) for course, _enrollment in course_enrollment_pairs}
+    # Look up the modes, certificates and email authorizations of all of the
+    # courses at once, rather than course by course
+    course_ids = [course.id for course, _enrollment in course_enrollment_pairs]
+    modes_by_course = {
+        course_id: {mode.slug: mode for mode in modes}
+        for course_id, modes in CourseMode.modes_for_courses(course_ids).iteritems()
+    }
+    certificate_statuses = certificate_statuses_for_student(user, course_ids)
+
+    course_modes = {
+        course.id: complete_course_mode_info(course.id, enrollment, modes_by_course[course.id])
+        for course, enrollment in course_enrollment_pairs
+    }
+    cert_statuses = {
+        course.id: cert_info(request.user, course, certificate_statuses[course.id])
+        for course, _enrollment in course_enrollment_pairs
+    }
 
     # only show email settings for Mongo course and when bulk email is turned on
-    show_email_settings_for = frozenset(
-        course.id for course, _enrollment in course_enrollment_pairs if (
-            settings.FEATURES['ENABLE_INSTRUCTOR_EMAIL'] and
-            modulestore().get_modulestore_type(course.id) != XML_MODULESTORE_TYPE and
-            CourseAuthorization.instructor_email_enabled(course.id)
+    show_email_settings_for = frozenset()
+    if settings.FEATURES['ENABLE_INSTRUCTOR_EMAIL']:
+        show_email_settings_for = frozenset(
+            course_id for course_id in CourseAuthorization.instructor_email_enabled_courses(course_ids)
+            if modulestore().get_modulestore_type(course_id) != XML_MODULESTORE_TYPE
         )
-    )
 
     # Verification Attempts
     # Used to generate the "you must reverify for course x" banner
@@ -478,8 +502,9 @@ def dashboard(request):
     statuses = ["approved", "denied", "pending", "must_reverify"]
     reverifications = reverification_info(course_enrollment_pairs, user, statuses)
 
+    # as CourseEnrollment.refundable, for all of the courses at once
     show_refund_option_for = frozenset(course.id for course, _enrollment in course_enrollment_pairs
-                                       if _enrollment.refundable())
+                                       if 'verified' in modes_by_course[course.id])
 
     # get info w.r.t ExternalAuthMap
     external_auth_map = None
@@ -26,3 +26,13 @@ class BaseBackend(object):
     def send(self, event):
         """Send event to tracker."""
         pass
+
+    def send_batch(self, events):
+        """
+        Send a list of events to tracker.
+
+        Unlike `send`, this raises if the events couldn't be sent, so that
+        the caller can count them as lost (see queued.QueuedBackend).
+        """
+        for event in events:
+            self.send(event)
@@ -81,3 +81,10 @@ class DjangoBackend(BaseBackend):
             tldat.save(using=self.name)
         except Exception as e:  # pylint: disable=broad-except
             log.exception(e)
+
+    def send_batch(self, events):
+        """
+        Save the events at once. Raises if they couldn't be saved.
+        """
+        tldats = [TrackingLog(**{x: event.get(x, '') for x in LOGFIELDS}) for event in events]
+        TrackingLog.objects.using(self.name).bulk_create(tldats)
@@ -95,3 +95,10 @@ class MongoBackend(BaseBackend):
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+
+    def send_batch(self, events):
+        """
+        Insert the events in to the Mongo collection at once. Raises
+        PyMongoError if they (or some of them) couldn't be inserted.
+        """
+        self.collection.insert(events, manipulate=False, continue_on_error=True)
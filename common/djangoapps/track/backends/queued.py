@@ -0,0 +1,178 @@
+"""
+Event tracker backend that hands events to another backend in batches, from
+a background thread, so that a slow backend (e.g. a busy MongoDB) doesn't
+slow down the requests that send events.
+
+Wrap a backend's configuration in the OPTIONS of a QueuedBackend::
+
+  TRACKING_BACKENDS = {
+      'mongo': {
+          'ENGINE': 'track.backends.queued.QueuedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.mongodb.MongoBackend',
+                  'OPTIONS': {...}
+              },
+              'max_queue_size': 10000,
+              'batch_size': 100,
+          }
+      }
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import Queue
+import threading
+import time
+
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+# Put on the queue to tell the thread to stop, once it's sent what's before it
+_STOP = object()
+
+
+class QueuedBackend(BaseBackend):
+    """
+    Event tracker backend which queues events, for a thread to send on to
+    another backend in batches.
+
+    When the queue is full, events are dropped (after waiting `max_wait`
+    seconds for room) rather than holding up the request. The numbers of
+    events `sent`, `dropped`, and lost to errors in the backend (`failed`)
+    are counted here, and reported to datadog.
+    """
+
+    def __init__(self, backend, max_queue_size=10000, batch_size=100, flush_interval=1.0, max_wait=0, **kwargs):
+        """
+        :Parameters:
+
+          - `backend`: configuration of the backend to send the events to,
+            a dict with 'ENGINE' and 'OPTIONS' as in TRACKING_BACKENDS
+          - `max_queue_size`: how many events can be waiting to be sent
+          - `batch_size`: the most events to send at once
+          - `flush_interval`: the longest, in seconds, to wait for a batch
+            to fill up before sending it
+          - `max_wait`: how long, in seconds, to wait for room in a full
+            queue before dropping an event
+
+        """
+        super(QueuedBackend, self).__init__(**kwargs)
+
+        # Imported here, as the tracker instantiates backends when it's imported
+        from track.tracker import _instantiate_backend_from_name  # pylint: disable=protected-access
+
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_wait = max_wait
+
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self.queue = None
+        self.thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _start(self):
+        """
+        Start the thread, if it isn't running in this process. (A process
+        forked after the thread started, e.g. a web server worker, doesn't
+        have the thread.)
+        """
+        with self._lock:
+            if self.thread is None or self._pid != os.getpid():
+                self.queue = Queue.Queue(self.max_queue_size)
+                self.thread = threading.Thread(target=self._run, name='track-{}'.format(self.backend.__class__.__name__))
+                self.thread.daemon = True
+                self._pid = os.getpid()
+                self.thread.start()
+
+    def send(self, event):
+        """Queue the event to be sent, or drop it if the queue is full."""
+        self._start()
+        try:
+            self.queue.put(event, self.max_wait > 0, self.max_wait or None)
+        except Queue.Full:
+            self.dropped += 1
+            dog_stats_api.increment('track.queued.dropped', tags=[self._tag()])
+
+    def _run(self):
+        """
+        Send the events on the queue in batches, until told to stop.
+        """
+        queue = self.queue
+        stopping = False
+        while not stopping:
+            events = []
+            deadline = None
+            while len(events) < self.batch_size:
+                try:
+                    if deadline is None:
+                        # Wait as long as it takes for the first event of a batch
+                        event = queue.get()
+                        deadline = time.time() + self.flush_interval
+                    else:
+                        event = queue.get(True, max(deadline - time.time(), 0))
+                except Queue.Empty:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                events.append(event)
+            if events:
+                self._send_batch(events)
+
+    def _send_batch(self, events):
+        """
+        Send `events` to the backend, counting how that went.
+        """
+        dog_stats_api.histogram('track.queued.batch_size', len(events), tags=[self._tag()])
+        try:
+            with dog_stats_api.timer('track.queued.send_batch', tags=[self._tag()]):
+                self.backend.send_batch(events)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Error sending %d events to %s', len(events), self.backend.__class__.__name__)
+            self.failed += len(events)
+            dog_stats_api.increment('track.queued.failed', len(events), tags=[self._tag()])
+        else:
+            self.sent += len(events)
+
+    def _tag(self):
+        """The datadog tag naming the backend the events are for."""
+        return u'backend:{}'.format(self.backend.__class__.__name__)
+
+    def flush(self, timeout=None):
+        """
+        Send all of the queued events, and stop the thread. Sending more
+        events starts a new one.
+
+        Waits at most `timeout` seconds for the events to be sent (forever if
+        None).
+        """
+        with self._lock:
+            thread, self.thread = self.thread, None
+            if thread is None or self._pid != os.getpid():
+                return
+            # Make sure the thread gets the message, even if the queue is full
+            self.queue.put(_STOP)
+        thread.join(timeout)
+
+    def close(self):
+        """
+        Send the queued events before the process exits.
+        """
+        self.flush(timeout=10)
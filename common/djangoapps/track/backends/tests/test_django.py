@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 
+from django.db import DatabaseError
 from django.test import TestCase
+from mock import patch
 
 from track.backends.django import DjangoBackend, TrackingLog
 
@@ -23,3 +25,19 @@ class TestDjangoBackend(TestCase):
 
         # Check if time is stored in UTC
         self.assertEqual(str(results[0].time), '2013-01-01 17:01:00+00:00')
+
+    def test_django_backend_batch(self):
+        events = [
+            {'username': 'test1', 'time': '2013-01-01T12:01:00-05:00'},
+            {'username': 'test2', 'time': '2013-01-01T12:02:00-05:00'},
+        ]
+        self.backend.send_batch(events)
+
+        results = TrackingLog.objects.order_by('username')
+        self.assertEqual([result.username for result in results], ['test1', 'test2'])
+
+    def test_django_backend_batch_failure(self):
+        # The caller counts the lost events
+        with patch('django.db.models.query.QuerySet.bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.backend.send_batch([{'username': 'test1'}])
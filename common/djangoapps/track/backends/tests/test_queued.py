@@ -0,0 +1,91 @@
+from __future__ import absolute_import
+
+import threading
+import time
+
+from django.test import TestCase
+
+from track.backends import BaseBackend
+from track.backends.queued import QueuedBackend
+
+
+class RecordingBackend(BaseBackend):
+    """Remembers the batches it's sent, after `gate` is set."""
+
+    def __init__(self, **options):
+        super(RecordingBackend, self).__init__(**options)
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def send(self, event):
+        raise NotImplementedError
+
+    def send_batch(self, events):
+        self.gate.wait()
+        if events == ['fail']:
+            raise Exception("Couldn't send")
+        self.batches.append(events)
+
+
+def queued_backend(**options):
+    """A QueuedBackend in front of a RecordingBackend."""
+    backend = QueuedBackend(backend={'ENGINE': 'track.tests.test_tracker.DummyBackend'}, **options)
+    backend.backend = RecordingBackend()
+    return backend
+
+
+class TestQueuedBackend(TestCase):
+
+    def test_events_sent_in_batches(self):
+        backend = queued_backend(batch_size=3, flush_interval=60)
+        for event in range(7):
+            backend.send({'event': event})
+        backend.flush()
+
+        self.assertEqual(
+            [[event['event'] for event in batch] for batch in backend.backend.batches],
+            [[0, 1, 2], [3, 4, 5], [6]]
+        )
+        self.assertEqual((backend.sent, backend.dropped, backend.failed), (7, 0, 0))
+
+    def test_partial_batch_sent_after_interval(self):
+        backend = queued_backend(batch_size=100, flush_interval=0.01)
+        backend.send({'event': 1})
+        backend.send({'event': 2})
+        # The thread sends them without being asked
+        deadline = time.time() + 5
+        while backend.sent < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(backend.sent, 2)
+        backend.flush()
+
+    def test_events_dropped_when_queue_full(self):
+        backend = queued_backend(max_queue_size=2, batch_size=1)
+        backend.backend.gate.clear()
+        backend.send({'event': 0})
+        # Wait for the thread to take the first event, and block sending it
+        while not backend.queue.empty():
+            pass
+        for event in range(1, 5):
+            backend.send({'event': event})
+        backend.backend.gate.set()
+        backend.flush()
+
+        self.assertEqual((backend.sent, backend.dropped), (3, 2))
+
+    def test_failed_batch(self):
+        backend = queued_backend(batch_size=1)
+        backend.send('fail')
+        backend.send({'event': 1})
+        backend.flush()
+        self.assertEqual((backend.sent, backend.failed), (1, 1))
+
+    def test_send_after_flush(self):
+        backend = queued_backend()
+        backend.send({'event': 1})
+        backend.flush()
+        backend.send({'event': 2})
+        backend.close()
+        self.assertEqual(backend.sent, 2)
+        self.assertIsNone(backend.thread)
@@ -1,7 +1,7 @@
 """
 Parser and evaluator for FormulaResponse and NumericalResponse
 
-Uses pyparsing to parse. Main function as of now is evaluator().
+Uses pyparsing to parse. Main functions as of now are evaluator() and compile_expression().
 """
 
 import math
@@ -10,6 +10,7 @@ import numbers
 import numpy
 import scipy.constants
 import functions
+from lru import LRUCache
 
 from pyparsing import (
     Word, Literal, CaselessLiteral, ZeroOrMore, MatchFirst, Optional, Forward,
@@ -61,6 +62,9 @@ DEFAULT_VARIABLES = {
     'q': scipy.constants.e  # Fund. Charge: 1.602176565e-19 (Coulombs)
 }
 
+# The number of parsed expressions to keep (see `compile_expression`)
+EXPRESSION_CACHE_SIZE = 1000
+
 # We eliminated the following extreme suffixes:
 #   P (1e15), E (1e18), Z (1e21), Y (1e24),
 #   f (1e-15), a (1e-18), z (1e-21), y (1e-24)
@@ -93,7 +97,16 @@ def lower_dict(input_dict):
 
 # The following few functions define evaluation actions, which are run on lists
 # of results from each parse component. They convert the strings and (previously
-# calculated) numbers into the number that component represents.
+# calculated) numbers into the number that component represents. The numbers
+# may also be numpy arrays (see `evaluate_parsed`).
+
+def is_value(token):
+    """
+    Return whether `token` is a (calculated) number, or array of numbers,
+    rather than one of the strings of the parse.
+    """
+    return isinstance(token, (numbers.Number, numpy.ndarray))
+
 
 def super_float(text):
     """
@@ -122,7 +135,7 @@ def eval_atom(parse_result):
     In the case of parenthesis, ignore them.
     """
     # Find first number in the list
-    result = next(k for k in parse_result if isinstance(k, numbers.Number))
+    result = next(k for k in parse_result if is_value(k))
     return result
 
 
@@ -136,7 +149,7 @@ def eval_power(parse_result):
     # `reduce` will go from left to right; reverse the list.
     parse_result = reversed(
         [k for k in parse_result
-         if isinstance(k, numbers.Number)]  # Ignore the '^' marks.
+         if is_value(k)]  # Ignore the '^' marks.
     )
     # Having reversed it, raise `b` to the power of `a`.
     power = reduce(lambda a, b: b ** a, parse_result)
@@ -155,10 +168,10 @@ def eval_parallel(parse_result):
     """
     if len(parse_result) == 1:
         return parse_result[0]
-    if 0 in parse_result:
+    values = [e for e in parse_result if is_value(e)]
+    if any(numpy.any(value == 0) for value in values):
         return float('nan')
-    reciprocals = [1. / e for e in parse_result
-                   if isinstance(e, numbers.Number)]
+    reciprocals = [1. / e for e in values]
     return 1. / sum(reciprocals)
 
 
@@ -173,12 +186,12 @@ def eval_sum(parse_result):
     total = 0.0
     current_op = operator.add
     for token in parse_result:
-        if token == '+':
+        if is_value(token):
+            total = current_op(total, token)
+        elif token == '+':
             current_op = operator.add
         elif token == '-':
             current_op = operator.sub
-        else:
-            total = current_op(total, token)
     return total
 
 
@@ -191,12 +204,12 @@ def eval_product(parse_result):
     prod = 1.0
     current_op = operator.mul
     for token in parse_result:
-        if token == '*':
+        if is_value(token):
+            prod = current_op(prod, token)
+        elif token == '*':
             current_op = operator.mul
         elif token == '/':
             current_op = operator.truediv
-        else:
-            prod = current_op(prod, token)
     return prod
 
 
@@ -223,14 +236,23 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     -Variables are passed as a dictionary from string to value. They must be
      python numbers.
     -Unary functions are passed as a dictionary from string to function.
+
+    The parse of `math_expr` is shared with other callers (see `compile_expression`).
     """
-    # No need to go further.
-    if math_expr.strip() == "":
-        return float('nan')
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
+
 
-    # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+def evaluate_parsed(math_interpreter, variables, functions):
+    """
+    Evaluate an expression which has already been parsed, so that it can be
+    evaluated many times over without parsing it again.
+
+    `math_interpreter` is a ParseAugmenter which has had `parse_algebra` called.
+    Variables and functions are as for `evaluator`. Variable values may also be
+    numpy arrays, to evaluate the expression at many points at once (as long
+    as the functions it uses accept arrays).
+    """
+    case_sensitive = math_interpreter.case_sensitive
 
     # Get our variables together.
     all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
@@ -416,3 +438,83 @@ class ParseAugmenter(object):
 
         if bad_vars:
             raise UndefinedVariable(' '.join(sorted(bad_vars)))
+
+
+class CompiledExpression(object):
+    """
+    A math expression which has been parsed once, so that it can be evaluated
+    and rendered many times over.
+
+    Instances are shared between callers (see `compile_expression`), so they can't be
+    changed once created.
+
+    Fields:
+     -`math_expr` and `case_sensitive` are as given to `compile_expression`.
+     -`variables_used` and `functions_used` are frozensets of the names
+      appearing in the expression, as typed.
+    """
+    __slots__ = ('math_expr', 'case_sensitive', 'variables_used', 'functions_used', '_parsed')
+
+    def __init__(self, math_expr, case_sensitive=False):
+        """
+        Parse `math_expr`, raising a `pyparsing.ParseException` if it's not
+        valid math. A blank expression is valid, and evaluates to NaN.
+        """
+        parsed = None
+        if math_expr.strip() != "":
+            parsed = ParseAugmenter(math_expr, case_sensitive)
+            parsed.parse_algebra()
+
+        set_field = super(CompiledExpression, self).__setattr__
+        set_field('math_expr', math_expr)
+        set_field('case_sensitive', case_sensitive)
+        set_field('variables_used', frozenset(parsed.variables_used if parsed else ()))
+        set_field('functions_used', frozenset(parsed.functions_used if parsed else ()))
+        set_field('_parsed', parsed)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(u"CompiledExpression is immutable; can't set '{}'".format(name))
+
+    def __repr__(self):
+        return "CompiledExpression({!r}, case_sensitive={!r})".format(self.math_expr, self.case_sensitive)
+
+    def evaluate(self, variables, functions):
+        """
+        Return the value of the expression, as for `evaluator`.
+
+        Variable values may also be numpy arrays (see `evaluate_parsed`).
+        """
+        if self._parsed is None:
+            return float('nan')
+        return evaluate_parsed(self._parsed, variables, functions)
+
+    def to_latex(self, variables=(), functions=()):
+        """
+        Return the expression typeset as latex, as for `preview.latex_preview`.
+        """
+        if self._parsed is None:
+            return ""
+        # preview imports from this module, so import it when it's needed.
+        import preview
+        return preview.render_latex(self._parsed, variables, functions)
+
+
+# CompiledExpressions, keyed by the expression string and case sensitivity
+expression_cache = LRUCache(EXPRESSION_CACHE_SIZE)  # pylint: disable=invalid-name
+
+
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Parse `math_expr` into a CompiledExpression, which can be evaluated (as
+    with `evaluator`) and rendered as latex (as with `preview.latex_preview`)
+    without parsing it again.
+
+    Recently used expressions are shared, so that e.g. a formula which is
+    previewed and then graded is only parsed once.
+    """
+    key = (math_expr, case_sensitive)
+    expression = expression_cache.get(key)
+    if expression is None:
+        expression = CompiledExpression(math_expr, case_sensitive)
+        expression_cache.set(key, expression)
+    return expression
@@ -0,0 +1,52 @@
+"""
+A least recently used cache, shared by calc and capa.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache(object):
+    """
+    A dict-like cache holding at most `max_size` items, which discards the
+    least recently used item to make room for a new one. Safe to share
+    between threads.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the item for `key` (marking it as the most recently used), or
+        `default` if there isn't one.
+        """
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                return default
+            self._items[key] = value
+            return value
+
+    def set(self, key, value):
+        """
+        Store `value` for `key`, discarding the least recently used item if
+        the cache is full.
+        """
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Discard all of the items.
+        """
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
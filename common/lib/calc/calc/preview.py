@@ -8,7 +8,7 @@ Because intermediate values of the render contain more data than simply the
 string of latex, store it in a custom class `LatexRendered`.
 """
 
-from calc import ParseAugmenter, DEFAULT_VARIABLES, DEFAULT_FUNCTIONS, SUFFIXES
+from calc import compile_expression, DEFAULT_VARIABLES, DEFAULT_FUNCTIONS, SUFFIXES
 
 
 class LatexRendered(object):
@@ -357,15 +357,20 @@ def latex_preview(math_expr, variables=(), functions=(), case_sensitive=False):
     """
     Convert `math_expr` into latex, guaranteeing its parse-ability.
 
-    Analagous to `evaluator`.
+    Analagous to `evaluator`, and likewise shares the parse of `math_expr`
+    with other callers (see `calc.compile_expression`).
     """
-    # No need to go further
-    if math_expr.strip() == "":
-        return ""
+    return compile_expression(math_expr, case_sensitive).to_latex(variables, functions)
 
-    # Parse tree
-    latex_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    latex_interpreter.parse_algebra()
+
+def render_latex(latex_interpreter, variables, functions):
+    """
+    Render an expression which has already been parsed into latex.
+
+    `latex_interpreter` is a ParseAugmenter which has had `parse_algebra`
+    called. Variables and functions are as for `latex_preview`.
+    """
+    case_sensitive = latex_interpreter.case_sensitive
 
     # Get our variables together.
     variables, functions = add_defaults(variables, functions, case_sensitive)
@@ -558,3 +558,81 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class CompileTest(unittest.TestCase):
+    """
+    Run tests for calc.compile_expression and the CompiledExpressions it returns.
+    """
+    def setUp(self):
+        super(CompileTest, self).setUp()
+        calc.expression_cache.clear()
+
+    def test_evaluate(self):
+        expression = calc.compile_expression('x^2 + sin(y)')
+        self.assertEqual(expression.evaluate({'x': 3.0, 'y': 0.0}, {}), 9.0)
+        self.assertEqual(expression.evaluate({'x': 2.0, 'y': 0.0}, {}), 4.0)
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            expression.evaluate({'x': 2.0}, {})
+
+    def test_evaluate_arrays(self):
+        """
+        Evaluating an expression on arrays of values gives the array of its
+        values at each point.
+        """
+        expression = calc.compile_expression('-x^2 + 2*y/x - (x || y) + sin(y) + 1')
+        x_values = numpy.array([1.0, -2.0, 3.0])
+        y_values = numpy.array([0.5, 1.0, 4.0])
+        values = expression.evaluate({'x': x_values, 'y': y_values}, {})
+        self.assertEqual(values.shape, (3,))
+        for value, x_value, y_value in zip(values, x_values, y_values):
+            self.assertAlmostEqual(value, expression.evaluate({'x': x_value, 'y': y_value}, {}))
+
+        # as for numbers, the parallel operator gives nan if an input is zero
+        self.assertTrue(numpy.isnan(calc.compile_expression('x || y').evaluate({'x': x_values, 'y': y_values - 1}, {})))
+
+    def test_names_used(self):
+        expression = calc.compile_expression('2*x + f(Y)')
+        self.assertEqual(expression.variables_used, frozenset(['x', 'Y']))
+        self.assertEqual(expression.functions_used, frozenset(['f']))
+
+    def test_to_latex(self):
+        self.assertEqual(calc.compile_expression('x^2').to_latex(), 'x^{2}')
+
+    def test_blank(self):
+        expression = calc.compile_expression('  ')
+        self.assertTrue(numpy.isnan(expression.evaluate({}, {})))
+        self.assertEqual(expression.to_latex(), '')
+        self.assertEqual(expression.variables_used, frozenset())
+
+    def test_immutable(self):
+        expression = calc.compile_expression('x')
+        with self.assertRaises(AttributeError):
+            expression.math_expr = 'y'
+
+    def test_shared(self):
+        """
+        Compiling an expression again reuses the first parse, but only for the
+        same case sensitivity.
+        """
+        expression = calc.compile_expression('x+1')
+        self.assertIs(calc.compile_expression('x+1'), expression)
+        self.assertIsNot(calc.compile_expression('x+1', case_sensitive=True), expression)
+        # evaluator and latex_preview share it too
+        self.assertEqual(calc.evaluator({'x': 1}, {}, 'x+1'), 2)
+        self.assertEqual(len(calc.expression_cache), 2)
+
+    def test_cache_bounded(self):
+        self.addCleanup(setattr, calc.expression_cache, 'max_size', calc.expression_cache.max_size)
+        calc.expression_cache.max_size = 2
+        first = calc.compile_expression('1')
+        calc.compile_expression('2')
+        calc.compile_expression('1')
+        calc.compile_expression('3')
+        self.assertEqual(len(calc.expression_cache), 2)
+        self.assertIs(calc.compile_expression('1'), first)
+
+    def test_parse_errors_not_cached(self):
+        with self.assertRaises(ParseException):
+            calc.compile_expression('x+')
+        self.assertEqual(len(calc.expression_cache), 0)
@@ -0,0 +1,22 @@
+"""
+Unit tests for lru.py
+"""
+
+import unittest
+from calc.lru import LRUCache
+
+
+class LRUCacheTest(unittest.TestCase):
+    """Tests for LRUCache"""
+    def test_discards_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+        cache.clear()
+        self.assertEqual(cache.get('a', 'missing'), 'missing')
@@ -26,7 +26,7 @@ from capa.correctmap import CorrectMap
 import capa.inputtypes as inputtypes
 import capa.customrender as customrender
 import capa.responsetypes as responsetypes
-from capa.util import contextualize_text, convert_files_to_filenames
+from capa.util import contextualize_text, convert_files_to_filenames, LRUCache
 import capa.xqueue_interface as xqueue_interface
 
 from capa.safe_exec import safe_exec
@@ -59,6 +59,11 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# Parsed problems (with their includes) are kept here to be copied by later
+# LoncapaProblems with the same text, see LoncapaProblem._parse_problem
+PROBLEM_TEMPLATE_CACHE_SIZE = 1000
+problem_template_cache = LRUCache(PROBLEM_TEMPLATE_CACHE_SIZE)
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -151,16 +156,8 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # parse problem XML file into an element tree, with any includes
+        self._parse_problem(problem_text)
 
         # construct script processor context (eg for customresponse problems)
         self.context = self._extract_context(self.tree)
@@ -526,15 +523,58 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
+    def _parse_problem(self, problem_text):
+        """
+        Set self.problem_text and self.tree from problem_text.
+
+        None of this depends on the student, so the result is cached (in
+        problem_template_cache) and later problems with the same text just take
+        a copy of the tree, as long as none of the files it includes have changed.
+        """
+        filestore = self.capa_system.filestore
+        key = (self.problem_id, getattr(filestore, 'root_path', None), problem_text)
+        template = problem_template_cache.get(key)
+        if template is not None:
+            self.problem_text, tree, include_times = template
+            if all(self._include_time(filename) == mtime for filename, mtime in include_times):
+                self.tree = deepcopy(tree)
+                return
+
+        # Convert startouttext and endouttext to proper <text></text>
+        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+        self.problem_text = problem_text
+
+        # parse problem XML file into an element tree
+        self.tree = etree.XML(problem_text)
+
+        # handle any <include file="foo"> tags
+        include_times = [(filename, self._include_time(filename)) for filename in self._process_includes()]
+
+        problem_template_cache.set(key, (self.problem_text, deepcopy(self.tree), include_times))
+
+    def _include_time(self, filename):
+        """
+        Return the time that the included file was last modified, or None if it can't be found.
+        """
+        try:
+            return self.capa_system.filestore.getinfo(filename).get('modified_time')
+        except Exception:  # pylint: disable=broad-except
+            return None
+
     def _process_includes(self):
         """
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
         into our XML tree.  Fail gracefully if debugging.
+
+        Returns the names of the files which were (or, when debugging, should have been) included.
         """
+        filenames = []
         includes = self.tree.findall('.//include')
         for inc in includes:
             filename = inc.get('file')
             if filename is not None:
+                filenames.append(filename)
                 try:
                     # open using LoncapaSystem OSFS filestore
                     ifp = self.capa_system.filestore.open(filename)
@@ -575,6 +615,7 @@ class LoncapaProblem(object):
                 parent.insert(parent.index(inc), incxml)
                 parent.remove(inc)
                 log.debug('Included %s into %s' % (filename, self.problem_id))
+        return filenames
 
     def _extract_system_path(self, script):
         """
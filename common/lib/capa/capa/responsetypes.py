@@ -36,6 +36,7 @@ from shapely.geometry import Point, MultiPoint
 from dogapi import dog_stats_api
 
 # specific library imports
+import calc
 from calc import evaluator, UndefinedVariable
 from . import correctmap
 from .registry import TagRegistry
@@ -2305,6 +2306,38 @@ class FormulaResponse(LoncapaResponse):
         )
         return CorrectMap(self.answer_id, correctness)
 
+    def evaluate_samples(self, expression, var_dict_list):
+        """
+        Return the value of the compiled expression (see `calc.compile_expression`) for
+        each of the dictionaries of variable values in `var_dict_list`.
+
+        All of the samples are evaluated at once on numpy arrays of values if
+        the formula allows it, otherwise they're evaluated one by one.
+        """
+        values = None
+        if var_dict_list:
+            variables = {
+                name: numpy.array([var_dict[name] for var_dict in var_dict_list])
+                for name in var_dict_list[0]
+            }
+            # Some functions (e.g. factorial) don't take arrays and plain floats
+            # raise errors (e.g. dividing by zero) where numpy arrays give inf or
+            # nan, so fall back to evaluating each sample (to get the errors
+            # reported as usual) unless all the values are good.
+            try:
+                with numpy.errstate(all='ignore'):
+                    values = numpy.asarray(expression.evaluate(variables, {}))
+                    if values.shape == ():
+                        values = numpy.repeat(values, len(var_dict_list))
+                    if values.shape != (len(var_dict_list),) or not numpy.isfinite(values).all():
+                        values = None
+            except Exception:  # pylint: disable=broad-except
+                values = None
+
+        if values is None:
+            return [expression.evaluate(var_dict, {}) for var_dict in var_dict_list]
+        return list(values)
+
     def tupleize_answers(self, answer, var_dict_list):
         """
         Takes in an answer and a list of dictionaries mapping variables to values.
@@ -2313,56 +2346,48 @@ class FormulaResponse(LoncapaResponse):
         """
         _ = self.capa_system.i18n.ugettext
 
-        out = []
-        for var_dict in var_dict_list:
-            try:
-                out.append(evaluator(
-                    var_dict,
-                    dict(),
-                    answer,
-                    case_sensitive=self.case_sensitive,
-                ))
-            except UndefinedVariable as err:
+        try:
+            return self.evaluate_samples(calc.compile_expression(answer, self.case_sensitive), var_dict_list)
+        except UndefinedVariable as err:
+            log.debug(
+                'formularesponse: undefined variable in formula=%s',
+                cgi.escape(answer)
+            )
+            raise StudentInputError(
+                _("Invalid input: {bad_input} not permitted in answer.").format(bad_input=err.message)
+            )
+        except ValueError as err:
+            if 'factorial' in err.message:
+                # This is thrown when fact() or factorial() is used in a formularesponse answer
+                #   that tests on negative and/or non-integer inputs
+                # err.message will be: `factorial() only accepts integral values` or
+                # `factorial() not defined for negative values`
                 log.debug(
-                    'formularesponse: undefined variable in formula=%s',
+                    ('formularesponse: factorial function used in response '
+                     'that tests negative and/or non-integer inputs. '
+                     'Provided answer was: %s'),
                     cgi.escape(answer)
                 )
                 raise StudentInputError(
-                    _("Invalid input: {bad_input} not permitted in answer.").format(bad_input=err.message)
+                    _("factorial function not permitted in answer "
+                      "for this problem. Provided answer was: "
+                      "{bad_input}").format(bad_input=cgi.escape(answer))
                 )
-            except ValueError as err:
-                if 'factorial' in err.message:
-                    # This is thrown when fact() or factorial() is used in a formularesponse answer
-                    #   that tests on negative and/or non-integer inputs
-                    # err.message will be: `factorial() only accepts integral values` or
-                    # `factorial() not defined for negative values`
-                    log.debug(
-                        ('formularesponse: factorial function used in response '
-                         'that tests negative and/or non-integer inputs. '
-                         'Provided answer was: %s'),
-                        cgi.escape(answer)
-                    )
-                    raise StudentInputError(
-                        _("factorial function not permitted in answer "
-                          "for this problem. Provided answer was: "
-                          "{bad_input}").format(bad_input=cgi.escape(answer))
-                    )
-                # If non-factorial related ValueError thrown, handle it the same as any other Exception
-                log.debug('formularesponse: error %s in formula', err)
-                raise StudentInputError(
-                    _("Invalid input: Could not parse '{bad_input}' as a formula.").format(
-                        bad_input=cgi.escape(answer)
-                    )
+            # If non-factorial related ValueError thrown, handle it the same as any other Exception
+            log.debug('formularesponse: error %s in formula', err)
+            raise StudentInputError(
+                _("Invalid input: Could not parse '{bad_input}' as a formula.").format(
+                    bad_input=cgi.escape(answer)
                 )
-            except Exception as err:
-                # traceback.print_exc()
-                log.debug('formularesponse: error %s in formula', err)
-                raise StudentInputError(
-                    _("Invalid input: Could not parse '{bad_input}' as a formula").format(
-                        bad_input=cgi.escape(answer)
-                    )
+            )
+        except Exception as err:
+            # traceback.print_exc()
+            log.debug('formularesponse: error %s in formula', err)
+            raise StudentInputError(
+                _("Invalid input: Could not parse '{bad_input}' as a formula").format(
+                    bad_input=cgi.escape(answer)
                 )
-        return out
+            )
 
     def randomize_variables(self, samples):
         """
@@ -0,0 +1,114 @@
+"""
+A two-tier cache for safe_exec results.
+
+Many students get the same random seed (see MAX_RANDOMIZATION_BINS), so the
+same code runs with the same globals over and over.  A ResultCache keeps the
+most recent results in process, in front of a shared cache (e.g. memcached),
+and stores them compressed in both.
+
+"""
+
+import json
+import logging
+import time
+import zlib
+
+from dogapi import dog_stats_api
+
+from ..util import LRUCache
+
+log = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_SIZE = 1000
+
+
+class ResultCache(object):
+    """
+    A cache with the .get(key) and .set(key, value) methods safe_exec wants,
+    for json-serializable values.
+
+    Keeps `local_hits`, `shared_hits` and `misses` counters, and the total
+    `shared_seconds` spent talking to the shared cache, and reports them to
+    datadog as well.
+    """
+    def __init__(self, shared_cache=None, local_size=DEFAULT_LOCAL_SIZE):
+        """
+        `shared_cache` is an object with .get(key) and .set(key, value)
+        methods, or None to only cache results in this process.
+        """
+        self.shared_cache = shared_cache
+        self.local_cache = LRUCache(local_size)
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared_seconds = 0.0
+
+    def _timed(self, operation, method, *args):
+        """
+        Call `method` of the shared cache, timing it.
+        """
+        start = time.time()
+        try:
+            return getattr(self.shared_cache, method)(*args)
+        finally:
+            elapsed = time.time() - start
+            self.shared_seconds += elapsed
+            dog_stats_api.histogram('capa.safe_exec.cache.time', elapsed, tags=[u'operation:{}'.format(operation)])
+
+    def _count(self, result):
+        """
+        Report a lookup's result to datadog.
+        """
+        dog_stats_api.increment('capa.safe_exec.cache', tags=[u'result:{}'.format(result)])
+
+    def get(self, key):
+        """
+        Return the value stored for `key`, or None.
+        """
+        payload = self.local_cache.get(key)
+        if payload is not None:
+            self.local_hits += 1
+            self._count('local_hit')
+            return self.decode(payload)
+
+        if self.shared_cache is not None:
+            payload = self._timed('get', 'get', key)
+            if payload is not None:
+                try:
+                    value = self.decode(payload)
+                except (TypeError, ValueError, zlib.error):
+                    # Something else stored under our key, or it's been damaged.
+                    log.warning("Ignoring an undecodable safe_exec result in the cache for %s", key)
+                else:
+                    self.local_cache.set(key, payload)
+                    self.shared_hits += 1
+                    self._count('shared_hit')
+                    return value
+
+        self.misses += 1
+        self._count('miss')
+        return None
+
+    def set(self, key, value):
+        """
+        Store `value` for `key` in both tiers.
+        """
+        payload = self.encode(value)
+        self.local_cache.set(key, payload)
+        if self.shared_cache is not None:
+            self._timed('set', 'set', key, payload)
+
+    @staticmethod
+    def encode(value):
+        """
+        Compress `value` for storage.  Each get decodes a fresh copy, so callers
+        can't change the cached value by changing what they're given.
+        """
+        return zlib.compress(json.dumps(value))
+
+    @staticmethod
+    def decode(payload):
+        """
+        Undo `encode`.
+        """
+        return json.loads(zlib.decompress(payload))
@@ -4,9 +4,11 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from . import worker_pool
 from dogapi import dog_stats_api
 
 import hashlib
+import json
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -85,7 +87,8 @@ def safe_exec(code, globals_dict, random_seed=None, python_path=None, cache=None
 
     `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
     to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    and the random seed.  See result_cache.ResultCache for one which keeps recent
+    results in process too.
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -95,11 +98,12 @@ def safe_exec(code, globals_dict, random_seed=None, python_path=None, cache=None
     """
     # Check the cache for a previous result.
     if cache:
+        # json_safe has already made the globals into plain json types, so
+        # their json with sorted keys is canonical, and much quicker to make
+        # than hashing them piece by piece with update_hash.
         safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+        canonical = json.dumps([code, safe_globals], sort_keys=True)
+        key = "safe_exec.%r.%s" % (random_seed, hashlib.md5(canonical).hexdigest())
         cached = cache.get(key)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
@@ -120,11 +124,17 @@ def safe_exec(code, globals_dict, random_seed=None, python_path=None, cache=None
         exec_fn = codejail_safe_exec
 
     # Run the code!  Results are side effects in globals_dict.
+    # The pool's interpreters can't see the python_path directories.
+    pool = None if unsafely or python_path else worker_pool.get_pool(ASSUMED_IMPORTS)
     try:
-        exec_fn(
-            code_prolog + LAZY_IMPORTS + code, globals_dict,
-            python_path=python_path, slug=slug,
-        )
+        if pool is not None:
+            # The assumed imports are already loaded in the pool.
+            pool.safe_exec(code_prolog + code, globals_dict, slug=slug)
+        else:
+            exec_fn(
+                code_prolog + LAZY_IMPORTS + code, globals_dict,
+                python_path=python_path, slug=slug,
+            )
     except SafeExecException as e:
         emsg = e.message
     else:
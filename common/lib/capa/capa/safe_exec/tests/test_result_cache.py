@@ -0,0 +1,79 @@
+"""Test result_cache.py"""
+
+import unittest
+
+from mock import patch
+
+from capa.safe_exec import safe_exec
+from capa.safe_exec.result_cache import ResultCache
+
+
+class DictCache(object):
+    """A shared cache over a simple dict, for testing."""
+
+    def __init__(self):
+        self.cache = {}
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache[key] = value
+
+
+class TestResultCache(unittest.TestCase):
+    """Test the tiers of the result cache."""
+
+    def test_miss_then_local_hit(self):
+        shared = DictCache()
+        cache = ResultCache(shared)
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', (None, {'a': 3}))
+        self.assertEqual(cache.get('key'), [None, {'a': 3}])
+        self.assertEqual((cache.local_hits, cache.shared_hits, cache.misses), (1, 0, 1))
+
+    def test_shared_hit(self):
+        shared = DictCache()
+        ResultCache(shared).set('key', (None, {'a': 3}))
+
+        # Another process finds it in the shared cache, then keeps it itself.
+        cache = ResultCache(shared)
+        self.assertEqual(cache.get('key'), [None, {'a': 3}])
+        shared.cache.clear()
+        self.assertEqual(cache.get('key'), [None, {'a': 3}])
+        self.assertEqual((cache.local_hits, cache.shared_hits, cache.misses), (1, 1, 0))
+
+    def test_compressed(self):
+        shared = DictCache()
+        value = (None, {'a': "x" * 10000})
+        ResultCache(shared).set('key', value)
+        self.assertLess(len(shared.cache['key']), 1000)
+
+    def test_values_are_copies(self):
+        cache = ResultCache()
+        cache.set('key', (None, {'a': [1, 2]}))
+        cache.get('key')[1]['a'].append(3)
+        self.assertEqual(cache.get('key'), [None, {'a': [1, 2]}])
+
+    def test_local_size(self):
+        cache = ResultCache(local_size=1)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 2)
+
+    def test_undecodable_shared_value(self):
+        shared = DictCache()
+        shared.set('key', (None, {'a': 3}))
+        self.assertIsNone(ResultCache(shared).get('key'))
+
+    def test_safe_exec_runs_code_once(self):
+        cache = ResultCache(DictCache())
+        with patch('capa.safe_exec.safe_exec.codejail_safe_exec') as mock_exec:
+            mock_exec.side_effect = lambda code, globals_dict, **kwargs: globals_dict.update(a=17)
+            for __ in range(3):
+                g = {}
+                safe_exec("a = 17", g, random_seed=1, cache=cache)
+                self.assertEqual(g['a'], 17)
+        self.assertEqual(mock_exec.call_count, 1)
+        self.assertEqual((cache.local_hits, cache.misses), (2, 1))
@@ -0,0 +1,228 @@
+"""Test worker_pool.py"""
+
+import os
+import pwd
+import shutil
+import stat
+import sys
+import unittest
+
+from mock import patch
+from nose.plugins.skip import SkipTest
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException
+
+from capa.safe_exec.safe_exec import ASSUMED_IMPORTS
+from capa.safe_exec.worker_pool import Worker, WorkerPool
+
+
+class TestWorkerPool(unittest.TestCase):
+    """
+    Run code in a pool of (unsandboxed) interpreters.
+    """
+    def make_pool(self, **kwargs):
+        """Make a pool of one interpreter, which is stopped after the test."""
+        pool = WorkerPool([sys.executable, "-E", "-B"], 1, ASSUMED_IMPORTS, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def worker(self, pool):
+        """The pool's idle interpreter."""
+        return pool._idle.queue[0]  # pylint: disable=protected-access
+
+    def worker_pid(self, pool):
+        """The process id of the pool's idle interpreter."""
+        return self.worker(pool).process.pid
+
+    def test_set_values(self):
+        pool = self.make_pool()
+        g = {'x': 2}
+        pool.safe_exec("from __future__ import division\na = x / 4\nb = int(math.pi)", g)
+        self.assertEqual(g, {'x': 2, 'a': 0.5, 'b': 3})
+
+    def test_raising_exceptions(self):
+        pool = self.make_pool()
+        g = {}
+        with self.assertRaises(SafeExecException) as cm:
+            pool.safe_exec("a = 1\n1/0", g)
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+        self.assertEqual(g, {})
+
+    def test_interpreter_reused(self):
+        pool = self.make_pool()
+        pid = self.worker_pid(pool)
+        pool.safe_exec("a = 1", {})
+        with self.assertRaises(SafeExecException):
+            pool.safe_exec("1/0", {})
+        self.assertEqual(self.worker_pid(pool), pid)
+
+    def test_replaced_after_max_jobs(self):
+        pool = self.make_pool(max_jobs=2)
+        pid = self.worker_pid(pool)
+        pool.safe_exec("a = 1", {})
+        self.assertEqual(self.worker_pid(pool), pid)
+        pool.safe_exec("a = 1", {})
+        self.assertNotEqual(self.worker_pid(pool), pid)
+
+    def test_jobs_cant_change_later_jobs(self):
+        pool = self.make_pool()
+        pid = self.worker_pid(pool)
+        for code in [
+                "math.pi = 3",
+                "import sys; sys.path.append('/tmp')",
+                "__builtins__['len'] = 17",
+                "import sys; del sys.modules['math']; sys.modules['json'] = None",
+                "import sys; main = sys.modules['__main__']; main.run_job = main.same_state = None",
+                "import sys; sys.modules['__main__'].json.loads = lambda line: {'code': '', 'globals': {}}",
+        ]:
+            pool.safe_exec(code, {})
+            g = {}
+            pool.safe_exec(
+                "import json, sys\n"
+                "a = int(math.pi)\n"
+                "b = len('abc')\n"
+                "c = json.loads('[1]')\n"
+                "d = '/tmp' in sys.path\n",
+                g
+            )
+            self.assertEqual((g['a'], g['b'], g['c'], g['d']), (3, 3, [1], False))
+        self.assertEqual(self.worker_pid(pool), pid)
+
+    def test_jobs_cant_see_later_jobs(self):
+        pool = self.make_pool()
+        pool.safe_exec(
+            "import json, sys\n"
+            "main = sys.modules['__main__']\n"
+            "main.seen = []\n"
+            "loads = json.loads\n"
+            "def spy(line):\n"
+            "    main.seen.append(line)\n"
+            "    return loads(line)\n"
+            "json.loads = main.json.loads = spy\n",
+            {}
+        )
+        pool.safe_exec("a = password", {'password': "swordfish"})
+        g = {}
+        pool.safe_exec("import sys; seen = getattr(sys.modules['__main__'], 'seen', None)", g)
+        self.assertEqual(g['seen'], None)
+
+    def test_temp_files_are_cleared(self):
+        pool = self.make_pool()
+        pid = self.worker_pid(pool)
+        pool.safe_exec("import tempfile; open(tempfile.gettempdir() + '/left', 'w').close()", {})
+        g = {}
+        pool.safe_exec("import os, tempfile; files = os.listdir(tempfile.gettempdir())", g)
+        self.assertEqual(g['files'], [])
+        self.assertEqual(self.worker_pid(pool), pid)
+
+    def test_replaced_after_leaving_files(self):
+        pool = self.make_pool()
+        pid = self.worker_pid(pool)
+        pool.safe_exec("open('left', 'w').close()", {})
+        self.assertNotEqual(self.worker_pid(pool), pid)
+        g = {}
+        pool.safe_exec("import os; files = os.listdir('.')", g)
+        self.assertEqual(g['files'], ['tmp'])
+
+    def test_working_directory(self):
+        # The sandbox user has to be able to read it, and write to its tmp.
+        pool = self.make_pool()
+        tmpdir = self.worker(pool).tmpdir
+        self.assertEqual(stat.S_IMODE(os.stat(tmpdir).st_mode), 0755)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.join(tmpdir, "tmp")).st_mode), 0777)
+        g = {}
+        pool.safe_exec("import os, tempfile; cwd = os.getcwd(); tmp = tempfile.gettempdir()", g)
+        self.assertEqual(os.path.realpath(g['cwd']), os.path.realpath(tmpdir))
+        self.assertEqual(os.path.realpath(g['tmp']), os.path.realpath(os.path.join(tmpdir, "tmp")))
+
+    def test_timeout(self):
+        pool = self.make_pool(limits={"REALTIME": 1})
+        pid = self.worker_pid(pool)
+        with self.assertRaises(SafeExecException) as cm:
+            pool.safe_exec("while True: pass", {})
+        self.assertIn("timed out", cm.exception.message)
+        self.assertNotEqual(self.worker_pid(pool), pid)
+
+    def test_cpu_limit(self):
+        pool = self.make_pool(limits={"CPU": 1})
+        pid = self.worker_pid(pool)
+        with self.assertRaises(SafeExecException) as cm:
+            pool.safe_exec("while True: pass", {})
+        self.assertIn("killed", cm.exception.message)
+        self.assertEqual(self.worker_pid(pool), pid)
+        g = {}
+        pool.safe_exec("a = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_printing(self):
+        pool = self.make_pool()
+        g = {}
+        pool.safe_exec("import sys\nprint '{}'\nsys.__stdout__.write('{}\\n')\nsys.__stdout__.flush()\na = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_writing_to_the_pipe(self):
+        pool = self.make_pool()
+        with self.assertRaises(SafeExecException):
+            pool.safe_exec(
+                "import os\n"
+                "for fd in range(3, 64):\n"
+                "    try:\n"
+                "        os.write(fd, '{}\\n')\n"
+                "    except OSError:\n"
+                "        pass\n",
+                {}
+            )
+        g = {}
+        pool.safe_exec("a = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_reading_the_pipe(self):
+        pool = self.make_pool()
+        g = {}
+        pool.safe_exec("import sys; a = sys.stdin.read()", g)
+        self.assertEqual(g['a'], "")
+
+    def test_started_as_the_sandbox_user(self):
+        with patch("capa.safe_exec.worker_pool.subprocess.Popen") as popen:
+            worker = Worker(["/sandbox/bin/python", "-E", "-B"], ASSUMED_IMPORTS, {}, user="sandbox")
+        self.addCleanup(shutil.rmtree, worker.tmpdir)
+        argv = popen.call_args[0][0]
+        self.assertEqual(argv[:6], ["sudo", "-u", "sandbox", "TMPDIR=tmp", "/sandbox/bin/python", "-E"])
+        self.assertEqual(popen.call_args[1]['cwd'], worker.tmpdir)
+
+
+class TestSandboxedWorkerPool(unittest.TestCase):
+    """
+    Run code in a pool of interpreters sandboxed as CodeJail is configured.
+    """
+    def setUp(self):
+        super(TestSandboxedWorkerPool, self).setUp()
+        if not jail_code.is_configured("python"):
+            raise SkipTest
+        python = jail_code.COMMANDS["python"]
+        self.pool = WorkerPool(
+            python['cmdline_start'], 1, ASSUMED_IMPORTS, limits=jail_code.LIMITS, user=python.get('user'),
+        )
+        self.addCleanup(self.pool.close)
+
+    def test_working_directory(self):
+        g = {}
+        self.pool.safe_exec(
+            "import os, tempfile\n"
+            "files = os.listdir('.')\n"
+            "fd, path = tempfile.mkstemp()\n"
+            "os.close(fd)\n"
+            "tmp = os.listdir(tempfile.gettempdir())\n",
+            g
+        )
+        self.assertEqual(g['files'], ['tmp'])
+        self.assertEqual(len(g['tmp']), 1)
+
+    def test_runs_as_the_sandbox_user(self):
+        user = jail_code.COMMANDS["python"].get('user')
+        if not user:
+            raise SkipTest
+        g = {}
+        self.pool.safe_exec("import os; uid = os.getuid(); euid = os.geteuid()", g)
+        self.assertEqual((g['uid'], g['euid']), (pwd.getpwnam(user).pw_uid,) * 2)
@@ -0,0 +1,204 @@
+"""
+The main loop of a warm sandboxed interpreter for capa's safe_exec.
+
+This file isn't imported: worker_pool.py runs its source in the sandbox as
+`python -c <source> <json config>`.  The interpreter imports the modules capa
+code assumes up front, then reads jobs from stdin, one json object per line,
+and writes one json object per line to stdout with the result of each.
+
+The interpreter never runs a job itself.  It forks a child for each job, and
+the child reads the job, runs it, writes its result, and exits, so nothing a
+job does to its interpreter can be seen by later jobs or by this loop.  Once
+the child has exited, this loop clears the temp directory and tells the pool
+the job is done, exiting if the job left anything behind that it couldn't
+clear, so that the pool replaces it with a fresh interpreter.
+
+"""
+
+import errno
+import json
+import os
+import resource
+import shutil
+import sys
+import traceback
+
+
+OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+BAD_KEYS = ("__builtins__",)
+
+# From <linux/prctl.h>.
+PR_SET_DUMPABLE = 4
+
+# How a child tells us there are no more jobs.
+EXIT_NO_MORE_JOBS = 3
+
+
+def jsonable(value):
+    """
+    Return whether `value` can be sent back to the calling process.
+    """
+    if not isinstance(value, OK_TYPES):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:  # pylint: disable=broad-except
+        return False
+    return True
+
+
+def write_json(fd, value):
+    """
+    Write `value` to the file descriptor `fd` as one line of json.
+    """
+    data = json.dumps(value) + "\n"
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def read_line(fd):
+    """
+    Read a line from the file descriptor `fd`, or "" at the end of the file.
+    """
+    data = ""
+    while not data.endswith("\n"):
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def make_undumpable():
+    """
+    Jobs run as the same user as this process: stop them attaching to it, or
+    reading its memory or its file descriptors through /proc.
+    """
+    try:
+        import ctypes
+        ctypes.CDLL(None).prctl(PR_SET_DUMPABLE, 0, 0, 0, 0)
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+
+def set_limit(limit, value):
+    """
+    Limit the resource `limit` to `value`, within the hard limit we were given.
+    """
+    __, hard = resource.getrlimit(limit)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(limit, (value, value))
+
+
+def run_job(config, assumed):
+    """
+    In a forked child: read one job from stdin, run it, and write its result
+    to stdout.
+    """
+    line = read_line(0)
+    if not line:
+        os._exit(EXIT_NO_MORE_JOBS)  # pylint: disable=protected-access
+
+    # Keep the job's code off our pipes: it mustn't read the jobs after it,
+    # and can only garble its own result.
+    result_fd = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    # No subprocesses, which could outlive the job, and CPU time for this job
+    # alone.
+    set_limit(resource.RLIMIT_NPROC, 0)
+    if config.get('cpu_limit'):
+        set_limit(resource.RLIMIT_CPU, config['cpu_limit'])
+
+    job = json.loads(line)
+    result = {'nonce': job['nonce']}
+    g_dict = job['globals']
+    g_dict.update(assumed)
+    try:
+        exec(compile(job['code'], "jailed_code", "exec", 0, True), g_dict)  # pylint: disable=exec-used
+    except BaseException:  # pylint: disable=broad-except
+        result['error'] = traceback.format_exc()
+    else:
+        result['globals'] = {
+            key: value
+            for key, value in g_dict.iteritems()
+            if key not in BAD_KEYS and jsonable(value)
+        }
+    write_json(result_fd, result)
+
+
+def clear_directory(path):
+    """
+    Remove everything in the directory `path`, returning whether we could.
+    """
+    for name in os.listdir(path):
+        entry = os.path.join(path, name)
+        try:
+            if os.path.isdir(entry) and not os.path.islink(entry):
+                shutil.rmtree(entry)
+            else:
+                os.remove(entry)
+        except OSError:
+            return False
+    return not os.listdir(path)
+
+
+def wait_for(pid):
+    """
+    Wait for the child `pid` to exit, and return its status.
+    """
+    while True:
+        try:
+            return os.waitpid(pid, 0)[1]
+        except OSError as err:
+            if err.errno != errno.EINTR:
+                raise
+
+
+def main():
+    """
+    Import the assumed modules, then run each job in a child of its own until
+    stdin is closed or a job leaves files behind.
+    """
+    config = json.loads(sys.argv[1])
+    make_undumpable()
+
+    # Temp files go in a directory we can clear after each job.
+    tmpdir = os.path.abspath(config['tmpdir'])
+    os.environ['TMPDIR'] = tmpdir
+    files = sorted(os.listdir('.'))
+
+    assumed = {}
+    for name, modname in config['assumed_imports']:
+        try:
+            __import__(modname)
+        except Exception:  # pylint: disable=broad-except
+            # Jobs which use it will fail, just as they would without the pool.
+            continue
+        assumed[name] = sys.modules[modname]
+
+    write_json(1, {'ready': True})
+
+    while True:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_job(config, assumed)
+            finally:
+                os._exit(0)  # pylint: disable=protected-access
+
+        status = wait_for(pid)
+        if os.WIFEXITED(status) and os.WEXITSTATUS(status) == EXIT_NO_MORE_JOBS:
+            break
+        leaked = not clear_directory(tmpdir) or sorted(os.listdir('.')) != files
+        write_json(1, {'done': True, 'status': status, 'leaked': leaked})
+        if leaked:
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+A pool of warm sandboxed Python interpreters for capa's safe_exec.
+
+CodeJail starts a fresh sandboxed interpreter for each execution, which then
+has to import numpy and friends before it can run a line of the course's code.
+The interpreters in this pool are started ahead of time with the assumed
+imports already loaded (see worker.py), and each runs many executions, taking
+them over a pipe and forking a fresh child of itself for each.  An interpreter
+is replaced after `max_jobs` executions, as soon as an execution leaves files
+behind, or if it fails to answer in time.
+
+The pool is off unless `configure` is called with a size, and is only used
+when CodeJail is configured to run Python.
+
+"""
+
+import errno
+import json
+import logging
+import os
+import resource
+import select
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from Queue import Queue, Empty
+
+from codejail import jail_code
+from codejail.safe_exec import json_safe, SafeExecException
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_JOBS = 100
+
+# How long to wait for a new interpreter to import everything.
+STARTUP_TIMEOUT = 30
+
+# We'll need the code from worker.py to start the interpreters, so read it now.
+worker_py_file = os.path.join(os.path.dirname(__file__), "worker.py")
+WORKER_SOURCE = open(worker_py_file).read()
+
+
+class WorkerError(Exception):
+    """
+    Raised when a pooled interpreter dies, hangs, or doesn't make sense.
+    """
+    pass
+
+
+class Worker(object):
+    """
+    One sandboxed interpreter running worker.py.
+    """
+    def __init__(self, command, assumed_imports, limits, user=None):
+        self.user = user
+        self.limits = limits
+        self.jobs = 0
+        self.ready = False
+        self._buffer = ""
+
+        # As CodeJail does: the sandbox user needs to be able to read the
+        # working directory, and write to the temp directory in it.
+        self.tmpdir = tempfile.mkdtemp(prefix="codejail-")
+        os.chmod(self.tmpdir, 0755)
+        tmptmp = os.path.join(self.tmpdir, "tmp")
+        os.mkdir(tmptmp)
+        os.chmod(tmptmp, 0777)
+
+        self._devnull = open(os.devnull, "w")
+        config = {
+            'assumed_imports': assumed_imports,
+            'cpu_limit': limits.get("CPU"),
+            'tmpdir': "tmp",
+        }
+        argv = command + ["-c", WORKER_SOURCE, json.dumps(config)]
+        if user:
+            # Run it as the sandbox user, as CodeJail does.  sudo resets the
+            # environment, so TMPDIR has to be passed on the command line.
+            argv = ["sudo", "-u", user, "TMPDIR=tmp"] + argv
+        self.process = subprocess.Popen(
+            argv,
+            cwd=self.tmpdir,
+            env={'TMPDIR': "tmp"},
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._devnull,
+            preexec_fn=self._set_process_limits,
+        )
+
+    def _set_process_limits(self):
+        """
+        Run in the child: give it a process group of its own, so the whole
+        group can be killed, and limit its memory.
+        """
+        os.setsid()
+        if self.limits.get("VMEM"):
+            resource.setrlimit(resource.RLIMIT_AS, (self.limits["VMEM"], self.limits["VMEM"]))
+
+    def _read_line(self, timeout):
+        """
+        Read a line written by the interpreter, waiting no more than `timeout`
+        seconds for it (or forever if `timeout` is None).
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        fileno = self.process.stdout.fileno()
+        while "\n" not in self._buffer:
+            remaining = None if deadline is None else max(deadline - time.time(), 0)
+            try:
+                readable, __, __ = select.select([fileno], [], [], remaining)
+            except select.error as err:
+                if err.args[0] == errno.EINTR:
+                    continue
+                raise
+            if not readable:
+                raise WorkerError("timed out")
+            data = os.read(fileno, 65536)
+            if not data:
+                raise WorkerError("the interpreter exited")
+            self._buffer += data
+        line, self._buffer = self._buffer.split("\n", 1)
+        return line
+
+    def _read_json(self, timeout):
+        """
+        Read a json object written by the interpreter.
+        """
+        line = self._read_line(timeout)
+        try:
+            message = json.loads(line)
+        except ValueError:
+            raise WorkerError("unexpected output")
+        if not isinstance(message, dict):
+            raise WorkerError("unexpected output")
+        return message
+
+    def run(self, code, globals_dict, timeout=None):
+        """
+        Run `code` with `globals_dict`, as codejail's safe_exec would, and
+        return the result: a dict with the json-safe resulting `globals` or
+        the `error` traceback, and whether the job `leaked` files.
+        """
+        if not self.ready:
+            if not self._read_json(STARTUP_TIMEOUT).get('ready'):
+                raise WorkerError("unexpected output")
+            self.ready = True
+
+        nonce = uuid.uuid4().hex
+        job = json.dumps({'nonce': nonce, 'code': code, 'globals': json_safe(globals_dict)})
+        self.jobs += 1
+        try:
+            self.process.stdin.write(job + "\n")
+            self.process.stdin.flush()
+        except IOError:
+            raise WorkerError("the interpreter exited")
+
+        # The job's child writes its result, then the interpreter says when
+        # the child is gone.  Anything else means the code has been writing to
+        # our pipe itself.
+        deadline = None if timeout is None else time.time() + timeout
+        result = None
+        while True:
+            remaining = None if deadline is None else max(deadline - time.time(), 0)
+            message = self._read_json(remaining)
+            if message.get('done'):
+                break
+            if result is not None or message.get('nonce') != nonce:
+                raise WorkerError("unexpected output")
+            result = message
+
+        if result is None:
+            # The child died without a result: killed for using too much CPU,
+            # say.
+            status = message.get('status', 0)
+            if os.WIFSIGNALED(status):
+                error = "the process was killed by signal %d" % os.WTERMSIG(status)
+            else:
+                error = "the process exited with status %d" % os.WEXITSTATUS(status)
+            result = {'error': error}
+        result['leaked'] = message.get('leaked', True)
+        return result
+
+    def stop(self):
+        """
+        Kill the interpreter, and anything it has started.
+        """
+        if self.process.poll() is None:
+            try:
+                pgid = os.getpgid(self.process.pid)
+                if self.user:
+                    # They belong to the sandbox user, so we can't signal them.
+                    subprocess.call(["sudo", "pkill", "-9", "-g", str(pgid)])
+                else:
+                    os.killpg(pgid, signal.SIGKILL)
+            except OSError:
+                # It exited in the meantime.
+                pass
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+        self._devnull.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class WorkerPool(object):
+    """
+    A fixed number of Workers, each taken by one execution at a time.
+    """
+    def __init__(self, command, size, assumed_imports, max_jobs=DEFAULT_MAX_JOBS, limits=None, user=None):
+        """
+        `command` is the command line which starts a (sandboxed) python, and
+        `assumed_imports` the (name, module name) pairs its code expects.
+
+        `limits` are CodeJail's limits: "CPU" seconds per execution, "REALTIME"
+        seconds to wait for an execution, and "VMEM" bytes per interpreter.
+
+        `user` is the sandbox user to run the interpreters as with sudo, or
+        None to run them as ourselves.
+        """
+        self.command = list(command)
+        self.size = size
+        self.max_jobs = max_jobs
+        self.limits = dict(limits or {})
+        self.user = user
+        self.assumed_imports = assumed_imports
+        self.closed = False
+        self._idle = Queue()
+        for __ in xrange(size):
+            self._idle.put(self._start_worker())
+
+    def _start_worker(self):
+        """
+        Start a new interpreter.
+        """
+        return Worker(self.command, self.assumed_imports, self.limits, user=self.user)
+
+    def safe_exec(self, code, globals_dict, slug=None):
+        """
+        Execute `code` in one of the pool's interpreters, with the same
+        results as codejail's safe_exec: changes to the json-safe globals
+        are made in `globals_dict`, and a SafeExecException is raised if the
+        code fails.
+
+        The assumed imports are already loaded in the interpreters, so `code`
+        shouldn't include LAZY_IMPORTS.
+        """
+        worker = self._idle.get()
+        try:
+            result = worker.run(code, globals_dict, timeout=self.limits.get("REALTIME") or None)
+        except WorkerError as err:
+            log.warning("Pooled sandbox for %s failed: %s", slug, err)
+            self._replace(worker)
+            raise SafeExecException("Couldn't execute jailed code: %s" % err)
+        except Exception:
+            self._replace(worker)
+            raise
+
+        if result['leaked']:
+            log.info("Recycling pooled sandbox after %s left files behind", slug)
+            self._replace(worker)
+        elif worker.jobs >= self.max_jobs:
+            self._replace(worker)
+        else:
+            self._release(worker)
+
+        if 'error' in result:
+            raise SafeExecException("Couldn't execute jailed code: %s" % result['error'])
+        globals_dict.update(result['globals'])
+
+    def _replace(self, worker):
+        """
+        Stop `worker`, and put a new one in the pool in its place.
+        """
+        try:
+            worker.stop()
+        finally:
+            if not self.closed:
+                self._release(self._start_worker())
+
+    def _release(self, worker):
+        """
+        Put `worker` back in the pool for the next execution.
+        """
+        if self.closed:
+            worker.stop()
+        else:
+            self._idle.put(worker)
+
+    def close(self):
+        """
+        Stop all of the interpreters, those in use as soon as they're done.
+        """
+        self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except Empty:
+                break
+
+
+_config = {}
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def configure(size, max_jobs=DEFAULT_MAX_JOBS):
+    """
+    Run safe_exec in a pool of `size` warm interpreters, each replaced after
+    `max_jobs` executions.  A size of 0 turns the pool off.
+    """
+    global _pool  # pylint: disable=global-statement
+    with _pool_lock:
+        _config.update(size=size, max_jobs=max_jobs)
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
+
+
+def get_pool(assumed_imports):
+    """
+    Return the pool for this process, starting it if need be with interpreters
+    which import `assumed_imports`, or None if there isn't to be one.
+    """
+    global _pool, _pool_pid  # pylint: disable=global-statement
+    if not _config.get('size') or not jail_code.is_configured("python"):
+        return None
+    with _pool_lock:
+        # A pool inherited across a fork talks to the parent's interpreters.
+        if _pool is None or _pool_pid != os.getpid():
+            python = jail_code.COMMANDS["python"]
+            _pool = WorkerPool(
+                python['cmdline_start'], _config['size'], assumed_imports,
+                max_jobs=_config['max_jobs'], limits=jail_code.LIMITS, user=python.get('user'),
+            )
+            _pool_pid = os.getpid()
+        return _pool
@@ -54,6 +54,31 @@ class CapaHtmlRenderTest(unittest.TestCase):
         self.assertEqual(test_element.tag, "test")
         self.assertEqual(test_element.text, "Test include")
 
+    def test_parsed_problem_reused(self):
+        xml_str = "<problem><p>Parse me once</p></problem>"
+        first = new_loncapa_problem(xml_str, capa_system=self.capa_system)
+        with mock.patch('capa.capa_problem.etree.XML', wraps=etree.XML) as parse:
+            second = new_loncapa_problem(xml_str, capa_system=self.capa_system, seed=1)
+        self.assertFalse(parse.called)
+        self.assertEqual(etree.tostring(first.tree), etree.tostring(second.tree))
+        # each problem has its own copy of the tree
+        self.assertIsNot(first.tree, second.tree)
+
+    def test_changed_include_reparsed(self):
+        self._create_test_file('test_include_changed.xml', '<test>Before</test>')
+        xml_str = '<problem><include file="test_include_changed.xml"/></problem>'
+        problem = new_loncapa_problem(xml_str, capa_system=self.capa_system)
+        self.assertEqual(problem.tree.find('test').text, 'Before')
+
+        test_fp = self.capa_system.filestore.open('test_include_changed.xml', 'w')
+        test_fp.write('<test>After</test>')
+        test_fp.close()
+        # make sure the modification time moves on
+        path = self.capa_system.filestore.getsyspath('test_include_changed.xml')
+        os.utime(path, (os.path.getatime(path), os.path.getmtime(path) + 10))
+        problem = new_loncapa_problem(xml_str, capa_system=self.capa_system)
+        self.assertEqual(problem.tree.find('test').text, 'After')
+
     def test_process_outtext(self):
         # Generate some XML with <startouttext /> and <endouttext />
         xml_str = textwrap.dedent("""
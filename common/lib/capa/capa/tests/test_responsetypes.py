@@ -496,6 +496,52 @@ class FormulaResponseTest(ResponseTest):
         self.assertTrue(problem.responders.values()[0].validate_answer('14*x'))
         self.assertFalse(problem.responders.values()[0].validate_answer('3*y+2*x'))
 
+    def test_samples_evaluated_together(self):
+        """
+        Test that each formula is evaluated for all of the samples at once.
+        """
+        sample_dict = {'x': (-10, 10), 'y': (-10, 10)}
+        problem = self.build_problem(sample_dict=sample_dict,
+                                     num_samples=10,
+                                     tolerance=0.01,
+                                     answer="x+2*y")
+        evaluate_expression = calc.CompiledExpression.evaluate
+        with mock.patch.object(calc.CompiledExpression, 'evaluate', autospec=True,
+                               side_effect=evaluate_expression) as evaluate:
+            self.assert_grade(problem, "2*x - x + y + y", "correct")
+        self.assertEqual(evaluate.call_count, 2)
+
+    def test_unvectorizable_formula(self):
+        """
+        Test that formulas using functions which don't take arrays are still
+        evaluated a sample at a time.
+        """
+        sample_dict = {'x': (1, 1)}
+        problem = self.build_problem(sample_dict=sample_dict,
+                                     num_samples=5,
+                                     tolerance=0.01,
+                                     answer="fact(x+2)")
+        self.assert_grade(problem, "6*x", "correct")
+        self.assert_grade(problem, "3*x", "incorrect")
+
+    def test_instructor_formula_parsed_once(self):
+        """
+        Test that the instructor's formula is only parsed once.
+        """
+        calc.expression_cache.clear()
+        sample_dict = {'x': (-10, 10)}
+        problem = self.build_problem(sample_dict=sample_dict,
+                                     num_samples=10,
+                                     tolerance=0.01,
+                                     answer="3*x")
+        parse_algebra = calc.ParseAugmenter.parse_algebra
+        with mock.patch.object(calc.ParseAugmenter, 'parse_algebra', autospec=True,
+                               side_effect=parse_algebra) as parse:
+            self.assert_grade(problem, "x+x+x", "correct")
+            self.assert_grade(problem, "x+x", "incorrect")
+        # once for the instructor's formula, and once for each student answer
+        self.assertEqual(parse.call_count, 3)
+
 
 class StringResponseTest(ResponseTest):
     from capa.tests.response_xml_factory import StringResponseXMLFactory
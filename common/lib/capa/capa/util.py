@@ -1,4 +1,6 @@
+
 from calc import evaluator
+from calc.lru import LRUCache  # pylint: disable=unused-import
 from cmath import isinf
 
 #-----------------------------------------------------------------------------
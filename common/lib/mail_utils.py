@@ -2,10 +2,23 @@
 Utilities related to mailing.
 """
 
+import re
 import textwrap
 
 MAX_LINE_LENGTH = 900
 
+# The last run of whitespace in a string, and whatever follows it
+LAST_WHITESPACE_RE = re.compile(r'\s+\S*\Z')
+
+
+def _wrapper(width):
+    """
+    The TextWrapper which wrap_message wraps each line with.
+    """
+    return textwrap.TextWrapper(
+        width, expand_tabs=False, replace_whitespace=False, drop_whitespace=False, break_on_hyphens=False
+    )
+
 
 def wrap_message(message, width=MAX_LINE_LENGTH):
     """
@@ -13,10 +26,33 @@ def wrap_message(message, width=MAX_LINE_LENGTH):
     exceeds a certain limit (the exact limit varies). Sendmail goes so far as to add '!\n' after the 990th character in
     a line. To ensure that messages look consistent this helper function wraps long lines to a conservative length.
     """
+    wrapper = _wrapper(width)
     lines = message.split('\n')
-    wrapped_lines = [textwrap.fill(
-        line, width, expand_tabs=False, replace_whitespace=False, drop_whitespace=False, break_on_hyphens=False
-    ) for line in lines]
+    wrapped_lines = [wrapper.fill(line) for line in lines]
     wrapped_message = '\n'.join(wrapped_lines)
 
     return wrapped_message
+
+
+def wrap_line_start(line, end, width=MAX_LINE_LENGTH):
+    """
+    Split a `line` of a message (with no newlines) into the lines that
+    wrap_message would start it with whatever follows position `end`, and
+    the rest of the line, from where they stop.
+
+    For text that ends differently each time it's wrapped, e.g. it has a
+    name filled in: wrapping the start once, and the rest each time, gives
+    the same as wrapping all of it.
+    """
+    # The line breaks are chosen greedily, so the ones before the last run
+    # of whitespace that's certainly ahead of `end` don't depend on what
+    # comes after it.
+    match = LAST_WHITESPACE_RE.search(line[:end])
+    if match is None:
+        return [], line
+    lines = _wrapper(width).wrap(line[:match.start()])
+    if len(lines) < 2:
+        return [], line
+    start_lines = lines[:-1]
+    # Nothing is dropped or changed in wrapping, so the lines add up to the line
+    return start_lines, line[sum(len(start_line) for start_line in start_lines):]
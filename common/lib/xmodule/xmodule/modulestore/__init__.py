@@ -405,6 +405,14 @@ class ModuleStoreWriteBase(ModuleStoreReadBase, ModuleStoreWrite):
         """
         raise NotImplementedError
 
+    def update_items(self, xblocks, user_id=None, allow_not_found=False):
+        """
+        Update the persisted reprs of several xblocks, as update_item would. Stores which can
+        write many items at once more cheaply than one at a time override this.
+        """
+        for xblock in xblocks:
+            self.update_item(xblock, user_id, allow_not_found=allow_not_found)
+
     def delete_item(self, location, user_id=None, delete_all_versions=False, delete_children=False, force=False):
         """
         Delete an item from persistence. Pass the user's unique id which the persistent store
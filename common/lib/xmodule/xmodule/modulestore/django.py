@@ -62,9 +62,15 @@ def create_modulestore_instance(engine, doc_store_config, options, i18n_service=
     except InvalidCacheBackendError:
         metadata_inheritance_cache = get_cache('default')
 
+    try:
+        structure_cache = get_cache('split_mongo_structures')
+    except InvalidCacheBackendError:
+        structure_cache = None
+
     return class_(
         metadata_inheritance_cache_subsystem=metadata_inheritance_cache,
         request_cache=request_cache,
+        structure_cache=structure_cache,
         xblock_mixins=getattr(settings, 'XBLOCK_MIXINS', ()),
         xblock_select=getattr(settings, 'XBLOCK_SELECT_FUNCTION', None),
         doc_store_config=doc_store_config,
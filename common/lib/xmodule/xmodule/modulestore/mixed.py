@@ -6,6 +6,7 @@ In this way, courses can be served up both - say - XMLModuleStore or MongoModule
 """
 
 import logging
+from collections import defaultdict
 from uuid import uuid4
 from opaque_keys import InvalidKeyError
 
@@ -302,6 +303,17 @@ class MixedModuleStore(ModuleStoreWriteBase):
         store = self._get_modulestore_for_courseid(course_id)
         return store.update_item(xblock, user_id)
 
+    def update_items(self, xblocks, user_id=None, allow_not_found=False):
+        """
+        Update the persisted versions of several xblocks, handing each store its xblocks in one go.
+        """
+        xblocks_by_store = defaultdict(list)
+        for xblock in xblocks:
+            store = self._get_modulestore_for_courseid(xblock.scope_ids.usage_id.course_key)
+            xblocks_by_store[store].append(xblock)
+        for store, store_xblocks in xblocks_by_store.iteritems():
+            store.update_items(store_xblocks, user_id, allow_not_found=allow_not_found)
+
     def delete_item(self, location, user_id=None, **kwargs):
         """
         Delete the given item from persistence. kwargs allow modulestore specific parameters.
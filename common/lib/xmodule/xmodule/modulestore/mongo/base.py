@@ -15,8 +15,9 @@ structure:
 import pymongo
 import sys
 import logging
-import copy
 import re
+import time
+from functools import partial
 
 from bson.son import SON
 from fs.osfs import OSFS
@@ -40,6 +41,10 @@ from xmodule.modulestore.locations import SlashSeparatedCourseKey
 
 log = logging.getLogger(__name__)
 
+# Loading a course to this depth (course, chapters, sequentials, verticals, and their contents)
+# pulls in nearly all of its blocks, so it's quicker to fetch them all at once
+DEFAULT_COURSE_PREFETCH_DEPTH = 4
+
 
 class InvalidWriteError(Exception):
     """
@@ -108,6 +113,109 @@ class MongoKeyValueStore(InheritanceKeyValueStore):
             return False
 
 
+class MetadataInheritanceTree(object):
+    """
+    The metadata which each block in a mongo course inherits, kept in a compact form: the
+    container each block is a child of, and each container's own inheritable metadata (if any).
+
+    What a block inherits is worked out the first time it's asked for by overlaying the
+    containers' metadata from the course down, and is shared with any descendants which don't
+    add metadata of their own. So, neither computing nor caching the tree needs a copy of the
+    metadata for every block. The values handed out must not be modified.
+    """
+    # bump this when the cached form changes so that old cache entries are recomputed
+    FORMAT_VERSION = 2
+
+    def __init__(self, parents=None, metadata=None):
+        """
+        parents: a dict mapping location urls to the url of their parent container
+
+        metadata: a dict mapping container urls to their own inheritable metadata
+        """
+        self.parents = parents if parents is not None else {}
+        self.metadata = metadata if metadata is not None else {}
+        self._inherited = {}
+
+    @classmethod
+    def from_cache(cls, cached):
+        """
+        Rebuild a tree from the output of to_cache, or return None if cached isn't a tree in
+        the current format.
+        """
+        if not isinstance(cached, dict) or cached.get('version') != cls.FORMAT_VERSION:
+            return None
+        return cls(cached['parents'], cached['metadata'])
+
+    def to_cache(self):
+        """
+        Return the tree as a dict which can be stored in a cache
+        """
+        return {'version': self.FORMAT_VERSION, 'parents': self.parents, 'metadata': self.metadata}
+
+    def copy(self):
+        """
+        Return a copy of this tree which can be changed without affecting it
+        """
+        return MetadataInheritanceTree(dict(self.parents), dict(self.metadata))
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, MetadataInheritanceTree) and
+            self.parents == other.parents and self.metadata == other.metadata
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def set_container(self, url, metadata, children):
+        """
+        Record the inheritable metadata set on the container at url and its children
+        """
+        if metadata:
+            self.metadata[url] = metadata
+        else:
+            self.metadata.pop(url, None)
+        for child in children:
+            self.parents[child] = url
+        self._inherited = {}
+
+    def remove_container(self, url):
+        """
+        Forget the metadata of the container at url (e.g., because it's been deleted). Its children
+        are left as they are, as they're no longer reachable from the course.
+        """
+        self.metadata.pop(url, None)
+        self._inherited = {}
+
+    def get(self, url, default=None):
+        """
+        Return the dict of metadata which the block at url inherits (including that set on the block
+        itself, if it's a container), or default if the tree doesn't know about the block.
+        """
+        if url not in self.parents and url not in self.metadata:
+            return default
+
+        # walk up to the nearest ancestor whose inherited metadata is already known (or the top)
+        chain = []
+        seen = set()
+        current = url
+        while current is not None and current not in self._inherited and current not in seen:
+            seen.add(current)
+            chain.append(current)
+            current = self.parents.get(current)
+        # a cycle of parents can't inherit anything from above
+        inherited = self._inherited.get(current, {})
+
+        # and then overlay each container's own metadata back down to url
+        for block_url in reversed(chain):
+            own_metadata = self.metadata.get(block_url)
+            if own_metadata:
+                inherited = dict(inherited)
+                inherited.update(own_metadata)
+            self._inherited[block_url] = inherited
+        return self._inherited[url]
+
+
 class CachingDescriptorSystem(MakoDescriptorSystem):
     """
     A system that has a cache of module json that it will use to load modules
@@ -269,6 +377,9 @@ class MongoModuleStore(ModuleStoreWriteBase):
     """
     reference_type = Location
 
+    # the parts of a block's record which _cache_children needs
+    CACHE_CHILDREN_FIELDS = {'_id': True, 'metadata': True, 'definition': True}
+
     # TODO (cpennington): Enable non-filesystem filestores
     # pylint: disable=C0103
     # pylint: disable=W0201
@@ -276,9 +387,12 @@ class MongoModuleStore(ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None,
+                 course_prefetch_depth=DEFAULT_COURSE_PREFETCH_DEPTH,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param course_prefetch_depth: when a course is loaded to this depth or more (or to all depths),
+            fetch all of its blocks in one query rather than a level at a time. None never does.
         """
 
         super(MongoModuleStore, self).__init__(**kwargs)
@@ -322,23 +436,35 @@ class MongoModuleStore(ModuleStoreWriteBase):
         self.i18n_service = i18n_service
 
         self.ignore_write_events_on_courses = set()
+        self.course_prefetch_depth = course_prefetch_depth
+        self._container_block_types = None
 
-    def _compute_metadata_inheritance_tree(self, course_id):
-        '''
-        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
-        '''
+    def _block_types_with_children(self):
+        """
+        Return the set of block types which can have children (and hence pass on inherited metadata)
+        """
+        if self._container_block_types is None:
+            self._container_block_types = set(
+                name for name, class_ in XBlock.load_classes() if getattr(class_, 'has_children', False)
+            )
+        return self._container_block_types
+
+    def _query_inheritance_records(self, course_id, names=None):
+        """
+        Return a dict mapping the location urls of the container blocks in the course (or only
+        those with the given names) to their records with just their children and inheritable
+        metadata, and the url of the course root if it was among them.
+        """
         # get all collections in the course, this query should not return any leaf nodes
         # note this is a bit ugly as when we add new categories of containers, we have to add it here
-
-        block_types_with_children = set(
-            name for name, class_ in XBlock.load_classes() if getattr(class_, 'has_children', False)
-        )
         query = SON([
             ('_id.tag', 'i4x'),
             ('_id.org', course_id.org),
             ('_id.course', course_id.course),
-            ('_id.category', {'$in': list(block_types_with_children)})
+            ('_id.category', {'$in': list(self._block_types_with_children())})
         ])
+        if names is not None:
+            query['_id.name'] = {'$in': list(names)}
         # we just want the Location, children, and inheritable metadata
         record_filter = {'_id': 1, 'definition.children': 1}
 
@@ -366,43 +492,116 @@ class MongoModuleStore(ModuleStoreWriteBase):
                 existing_children = results_by_url[location_url].get('definition', {}).get('children', [])
                 additional_children = result.get('definition', {}).get('children', [])
                 total_children = existing_children + additional_children
-                results_by_url[location_url].setdefault('definition', {})['children'] = total_children
+                result.setdefault('definition', {})['children'] = total_children
             results_by_url[location_url] = result
             if location.category == 'course':
                 root = location_url
 
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
+        return results_by_url, root
 
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata
-
-        if root is not None:
-            _compute_inherited_metadata(root)
-
-        return metadata_to_inherit
+    def _compute_metadata_inheritance_tree(self, course_id):
+        '''
+        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
+        '''
+        results_by_url, __ = self._query_inheritance_records(course_id)
+
+        tree = MetadataInheritanceTree()
+        for url, result in results_by_url.iteritems():
+            tree.set_container(url, result.get('metadata', {}), result.get('definition', {}).get('children', []))
+        return tree
+
+    def _update_metadata_inheritance_tree(self, course_id, tree, location):
+        '''
+        Return a copy of the inheritance tree updated for changes to the block at location.
+
+        As the tree only records each container's own metadata and children, this only needs
+        that one block's record.
+
+        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
+        '''
+        location = location.replace(revision=None)
+        url = location.to_deprecated_string()
+        results_by_url, __ = self._query_inheritance_records(course_id, [location.name])
+
+        tree = tree.copy()
+        if url in results_by_url:
+            result = results_by_url[url]
+            tree.set_container(url, result.get('metadata', {}), result.get('definition', {}).get('children', []))
+        else:
+            # deleted, or not a container
+            tree.remove_container(url)
+        return tree
+
+    def _metadata_inheritance_tree_version(self, course_id, bump=False):
+        '''
+        Return the version of the course's tree in the caching subsystem, first moving it on to a
+        new version if bump. Versions come from an atomic increment, so every refresh of the tree
+        gets one of its own, and stores the tree under it rather than over another refresh's.
+
+        The counter starts from the clock, so that if it's evicted it doesn't restart at versions
+        which may still have trees cached.
+        '''
+        cache = self.metadata_inheritance_cache_subsystem
+        key = u'{0}/inheritance-version'.format(course_id)
+        if bump:
+            try:
+                return cache.incr(key)
+            except ValueError:
+                # no counter yet
+                pass
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, int(time.time() * 1000))
+            if bump:
+                try:
+                    return cache.incr(key)
+                except ValueError:
+                    return None
+            version = cache.get(key)
+        return version
+
+    @staticmethod
+    def _metadata_inheritance_tree_key(course_id, version):
+        '''
+        Return the key of the given version of the course's tree in the caching subsystem
+        '''
+        return u'{0}/inheritance/{1}'.format(course_id, version)
+
+    def _get_shared_metadata_inheritance_tree(self, course_id, version):
+        '''
+        Return the given version of the course's tree from the caching subsystem, or None
+        '''
+        if version is None:
+            return None
+        return MetadataInheritanceTree.from_cache(
+            self.metadata_inheritance_cache_subsystem.get(self._metadata_inheritance_tree_key(course_id, version))
+        )
+
+    def _set_cached_metadata_inheritance_tree(self, course_id, tree, cache_subsystem=True, version=None):
+        '''
+        Put the tree into the caching subsystem (e.g. memcached) as the given (or current) version,
+        if available and cache_subsystem, and into the request cache, if available.
+        '''
+        if cache_subsystem and self.metadata_inheritance_cache_subsystem is not None:
+            if version is None:
+                version = self._metadata_inheritance_tree_version(course_id)
+            if version is not None:
+                self.metadata_inheritance_cache_subsystem.set(
+                    self._metadata_inheritance_tree_key(course_id, version), tree.to_cache()
+                )
+
+        if self.request_cache is not None:
+            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
+            # defined
+            if 'metadata_inheritance' not in self.request_cache.data:
+                self.request_cache.data['metadata_inheritance'] = {}
+            self.request_cache.data['metadata_inheritance'][course_id] = tree
 
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
         TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
         '''
-        tree = {}
+        tree = None
 
         if not force_refresh:
             # see if we are first in the request cache (if present)
@@ -411,40 +610,60 @@ class MongoModuleStore(ModuleStoreWriteBase):
 
             # then look in any caching subsystem (e.g. memcached)
             if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(course_id, {})
+                tree = self._get_shared_metadata_inheritance_tree(
+                    course_id, self._metadata_inheritance_tree_version(course_id)
+                )
             else:
                 logging.warning('Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is OK in localdev and testing environment. Not OK in production.')
 
-        if not tree:
-            # if not in subsystem, or we are on force refresh, then we have to compute
+        if tree is None:
+            # if not in subsystem, or we are on force refresh, then we have to compute (a refresh
+            # getting a new version for it)
+            version = None
+            if force_refresh and self.metadata_inheritance_cache_subsystem is not None:
+                version = self._metadata_inheritance_tree_version(course_id, bump=True)
             tree = self._compute_metadata_inheritance_tree(course_id)
-
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(course_id, tree)
-
-        # now populate a request_cache, if available. NOTE, we are outside of the
-        # scope of the above if: statement so that after a memcache hit, it'll get
-        # put into the request_cache
-        if self.request_cache is not None:
-            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
-            # defined
-            if 'metadata_inheritance' not in self.request_cache.data:
-                self.request_cache.data['metadata_inheritance'] = {}
-            self.request_cache.data['metadata_inheritance'][course_id] = tree
+            self._set_cached_metadata_inheritance_tree(course_id, tree, version=version)
+        else:
+            # NOTE, after a memcache hit, it'll get put into the request_cache
+            self._set_cached_metadata_inheritance_tree(course_id, tree, cache_subsystem=False)
 
         return tree
 
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, location=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
+        If given a location, only the block at that location is re-read (when there's a cached tree
+        to update); otherwise, the whole tree is recomputed.
+
+        In the caching subsystem, each refresh stores the tree as a new version, built on the
+        version before it. If that version isn't there (e.g., another refresh of the course is
+        still running), the whole tree is recomputed instead, so no refresh's change can be lost.
+
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
         """
         if course_id not in self.ignore_write_events_on_courses:
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
+            cached_metadata = None
+            if location is not None:
+                # start from the shared copy, if there is one, as that's the freshest
+                tree = version = None
+                if self.metadata_inheritance_cache_subsystem is not None:
+                    version = self._metadata_inheritance_tree_version(course_id, bump=True)
+                    if version is not None:
+                        tree = self._get_shared_metadata_inheritance_tree(course_id, version - 1)
+                elif self.request_cache is not None:
+                    tree = self.request_cache.data.get('metadata_inheritance', {}).get(course_id)
+                if tree is not None:
+                    cached_metadata = self._update_metadata_inheritance_tree(course_id, tree, location)
+                    self._set_cached_metadata_inheritance_tree(course_id, cached_metadata, version=version)
+                elif version is not None:
+                    cached_metadata = self._compute_metadata_inheritance_tree(course_id)
+                    self._set_cached_metadata_inheritance_tree(course_id, cached_metadata, version=version)
+            if cached_metadata is None:
+                cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
@@ -467,14 +686,54 @@ class MongoModuleStore(ModuleStoreWriteBase):
         }
         return list(self.collection.find(query))
 
+    def _records_by_url(self, course_key, records):
+        """
+        Return a dict mapping the revision-less location urls of records to the records
+        """
+        return {
+            Location._from_deprecated_son(record['_id'], course_key.run).replace(revision=None).to_deprecated_string(): record
+            for record in records
+        }
+
+    def _query_course_for_cache_children(self, course_key):
+        """
+        Fetch all of the course's blocks in one round-trip and return a dict mapping their
+        location urls to their payloads
+        """
+        query = self._course_key_to_son(course_key)
+        query['_id.revision'] = None
+        return self._records_by_url(course_key, self.collection.find(query, self.CACHE_CHILDREN_FIELDS))
+
+    def _should_prefetch_course(self, items, depth):
+        """
+        Return whether loading items to depth should fetch the whole course in one query rather
+        than a level at a time. That's only the case when loading course roots deeply enough to
+        pull in most of the course.
+        """
+        if self.course_prefetch_depth is None or (depth is not None and depth < self.course_prefetch_depth):
+            return False
+        return all(item['_id']['category'] == 'course' for item in items)
+
     def _cache_children(self, course_key, items, depth=0):
         """
         Returns a dictionary mapping Location -> item data, populated with json data
         for all descendents of items up to the specified depth.
         (0 = no descendents, 1 = children, 2 = grandchildren, etc)
         If depth is None, will load all the children.
-        This will make a number of queries that is linear in the depth.
+        This will make a number of queries that is linear in the depth, unless items are course roots
+        being loaded to at least course_prefetch_depth, when it makes just one.
         """
+        if items and depth != 0 and self._should_prefetch_course(items, depth):
+            course_records = self._query_course_for_cache_children(course_key)
+
+            def fetch_children(children):
+                """
+                Take each child's record from course_records (just the once, even if it has
+                several parents, as the records get modified)
+                """
+                return [course_records.pop(child) for child in children if child in course_records]
+        else:
+            fetch_children = partial(self._query_children_for_cache_children, course_key)
 
         data = {}
         to_process = list(items)
@@ -493,7 +752,7 @@ class MongoModuleStore(ModuleStoreWriteBase):
             # for or-query syntax
             to_process = []
             if children:
-                to_process = self._query_children_for_cache_children(course_key, children)
+                to_process = fetch_children(children)
 
             # If depth is None, then we just recurse until we hit all the descendents
             if depth is not None:
@@ -886,6 +1145,32 @@ class MongoModuleStore(ModuleStoreWriteBase):
         if result['n'] == 0:
             raise ItemNotFoundError(location)
 
+    def _item_payload(self, xblock):
+        """
+        Return the fields of xblock's document to set, to persist its current values.
+        """
+        definition_data = self._convert_reference_fields_to_strings(xblock, xblock.get_explicitly_set_fields_by_scope())
+        payload = {
+            'definition.data': definition_data,
+            'metadata': self._convert_reference_fields_to_strings(xblock, own_metadata(xblock)),
+        }
+        if xblock.has_children:
+            children = self._convert_reference_fields_to_strings(xblock, {'children': xblock.children})
+            payload.update({'definition.children': children['children']})
+        return payload
+
+    def _update_static_tab_name(self, static_tab_xblock, user_id):
+        """
+        For static tabs, their containing course also records their display name, so update that.
+        """
+        course = self._get_course_for_item(static_tab_xblock.scope_ids.usage_id)
+        # find the course's reference to this tab and update the name.
+        static_tab = CourseTabList.get_tab_by_slug(course.tabs, static_tab_xblock.scope_ids.usage_id.name)
+        # only update if changed
+        if static_tab and static_tab['name'] != static_tab_xblock.display_name:
+            static_tab['name'] = static_tab_xblock.display_name
+            self.update_item(course, user_id)
+
     def update_item(self, xblock, user_id=None, allow_not_found=False, force=False):
         """
         Update the persisted version of xblock to reflect its current values.
@@ -896,32 +1181,70 @@ class MongoModuleStore(ModuleStoreWriteBase):
         force: force is meaningless for this modulestore
         """
         try:
-            definition_data = self._convert_reference_fields_to_strings(xblock, xblock.get_explicitly_set_fields_by_scope())
-            payload = {
-                'definition.data': definition_data,
-                'metadata': self._convert_reference_fields_to_strings(xblock, own_metadata(xblock)),
-            }
-            if xblock.has_children:
-                children = self._convert_reference_fields_to_strings(xblock, {'children': xblock.children})
-                payload.update({'definition.children': children['children']})
-            self._update_single_item(xblock.scope_ids.usage_id, payload)
-            # for static tabs, their containing course also records their display name
+            self._update_single_item(xblock.scope_ids.usage_id, self._item_payload(xblock))
             if xblock.scope_ids.block_type == 'static_tab':
-                course = self._get_course_for_item(xblock.scope_ids.usage_id)
-                # find the course's reference to this tab and update the name.
-                static_tab = CourseTabList.get_tab_by_slug(course.tabs, xblock.scope_ids.usage_id.name)
-                # only update if changed
-                if static_tab and static_tab['name'] != xblock.display_name:
-                    static_tab['name'] = xblock.display_name
-                    self.update_item(course, user_id)
-
-            # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+                self._update_static_tab_name(xblock, user_id)
+
+            # recompute (and update) the metadata inheritance tree which is cached. Only containers
+            # pass on metadata, so the tree only needs updating below them.
+            if xblock.scope_ids.block_type in self._block_types_with_children():
+                self.refresh_cached_metadata_inheritance_tree(
+                    xblock.scope_ids.usage_id.course_key, xblock.runtime, xblock.scope_ids.usage_id
+                )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
                 raise
 
+    def update_items(self, xblocks, user_id=None, allow_not_found=False):
+        """
+        Update the persisted versions of several xblocks, as update_item would, but inserting all of
+        the ones which weren't persisted before in a single batch, and recomputing the metadata
+        inheritance tree once per course rather than after each container.
+
+        xblocks: the xblocks to persist
+        user_id: who made the change (ignored for now by this modulestore)
+        allow_not_found: meaningless here, as xblocks which don't exist yet are always created
+        """
+        xblocks = list(xblocks)
+        if not xblocks:
+            return
+        item_ids = [xblock.scope_ids.usage_id.to_deprecated_son() for xblock in xblocks]
+        # SONs aren't hashable, but their items are. (Ids only match with their fields in the same order.)
+        persisted_ids = set(
+            tuple(item['_id'].items())
+            for item in self.collection.find({'_id': {'$in': item_ids}}, fields={'_id': True})
+        )
+
+        new_items = []
+        updates = []
+        for xblock, item_id in zip(xblocks, item_ids):
+            payload = self._item_payload(xblock)
+            if tuple(item_id.items()) in persisted_ids:
+                updates.append((xblock.scope_ids.usage_id, payload))
+            else:
+                definition = {'data': payload['definition.data']}
+                if 'definition.children' in payload:
+                    definition['children'] = payload['definition.children']
+                new_items.append({'_id': item_id, 'definition': definition, 'metadata': payload['metadata']})
+                # any later copy of it in this batch updates this one
+                persisted_ids.add(tuple(item_id.items()))
+
+        if new_items:
+            self.collection.insert(new_items)
+        for location, payload in updates:
+            self._update_single_item(location, payload)
+
+        runtimes_by_course = {}
+        container_block_types = self._block_types_with_children()
+        for xblock in xblocks:
+            if xblock.scope_ids.block_type == 'static_tab':
+                self._update_static_tab_name(xblock, user_id)
+            if xblock.scope_ids.block_type in container_block_types:
+                runtimes_by_course.setdefault(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+        for course_key, runtime in runtimes_by_course.iteritems():
+            self.refresh_cached_metadata_inheritance_tree(course_key, runtime)
+
     def _convert_reference_fields_to_strings(self, xblock, jsonfields):
         """
         Find all fields of type reference and convert the payload from UsageKeys to deprecated strings
@@ -966,7 +1289,7 @@ class MongoModuleStore(ModuleStoreWriteBase):
         # from overriding our default value set in the init method.
         self.collection.remove({'_id': location.to_deprecated_son()}, safe=self.collection.safe)
         # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(location.course_key)
+        self.refresh_cached_metadata_inheritance_tree(location.course_key, location=location)
 
     def get_parent_locations(self, location):
         '''Find all locations that are the parents of this location in this
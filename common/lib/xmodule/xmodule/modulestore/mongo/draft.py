@@ -153,7 +153,7 @@ class DraftModuleStore(MongoModuleStore):
         except pymongo.errors.DuplicateKeyError:
             raise DuplicateItemError(original['_id'])
 
-        self.refresh_cached_metadata_inheritance_tree(draft_location.course_key)
+        self.refresh_cached_metadata_inheritance_tree(draft_location.course_key, location=draft_location)
 
         return wrap_draft(self._load_items(source_location.course_key, [original])[0])
 
@@ -179,6 +179,20 @@ class DraftModuleStore(MongoModuleStore):
         # don't allow locations to truly represent themselves as draft outside of this file
         xblock.location = as_published(xblock.location)
 
+    def update_items(self, xblocks, user_id=None, allow_not_found=False):
+        """
+        See superclass doc.
+        Only the xblocks which are never draft are written in a batch; the others are converted to
+        draft and updated one at a time, as update_item does.
+        """
+        direct_xblocks = []
+        for xblock in xblocks:
+            if xblock.location.category in DIRECT_ONLY_CATEGORIES:
+                direct_xblocks.append(xblock)
+            else:
+                self.update_item(xblock, user_id, allow_not_found)
+        super(DraftModuleStore, self).update_items(direct_xblocks, user_id, allow_not_found)
+
     def delete_item(self, location, delete_all_versions=False, **kwargs):
         """
         Delete an item from this modulestore
@@ -263,3 +277,20 @@ class DraftModuleStore(MongoModuleStore):
         queried_children = to_process_dict.values()
 
         return queried_children
+
+    def _query_course_for_cache_children(self, course_key):
+        """
+        As for the superclass, but with drafts in place of the published blocks they're drafts of
+        """
+        records = self.collection.find(self._course_key_to_son(course_key), self.CACHE_CHILDREN_FIELDS)
+        non_drafts = []
+        drafts = []
+        for record in records:
+            (drafts if record['_id'].get('revision') == DRAFT else non_drafts).append(record)
+
+        records_by_url = self._records_by_url(course_key, non_drafts)
+        for url, draft in self._records_by_url(course_key, drafts).iteritems():
+            # only replace blocks which exist as non-drafts, as _query_children_for_cache_children does
+            if url in records_by_url:
+                records_by_url[url] = draft
+        return records_by_url
@@ -0,0 +1,137 @@
+"""
+A bounded cache of the CachingDescriptorSystems which SplitMongoModuleStore
+builds for each course structure version it reads.
+"""
+from collections import OrderedDict
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# The key of the set of versions the current request has used, in the request cache
+IN_USE_KEY = 'split_course_versions'
+
+
+def versions_in_use(request_cache):
+    """
+    Return the set of structure versions which the current request has used
+    (and which must therefore stay cached until it ends), kept in
+    `request_cache`, the request_cache middleware's thread local.
+
+    Returns an empty set if there's no request cache, or if this thread isn't
+    handling a request: in celery tasks and management commands nothing
+    clears the request cache, so versions pinned there would never be evicted.
+    """
+    if request_cache is None or not getattr(request_cache, 'in_request', False):
+        return set()
+    request_data = getattr(request_cache, 'data', None)
+    if request_data is None:
+        return set()
+    return request_data.setdefault(IN_USE_KEY, set())
+
+
+class CourseCache(object):
+    """
+    A least recently used cache mapping structure version guids to their
+    CachingDescriptorSystems, bounded by the number of entries and by each
+    entry's age.
+
+    Structure versions are immutable, so entries never go stale; the bounds
+    only keep the memory used by a long lived process from growing with the
+    number of courses (and versions) it has served.
+
+    Entries whose keys are in the `in_use` collection passed to `get` and
+    `add` are never evicted, so that a request which is still working with a
+    descriptor system doesn't end up with two copies of the same course
+    version.
+
+    Keeps `hits`, `misses`, and `evictions` counters for monitoring.
+    """
+    def __init__(self, max_size=None, max_age=None):
+        """
+        :param max_size: the maximum number of entries to keep, or None for no limit
+        :param max_age: the number of seconds after which an entry expires, or None for no limit
+        """
+        self.max_size = max_size
+        self.max_age = max_age
+        self._entries = OrderedDict()  # key -> (time added, system), least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _is_expired(self, added, now):
+        """
+        Return whether an entry added at time `added` has outlived `max_age`.
+        """
+        return self.max_age is not None and now - added > self.max_age
+
+    def get(self, key, in_use=()):
+        """
+        Return the system cached for `key` and mark it as most recently used,
+        or return None if there isn't one (or it has expired).
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None and self._is_expired(entry[0], time.time()) and key not in in_use:
+            self.evictions += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries[key] = entry
+        self.hits += 1
+        return entry[1]
+
+    def add(self, key, system, in_use=()):
+        """
+        Cache `system` for `key` as the most recently used entry, evicting
+        expired and then least recently used entries which aren't in `in_use`
+        to stay within the bounds.
+        """
+        self._entries.pop(key, None)
+        self._entries[key] = (time.time(), system)
+        self._evict(in_use=set(in_use) | {key})
+        return system
+
+    def remove(self, key):
+        """
+        Drop the entry for `key`, if there is one.
+        """
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Drop all entries.
+        """
+        self._entries.clear()
+
+    def _evict(self, in_use):
+        """
+        Drop the entries which have expired, then the least recently used
+        entries until there are no more than `max_size`, skipping `in_use` ones.
+        """
+        now = time.time()
+        candidates = [key for key in self._entries if key not in in_use]
+        if self.max_age is not None:
+            for key in candidates:
+                if self._is_expired(self._entries[key][0], now):
+                    self._drop(key)
+        if self.max_size is not None:
+            for key in candidates:
+                if len(self._entries) <= self.max_size:
+                    break
+                if key in self._entries:
+                    self._drop(key)
+
+    def _drop(self, key):
+        """
+        Evict the entry for `key`.
+        """
+        del self._entries[key]
+        self.evictions += 1
+        log.debug("Evicted course structure %s from the split course cache", key)
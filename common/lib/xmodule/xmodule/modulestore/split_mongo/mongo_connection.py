@@ -2,18 +2,84 @@
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
 import re
+import zlib
 import pymongo
-from bson import son
+from bson import son, BSON
+
+
+class StructureCache(object):
+    """
+    Keeps compressed copies of structures in a cache shared between processes (e.g., memcached,
+    or a django file based cache for a single host) so that loading a course doesn't always need a
+    trip to mongo.
+
+    Structures are keyed by their version guid and are (with the exception of
+    MongoConnection.update_structure) never changed once written, so entries don't need invalidating.
+    """
+    def __init__(self, cache, tz_aware=True):
+        """
+        :param cache: a django style cache supporting get_many, set_many, and delete
+        """
+        self.cache = cache
+        self.tz_aware = tz_aware
+
+    def _key(self, version_guid):
+        """
+        The cache key for the structure whose id is version_guid
+        """
+        return u'split_structure.{}'.format(version_guid)
+
+    def _decode(self, data):
+        """
+        Rebuild a structure from its cached form. Each call returns a new copy, so callers can freely
+        modify what they get back.
+        """
+        return BSON(zlib.decompress(data)).decode(as_class=son.SON, tz_aware=self.tz_aware)
+
+    def get_many(self, version_guids):
+        """
+        Return a dict mapping those of version_guids which are in the cache to their structures
+        """
+        keys = {self._key(version_guid): version_guid for version_guid in version_guids}
+        return {
+            keys[key]: self._decode(data)
+            for key, data in self.cache.get_many(keys.keys()).iteritems()
+        }
+
+    def get(self, version_guid):
+        """
+        Return the cached structure whose id is version_guid, or None if it isn't cached
+        """
+        return self.get_many([version_guid]).get(version_guid)
+
+    def set_many(self, structures):
+        """
+        Cache each of the structures
+        """
+        self.cache.set_many({
+            self._key(structure['_id']): zlib.compress(BSON.encode(structure))
+            for structure in structures
+        })
+
+    def delete(self, version_guid):
+        """
+        Drop the structure whose id is version_guid from the cache
+        """
+        self.cache.delete(self._key(version_guid))
+
 
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
     def __init__(
-        self, db, collection, host, port=27017, tz_aware=True, user=None, password=None, **kwargs
+        self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
+        structure_cache=None, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        :param structure_cache: an optional django style cache in which to keep structures
         """
         self.database = pymongo.database.Database(
             pymongo.MongoClient(
@@ -41,17 +107,40 @@ class MongoConnection(object):
         self.structures.write_concern = {'w': 1}
         self.definitions.write_concern = {'w': 1}
 
+        if structure_cache is not None:
+            self.structure_cache = StructureCache(structure_cache, tz_aware=tz_aware)
+        else:
+            self.structure_cache = None
+
     def get_structure(self, key):
         """
         Get the structure from the persistence mechanism whose id is the given key
         """
-        return self.structures.find_one({'_id': key})
+        if self.structure_cache is not None:
+            structure = self.structure_cache.get(key)
+            if structure is not None:
+                return structure
+        structure = self.structures.find_one({'_id': key})
+        if structure is not None and self.structure_cache is not None:
+            self.structure_cache.set_many([structure])
+        return structure
 
     def find_matching_structures(self, query):
         """
         Find the structure matching the query. Right now the query must be a legal mongo query
         :param query: a mongo-style query of {key: [value|{$in ..}|..], ..}
         """
+        id_query = query.get('_id') if query.keys() == ['_id'] else None
+        if self.structure_cache is not None and isinstance(id_query, dict) and id_query.keys() == ['$in']:
+            # a lookup by ids: only go to the db for the structures which aren't cached
+            version_guids = list(set(id_query['$in']))
+            cached = self.structure_cache.get_many(version_guids)
+            missing = [version_guid for version_guid in version_guids if version_guid not in cached]
+            if missing:
+                fetched = list(self.structures.find({'_id': {'$in': missing}}))
+                self.structure_cache.set_many(fetched)
+                cached.update((structure['_id'], structure) for structure in fetched)
+            return [cached[version_guid] for version_guid in version_guids if version_guid in cached]
         return self.structures.find(query)
 
     def insert_structure(self, structure):
@@ -65,6 +154,8 @@ class MongoConnection(object):
         Update the db record for structure
         """
         self.structures.update({'_id': structure['_id']}, structure)
+        if self.structure_cache is not None:
+            self.structure_cache.delete(structure['_id'])
 
     def get_course_index(self, key, ignore_case=False):
         """
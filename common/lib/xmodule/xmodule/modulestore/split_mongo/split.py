@@ -65,6 +65,7 @@ from xmodule.modulestore import inheritance, ModuleStoreWriteBase, Location, SPL
 from ..exceptions import ItemNotFoundError
 from .definition_lazy_loader import DefinitionLazyLoader
 from .caching_descriptor_system import CachingDescriptorSystem
+from .course_cache import CourseCache, versions_in_use
 from xblock.fields import Scope
 from bson.objectid import ObjectId
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
@@ -92,6 +93,10 @@ log = logging.getLogger(__name__)
 #
 #==============================================================================
 
+# The default bounds on each thread's cache of course versions
+DEFAULT_COURSE_CACHE_SIZE = 50
+DEFAULT_COURSE_CACHE_MAX_AGE = 60 * 60
+
 
 class SplitMongoModuleStore(ModuleStoreWriteBase):
     """
@@ -106,20 +111,30 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
                  error_tracker=null_error_tracker,
                  loc_mapper=None,
                  i18n_service=None,
+                 course_cache_size=DEFAULT_COURSE_CACHE_SIZE,
+                 course_cache_max_age=DEFAULT_COURSE_CACHE_MAX_AGE,
+                 structure_cache=None,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param course_cache_size: the most course versions each thread keeps descriptor systems for
+            (None for no limit)
+        :param course_cache_max_age: the number of seconds after which a thread's cached course version
+            expires (None for no limit)
+        :param structure_cache: an optional django style cache (e.g., memcached) shared by processes in
+            which to keep course structures
         """
 
         super(SplitMongoModuleStore, self).__init__(**kwargs)
         self.loc_mapper = loc_mapper
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        self.db_connection = MongoConnection(structure_cache=structure_cache, **doc_store_config)
         self.db = self.db_connection.database
 
-        # Code review question: How should I expire entries?
-        # _add_cache could use a lru mechanism to control the cache size?
+        # each thread keeps its own CourseCache of descriptor systems in course_cache
         self.thread_cache = threading.local()
+        self.course_cache_size = course_cache_size
+        self.course_cache_max_age = course_cache_max_age
 
         if default_class is not None:
             module_path, __, class_name = default_class.rpartition('.')
@@ -198,15 +213,31 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
             self.cache_items(system, block_ids, depth, lazy)
         return [system.load_item(block_id, course_entry) for block_id in block_ids]
 
+    def _course_cache(self):
+        """
+        Return this thread's CourseCache of descriptor systems, creating it if need be.
+        """
+        if not hasattr(self.thread_cache, 'course_cache'):
+            self.thread_cache.course_cache = CourseCache(self.course_cache_size, self.course_cache_max_age)
+        return self.thread_cache.course_cache
+
+    def _versions_in_use(self):
+        """
+        Return the set of structure versions which the current request has used (see
+        course_cache.versions_in_use).
+        """
+        return versions_in_use(self.request_cache)
+
     def _get_cache(self, course_version_guid):
         """
         Find the descriptor cache for this course if it exists
         :param course_version_guid:
         """
-        if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
-        system = self.thread_cache.course_cache
-        return system.get(course_version_guid)
+        in_use = self._versions_in_use()
+        system = self._course_cache().get(course_version_guid, in_use=in_use)
+        if system is not None:
+            in_use.add(course_version_guid)
+        return system
 
     def _add_cache(self, course_version_guid, system):
         """
@@ -214,10 +245,9 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         :param course_version_guid:
         :param system:
         """
-        if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
-        self.thread_cache.course_cache[course_version_guid] = system
-        return system
+        in_use = self._versions_in_use()
+        in_use.add(course_version_guid)
+        return self._course_cache().add(course_version_guid, system, in_use=in_use)
 
     def _clear_cache(self, course_version_guid=None):
         """
@@ -225,9 +255,9 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         :param course_version_guid: if provided, clear only this entry
         """
         if course_version_guid:
-            del self.thread_cache.course_cache[course_version_guid]
+            self._course_cache().remove(course_version_guid)
         else:
-            self.thread_cache.course_cache = {}
+            self._course_cache().clear()
 
     def _lookup_course(self, course_locator):
         '''
@@ -19,8 +19,9 @@ from xblock.exceptions import InvalidScopeError
 from xblock.plugin import Plugin
 
 from xmodule.tests import DATA_DIR
-from xmodule.modulestore import Location, MONGO_MODULESTORE_TYPE
+from xmodule.modulestore import Location, MONGO_MODULESTORE_TYPE, ModuleStoreWriteBase
 from xmodule.modulestore.mongo import MongoModuleStore, MongoKeyValueStore
+from xmodule.modulestore.mongo.base import MetadataInheritanceTree
 from xmodule.modulestore.draft import DraftModuleStore
 from xmodule.modulestore.locations import SlashSeparatedCourseKey, AssetLocation
 from xmodule.modulestore.xml_exporter import export_to_xml
@@ -28,7 +29,8 @@ from xmodule.modulestore.xml_importer import import_from_xml, perform_xlint
 from xmodule.contentstore.mongo import MongoContentStore
 
 from xmodule.modulestore.tests.test_modulestore import check_path_to_location
-from nose.tools import assert_in
+from nose.tools import assert_in, assert_not_in, assert_is_not_none
+from mock import patch
 from xmodule.exceptions import NotFoundError
 from git.test.lib.asserts import assert_not_none
 from xmodule.x_module import XModuleMixin
@@ -45,6 +47,32 @@ DEFAULT_CLASS = 'xmodule.raw_module.RawDescriptor'
 RENDER_TEMPLATE = lambda t_n, d, ctx = None, nsp = 'main': ''
 
 
+class DictCache(object):
+    """
+    A minimal stand in for a django cache, keeping its values in a dict
+    """
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+    def add(self, key, value):
+        if key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def incr(self, key):
+        if key not in self.data:
+            raise ValueError("Key '{}' not found".format(key))
+        self.data[key] += 1
+        return self.data[key]
+
+
 class ReferenceTestXBlock(XBlock):
     """
     Test xblock type to test the reference field types
@@ -445,6 +473,172 @@ class TestMongoModuleStore(unittest.TestCase):
         finally:
             shutil.rmtree(root_dir)
 
+    def test_incremental_inheritance_tree(self):
+        """
+        Test that editing a container updates just its part of the cached metadata inheritance
+        tree, giving the same tree as recomputing it from scratch.
+        """
+        cache = DictCache()
+        store = MongoModuleStore(
+            {'host': HOST, 'db': DB, 'collection': COLLECTION},
+            FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS,
+            metadata_inheritance_cache_subsystem=cache, xblock_mixins=(XModuleMixin,)
+        )
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        store.get_course(course_key, depth=None)
+        assert_is_not_none(self._cached_tree(store, course_key))
+
+        chapter = store.get_item(course_key.make_usage_key('chapter', 'Overview'))
+        leaf_url = course_key.make_usage_key('html', 'toyhtml').to_deprecated_string()
+        chapter.max_attempts = 7
+        with patch.object(store, '_compute_metadata_inheritance_tree', wraps=store._compute_metadata_inheritance_tree) as compute:
+            store.update_item(chapter)
+            try:
+                assert_false(compute.called)
+                tree = self._cached_tree(store, course_key)
+                assert_equals(tree.get(leaf_url)['max_attempts'], 7)
+                assert_equals(tree, store._compute_metadata_inheritance_tree(course_key))
+            finally:
+                del chapter.max_attempts
+                store.update_item(chapter)
+        tree = self._cached_tree(store, course_key)
+        assert_not_in('max_attempts', tree.get(leaf_url))
+
+    def test_concurrent_inheritance_tree_refresh(self):
+        """
+        Test that an edit made while another refresh of the tree is still running recomputes the
+        whole tree, rather than building on (and losing the change of) the tree before it.
+        """
+        cache = DictCache()
+        store = MongoModuleStore(
+            {'host': HOST, 'db': DB, 'collection': COLLECTION},
+            FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS,
+            metadata_inheritance_cache_subsystem=cache, xblock_mixins=(XModuleMixin,)
+        )
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        store.get_course(course_key, depth=None)
+
+        # another refresh has taken the next version, but not stored its tree yet
+        store._metadata_inheritance_tree_version(course_key, bump=True)
+
+        chapter = store.get_item(course_key.make_usage_key('chapter', 'Overview'))
+        leaf_url = course_key.make_usage_key('html', 'toyhtml').to_deprecated_string()
+        chapter.max_attempts = 7
+        with patch.object(store, '_compute_metadata_inheritance_tree', wraps=store._compute_metadata_inheritance_tree) as compute:
+            store.update_item(chapter)
+            try:
+                assert_true(compute.called)
+                assert_equals(self._cached_tree(store, course_key).get(leaf_url)['max_attempts'], 7)
+            finally:
+                del chapter.max_attempts
+                store.update_item(chapter)
+
+    @staticmethod
+    def _cached_tree(store, course_key):
+        """
+        Return the current version of the course's tree in the store's caching subsystem
+        """
+        return store._get_shared_metadata_inheritance_tree(
+            course_key, store._metadata_inheritance_tree_version(course_key)
+        )
+
+    def test_course_prefetch(self):
+        """
+        Test that loading a whole course fetches its blocks in one query, caching the same
+        blocks as fetching them a level at a time.
+        """
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        level_store, prefetch_store = [
+            MongoModuleStore(
+                {'host': HOST, 'db': DB, 'collection': COLLECTION},
+                FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS, xblock_mixins=(XModuleMixin,),
+                course_prefetch_depth=prefetch_depth
+            )
+            for prefetch_depth in (None, 4)
+        ]
+        level_course = level_store.get_course(course_key, depth=None)
+        with patch.object(prefetch_store, '_query_children_for_cache_children') as query_children:
+            prefetch_course = prefetch_store.get_course(course_key, depth=None)
+        assert_false(query_children.called)
+        assert_equals(
+            set(prefetch_course.runtime.module_data.keys()), set(level_course.runtime.module_data.keys())
+        )
+        assert_greater(len(prefetch_course.runtime.module_data), 10)
+
+        # shallow loads still go a level at a time
+        with patch.object(
+            prefetch_store, '_query_course_for_cache_children', wraps=prefetch_store._query_course_for_cache_children
+        ) as query_course:
+            prefetch_store.get_course(course_key, depth=2)
+        assert_false(query_course.called)
+
+    def test_import_writes_in_batches(self):
+        """
+        Test that importing a course inserts its modules in a batch, giving the same documents as
+        updating them one at a time.
+        """
+        documents = []
+        for database, update_items in [
+                (DB + '_one_at_a_time', ModuleStoreWriteBase.update_items.im_func),
+                (DB + '_batched', MongoModuleStore.update_items.im_func),
+        ]:
+            self.addCleanup(self.connection.drop_database, database)
+            store = MongoModuleStore(
+                {'host': HOST, 'db': database, 'collection': COLLECTION},
+                FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS, xblock_mixins=(XModuleMixin,)
+            )
+            with patch.object(MongoModuleStore, 'update_items', update_items):
+                with patch.object(store.collection, 'insert', wraps=store.collection.insert) as insert:
+                    import_from_xml(store, DATA_DIR, ['toy'])
+            documents.append({
+                tuple(item['_id'].values()): item.to_dict()
+                for item in self.connection[database][COLLECTION].find()
+            })
+        assert_equals(insert.call_count, 1)
+        assert_greater(len(documents[0]), 10)
+        assert_equals(documents[0], documents[1])
+
+
+class TestMetadataInheritanceTree(unittest.TestCase):
+    """
+    Tests for the compact metadata inheritance tree.
+    """
+    def setUp(self):
+        self.tree = MetadataInheritanceTree()
+        self.tree.set_container('course', {'graded': False, 'max_attempts': 1}, ['chapter'])
+        self.tree.set_container('chapter', {'max_attempts': 2}, ['sequential'])
+        self.tree.set_container('sequential', {}, ['problem'])
+
+    def test_inherited(self):
+        assert_equals(self.tree.get('course'), {'graded': False, 'max_attempts': 1})
+        assert_equals(self.tree.get('problem'), {'graded': False, 'max_attempts': 2})
+        # nothing is added between the chapter and the problem, so it's all the same dict
+        assert_true(self.tree.get('problem') is self.tree.get('chapter'))
+        assert_equals(self.tree.get('unknown', {}), {})
+
+    def test_changes(self):
+        assert_equals(self.tree.get('problem')['max_attempts'], 2)
+        self.tree.set_container('sequential', {'max_attempts': 3}, ['problem'])
+        assert_equals(self.tree.get('problem')['max_attempts'], 3)
+        self.tree.remove_container('chapter')
+        assert_equals(self.tree.get('chapter'), {'graded': False, 'max_attempts': 1})
+
+    def test_cache_round_trip(self):
+        assert_equals(MetadataInheritanceTree.from_cache(self.tree.to_cache()), self.tree)
+        # trees cached in an older format get recomputed
+        assert_equals(MetadataInheritanceTree.from_cache({'i4x://edX/toy/chapter/Overview': {}}), None)
+        assert_equals(MetadataInheritanceTree.from_cache(None), None)
+
+    def test_deep_tree(self):
+        tree = MetadataInheritanceTree()
+        for depth in range(10000):
+            tree.set_container(str(depth), {'max_attempts': depth} if depth % 7 == 0 else {}, [str(depth + 1)])
+        assert_equals(tree.get('10000'), {'max_attempts': 9996})
+
+    def test_cycle(self):
+        self.tree.set_container('problem', {'graded': True}, ['chapter'])
+        assert_equals(self.tree.get('problem'), {'graded': True, 'max_attempts': 2})
+
 
 class TestMongoKeyValueStore(object):
     """
@@ -0,0 +1,87 @@
+"""
+Tests for xmodule.modulestore.split_mongo.course_cache.
+"""
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from xmodule.modulestore.split_mongo.course_cache import CourseCache, versions_in_use
+
+
+class CourseCacheTest(TestCase):
+    """
+    Tests for the bounded cache of split course versions.
+    """
+    def setUp(self):
+        super(CourseCacheTest, self).setUp()
+        patcher = patch('xmodule.modulestore.split_mongo.course_cache.time')
+        self.mock_time = patcher.start()
+        self.mock_time.time.return_value = 1000
+        self.addCleanup(patcher.stop)
+
+    def test_hits_and_misses(self):
+        cache = CourseCache()
+        self.assertIsNone(cache.get('a'))
+        cache.add('a', 'system a')
+        self.assertEqual(cache.get('a'), 'system a')
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (1, 1, 0))
+
+    def test_evicts_least_recently_used(self):
+        cache = CourseCache(max_size=2)
+        cache.add('a', 'system a')
+        cache.add('b', 'system b')
+        cache.get('a')
+        cache.add('c', 'system c')
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_in_use_not_evicted(self):
+        cache = CourseCache(max_size=1)
+        cache.add('a', 'system a')
+        cache.add('b', 'system b', in_use={'a'})
+        self.assertEqual(len(cache), 2)
+        # once 'a' is no longer in use, the next add trims the cache again
+        cache.add('c', 'system c')
+        self.assertEqual(len(cache), 1)
+        self.assertIn('c', cache)
+
+    def test_expiry(self):
+        cache = CourseCache(max_age=60)
+        cache.add('a', 'system a')
+        cache.add('b', 'system b')
+        self.mock_time.time.return_value = 1061
+        self.assertEqual(cache.get('a', in_use={'a'}), 'system a')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (1, 1, 1))
+
+    def test_remove_and_clear(self):
+        cache = CourseCache()
+        cache.add('a', 'system a')
+        cache.add('b', 'system b')
+        cache.remove('a')
+        cache.remove('missing')
+        self.assertNotIn('a', cache)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class VersionsInUseTest(TestCase):
+    """
+    Tests that versions are only pinned while handling a request.
+    """
+    def test_in_request(self):
+        request_cache = Mock(data={}, in_request=True)
+        versions_in_use(request_cache).add('a')
+        self.assertEqual(versions_in_use(request_cache), {'a'})
+
+    def test_outside_request(self):
+        # e.g. a celery worker, where nothing clears the request cache
+        request_cache = Mock(data={}, in_request=False)
+        versions_in_use(request_cache).add('a')
+        self.assertEqual(versions_in_use(request_cache), set())
+        self.assertEqual(request_cache.data, {})
+
+    def test_no_request_cache(self):
+        self.assertEqual(versions_in_use(None), set())
@@ -0,0 +1,92 @@
+"""
+Tests for the shared structure cache in front of split mongo's MongoConnection.
+"""
+import datetime
+from unittest import TestCase
+
+from bson.objectid import ObjectId
+from mock import patch, Mock
+from pytz import UTC
+
+from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
+
+
+class DictCache(object):
+    """
+    A minimal django style cache backed by a dict.
+    """
+    def __init__(self):
+        self.data = {}
+
+    def get_many(self, keys):
+        return {key: self.data[key] for key in keys if key in self.data}
+
+    def set_many(self, values):
+        self.data.update(values)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class StructureCacheTest(TestCase):
+    """
+    Test that structures are served from the cache once they've been fetched.
+    """
+    def setUp(self):
+        super(StructureCacheTest, self).setUp()
+        self.cache = DictCache()
+        with patch('xmodule.modulestore.split_mongo.mongo_connection.pymongo'):
+            self.connection = MongoConnection('db', 'collection', 'host', structure_cache=self.cache)
+        self.connection.structures = Mock()
+        self.structures = [self._structure() for __ in range(3)]
+
+    def _structure(self):
+        """
+        Make a small structure document.
+        """
+        return {
+            '_id': ObjectId(),
+            'root': 'course',
+            'edited_on': datetime.datetime(2014, 5, 1, tzinfo=UTC),
+            'blocks': {'course': {'category': 'course', 'fields': {'children': []}}},
+        }
+
+    def test_get_structure(self):
+        structure = self.structures[0]
+        self.connection.structures.find_one.return_value = structure
+        self.assertEqual(self.connection.get_structure(structure['_id']), structure)
+        self.assertEqual(self.connection.get_structure(structure['_id']), structure)
+        self.assertEqual(self.connection.structures.find_one.call_count, 1)
+
+    def test_cached_structures_are_copies(self):
+        structure = self.structures[0]
+        self.connection.structures.find_one.return_value = structure
+        self.connection.get_structure(structure['_id'])
+        cached = self.connection.get_structure(structure['_id'])
+        cached['blocks']['course']['fields']['children'].append('chapter')
+        self.assertEqual(self.connection.get_structure(structure['_id']), structure)
+
+    def test_find_by_ids_only_fetches_missing(self):
+        self.connection.structures.find.return_value = self.structures[:2]
+        self.connection.find_matching_structures({'_id': {'$in': [s['_id'] for s in self.structures[:2]]}})
+
+        self.connection.structures.find.return_value = self.structures[2:]
+        found = self.connection.find_matching_structures({'_id': {'$in': [s['_id'] for s in self.structures]}})
+        self.assertEqual(
+            sorted(structure['_id'] for structure in found),
+            sorted(structure['_id'] for structure in self.structures)
+        )
+        self.connection.structures.find.assert_called_with({'_id': {'$in': [self.structures[2]['_id']]}})
+
+    def test_other_queries_not_cached(self):
+        query = {'previous_version': self.structures[0]['_id']}
+        self.connection.find_matching_structures(query)
+        self.connection.structures.find.assert_called_once_with(query)
+        self.assertEqual(self.cache.data, {})
+
+    def test_update_drops_cached_structure(self):
+        structure = self.structures[0]
+        self.connection.structures.find_one.return_value = structure
+        self.connection.get_structure(structure['_id'])
+        self.connection.update_structure(structure)
+        self.assertEqual(self.cache.data, {})
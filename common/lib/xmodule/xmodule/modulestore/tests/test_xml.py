@@ -3,6 +3,8 @@ Tests around our XML modulestore, including importing
 well-formed and not-well-formed XML.
 """
 import os.path
+import shutil
+import tempfile
 import unittest
 from glob import glob
 from mock import patch
@@ -106,3 +108,73 @@ class TestXMLModuleStore(unittest.TestCase):
             SlashSeparatedCourseKey('edX', 'toy', '2012_Fall'),
             locator_key_fields=SlashSeparatedCourseKey.KEY_FIELDS
         )
+
+    def test_lazy_load(self):
+        """
+        Test that a lazy store loads each course when it's first asked for
+        """
+        store = XMLModuleStore(DATA_DIR, course_dirs=['toy', 'simple'], lazy=True)
+        self.assertEqual(store.courses, {})
+
+        toy_id = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        self.assertTrue(store.has_item(toy_id.make_usage_key('course', '2012_Fall')))
+        self.assertEqual(store.courses.keys(), ['toy'])
+        self.assertEqual(store.get_course(toy_id).id, toy_id)
+
+        self.assertEqual(len(store.get_courses()), 2)
+        self.assertIsNone(store.get_course(SlashSeparatedCourseKey('edX', 'no_such', 'course')))
+
+    def test_lazy_reload(self):
+        """
+        Test that a lazy store keeps a course that was reloaded before it was asked for
+        """
+        store = XMLModuleStore(DATA_DIR, course_dirs=['toy', 'simple'], lazy=True)
+        course = store.try_load_course('toy')
+        self.assertEqual(store.courses.keys(), ['toy'])
+        course.GIT_COMMIT_ID = 'abc123'
+
+        toy_id = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        self.assertIs(store.get_course(toy_id), course)
+        self.assertEqual(len(store.get_courses()), 2)
+        self.assertEqual(store.get_course(toy_id).GIT_COMMIT_ID, 'abc123')
+
+    def test_lazy_load_course_ids(self):
+        """
+        Test that a lazy store only loads the courses it's asked to
+        """
+        store = XMLModuleStore(DATA_DIR, course_dirs=['toy', 'simple'], course_ids=['edX/toy/2012_Fall'], lazy=True)
+        self.assertEqual([course.id.course for course in store.get_courses()], ['toy'])
+
+    def test_snapshot(self):
+        """
+        Test that a course loads the same from its snapshot as from its xml
+        """
+        snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, snapshot_dir)
+        store = XMLModuleStore(DATA_DIR, course_dirs=['toy'], snapshot_dir=snapshot_dir)
+        self.assertEqual(len(os.listdir(snapshot_dir)), 1)
+
+        with patch.object(XMLModuleStore, 'load_course') as load_course:
+            snapshot_store = XMLModuleStore(DATA_DIR, course_dirs=['toy'], snapshot_dir=snapshot_dir)
+        self.assertFalse(load_course.called)
+
+        toy_id = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        self.assertEqual(snapshot_store.get_course_errors(toy_id), [])
+        modules = store.modules[toy_id]
+        snapshot_modules = snapshot_store.modules[toy_id]
+        self.assertEqual(set(snapshot_modules), set(modules))
+        for usage_id, module in modules.iteritems():
+            snapshot_module = snapshot_modules[usage_id]
+            self.assertEqual(type(snapshot_module), type(module))
+            for field in module.fields.itervalues():
+                self.assertEqual(getattr(snapshot_module, field.name), getattr(module, field.name), field.name)
+            self.assertEqual(
+                set(snapshot_store.get_parent_locations(usage_id)),
+                set(store.get_parent_locations(usage_id)),
+            )
+
+        # a changed course isn't loaded from the old snapshot
+        with patch('xmodule.modulestore.xml.course_dir_digest', return_value='changed'):
+            with patch.object(XMLModuleStore, 'load_course', return_value=None) as load_course:
+                XMLModuleStore(DATA_DIR, course_dirs=['toy'], snapshot_dir=snapshot_dir)
+        self.assertTrue(load_course.called)
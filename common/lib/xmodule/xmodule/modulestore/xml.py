@@ -6,6 +6,7 @@ import os
 import re
 import sys
 import glob
+import threading
 
 from collections import defaultdict
 from cStringIO import StringIO
@@ -15,23 +16,24 @@ from lxml import etree
 from path import path
 
 from xmodule.error_module import ErrorDescriptor
-from xmodule.errortracker import make_error_tracker, exc_info_to_str
+from xmodule.errortracker import make_error_tracker, exc_info_to_str, null_error_tracker
 from xmodule.mako_module import MakoDescriptorSystem
 from xmodule.x_module import XMLParsingSystem, policy_key
 from xmodule.modulestore.xml_exporter import DEFAULT_CONTENT_FIELDS
 from xmodule.tabs import CourseTabList
-from xmodule.modulestore.keys import UsageKey
+from xmodule.modulestore.keys import CourseKey, UsageKey
 from xmodule.modulestore.locations import SlashSeparatedCourseKey
 
 from xblock.field_data import DictFieldData
-from xblock.runtime import DictKeyValueStore, IdGenerator
+from xblock.runtime import DictKeyValueStore, IdGenerator, KvsFieldData
 
 from . import ModuleStoreReadBase, Location, XML_MODULESTORE_TYPE
 
 from .exceptions import ItemNotFoundError
-from .inheritance import compute_inherited_metadata, inheriting_field_data
+from .inheritance import compute_inherited_metadata, inheriting_field_data, InheritanceKeyValueStore
+from .xml_snapshot import course_dir_digest, read_snapshot, write_snapshot
 
-from xblock.fields import ScopeIds, Reference, ReferenceList, ReferenceValueDict
+from xblock.fields import Scope, ScopeIds, Reference, ReferenceList, ReferenceValueDict
 
 edx_xml_parser = etree.XMLParser(dtd_validation=False, load_dtd=False,
                                  remove_comments=True, remove_blank_text=True)
@@ -291,6 +293,24 @@ def _convert_reference_fields_to_keys(xblock):  # pylint: disable=invalid-name
                 setattr(xblock, field.name, field_value)
 
 
+def _reference_to_json(field, value):
+    """
+    Make the json value of a reference field into one which can be written out
+    as json (that _convert_reference_fields_to_keys turns back into UsageKeys).
+    """
+    def _key_to_string(key):
+        """Return the deprecated string for key, if it's a UsageKey."""
+        return key.to_deprecated_string() if isinstance(key, UsageKey) else key
+
+    if isinstance(field, Reference):
+        return _key_to_string(value)
+    elif isinstance(field, ReferenceList):
+        return [_key_to_string(ele) for ele in value]
+    elif isinstance(field, ReferenceValueDict):
+        return dict((key, _key_to_string(subvalue)) for key, subvalue in value.iteritems())
+    return value
+
+
 def create_block_from_xml(xml_data, system, id_generator):
     """
     Create an XBlock instance from XML data.
@@ -368,7 +388,7 @@ class XMLModuleStore(ModuleStoreReadBase):
     """
     def __init__(
         self, data_dir, default_class=None, course_dirs=None, course_ids=None,
-        load_error_modules=True, i18n_service=None, **kwargs
+        load_error_modules=True, i18n_service=None, lazy=False, snapshot_dir=None, **kwargs
     ):
         """
         Initialize an XMLModuleStore from data_dir
@@ -381,6 +401,13 @@ class XMLModuleStore(ModuleStoreReadBase):
 
             course_dirs or course_ids (list of str): If specified, the list of course_dirs or course_ids to load. Otherwise,
                 load all courses. Note, providing both
+
+            lazy (bool): If True, only read each course's id now, and load the course the
+                first time it's asked for. Code reading `modules` or `courses` directly
+                needs a store which isn't lazy.
+
+            snapshot_dir (str): If specified, the directory to keep snapshots of parsed
+                courses in, which load much faster than the XML (see xml_snapshot)
         """
         super(XMLModuleStore, self).__init__(**kwargs)
 
@@ -388,6 +415,13 @@ class XMLModuleStore(ModuleStoreReadBase):
         self.modules = defaultdict(dict)  # course_id -> dict(location -> XBlock)
         self.courses = {}  # course_dir -> XBlock for the course
         self.errored_courses = {}  # course_dir -> errorlog, for dirs that failed to load
+        self.snapshot_dir = path(snapshot_dir) if snapshot_dir else None
+
+        # course_id -> course_dir, for courses that haven't been loaded yet
+        self._unloaded_course_dirs = {}
+        # only one thread loads courses at a time, and it can look up the course it's loading
+        self._load_lock = threading.RLock()
+        self._loading_courses = set()
 
         if course_ids is not None:
             course_ids = [SlashSeparatedCourseKey.from_deprecated_string(course_id) for course_id in course_ids]
@@ -418,12 +452,60 @@ class XMLModuleStore(ModuleStoreReadBase):
             course_dirs = sorted([d for d in os.listdir(self.data_dir) if
                                   os.path.exists(self.data_dir / d / "course.xml")])
         for course_dir in course_dirs:
+            if lazy:
+                try:
+                    course_id = self._read_course_xml(course_dir, null_error_tracker)[1]
+                except Exception:  # pylint: disable=broad-except
+                    # load it now, which records the error
+                    course_id = None
+                if course_id is not None:
+                    if course_ids is None or course_id in course_ids:
+                        self._unloaded_course_dirs[course_id] = course_dir
+                    continue
             self.try_load_course(course_dir, course_ids)
 
+    def _ensure_loaded(self, course_id):
+        """
+        Load the course `course_id`, if it's one which hasn't been loaded yet.
+        """
+        if course_id not in self._unloaded_course_dirs:
+            return
+        with self._load_lock:
+            course_dir = self._unloaded_course_dirs.get(course_id)
+            # (the course is only loading already if this thread is loading it)
+            if course_dir is None or course_id in self._loading_courses:
+                return
+            self._loading_courses.add(course_id)
+            try:
+                self.try_load_course(course_dir)
+            finally:
+                self._loading_courses.discard(course_id)
+                self._unloaded_course_dirs.pop(course_id, None)
+
+    def _ensure_all_loaded(self):
+        """
+        Load all of the courses which haven't been loaded yet.
+        """
+        for course_id in self._unloaded_course_dirs.keys():
+            self._ensure_loaded(course_id)
+
     def try_load_course(self, course_dir, course_ids=None):
         '''
         Load a course, keeping track of errors as we go along. If course_ids is not None,
         then reject the course unless it's id is in course_ids.
+
+        Returns the course, or None if it didn't load. Either way, a lazy store won't load
+        the course dir again by itself.
+        '''
+        with self._load_lock:
+            for course_id, unloaded_dir in self._unloaded_course_dirs.items():
+                if unloaded_dir == course_dir and course_id not in self._loading_courses:
+                    del self._unloaded_course_dirs[course_id]
+            return self._try_load_course(course_dir, course_ids)
+
+    def _try_load_course(self, course_dir, course_ids=None):
+        '''
+        Load a course for try_load_course, returning it, or None if it didn't load.
         '''
         # Special-case code here, since we don't have a location for the
         # course before it loads.
@@ -431,25 +513,113 @@ class XMLModuleStore(ModuleStoreReadBase):
         # place after the course loads and we have its location
         errorlog = make_error_tracker()
         course_descriptor = None
-        try:
-            course_descriptor = self.load_course(course_dir, course_ids, errorlog.tracker)
-        except Exception as exc:  # pylint: disable=broad-except
-            msg = "ERROR: Failed to load course '{0}': {1}".format(
-                course_dir.encode("utf-8"), unicode(exc)
-            )
-            log.exception(msg)
-            errorlog.tracker(msg)
-            self.errored_courses[course_dir] = errorlog
+
+        snapshot_path = self._snapshot_path(course_dir) if self.snapshot_dir else None
+        snapshot = read_snapshot(snapshot_path) if snapshot_path else None
+        if snapshot is not None:
+            if course_ids is not None and SlashSeparatedCourseKey.from_deprecated_string(snapshot['course_id']) not in course_ids:
+                return None
+            course_descriptor = self._restore_snapshot(snapshot, course_dir, errorlog.tracker)
+
+        if course_descriptor is None:
+            try:
+                course_descriptor = self.load_course(course_dir, course_ids, errorlog.tracker)
+            except Exception as exc:  # pylint: disable=broad-except
+                msg = "ERROR: Failed to load course '{0}': {1}".format(
+                    course_dir.encode("utf-8"), unicode(exc)
+                )
+                log.exception(msg)
+                errorlog.tracker(msg)
+                self.errored_courses[course_dir] = errorlog
+            else:
+                # Only courses which loaded cleanly are worth snapshotting
+                if snapshot_path and course_descriptor is not None and not errorlog.errors:
+                    snapshot = self._take_snapshot(course_descriptor, course_dir)
+                    if snapshot is not None:
+                        write_snapshot(snapshot_path, snapshot)
 
         if course_descriptor is None:
-            pass
+            return None
         elif isinstance(course_descriptor, ErrorDescriptor):
             # Didn't load course.  Instead, save the errors elsewhere.
             self.errored_courses[course_dir] = errorlog
+            return None
         else:
             self.courses[course_dir] = course_descriptor
             self._course_errors[course_descriptor.id] = errorlog
             self.parent_trackers[course_descriptor.id].make_known(course_descriptor.scope_ids.usage_id)
+            return course_descriptor
+
+    def _snapshot_path(self, course_dir):
+        """
+        Return the path of the snapshot of the course in `course_dir`, as it is now.
+        """
+        # The blocks loaded depend on these, as well as the course
+        salt = repr((
+            self.default_class and '{0.__module__}.{0.__name__}'.format(self.default_class),
+            self.load_error_modules,
+            ['{0.__module__}.{0.__name__}'.format(mixin) for mixin in self.xblock_mixins],
+        ))
+        return self.snapshot_dir / '{0}.snapshot'.format(course_dir_digest(self.data_dir / course_dir, salt))
+
+    def _take_snapshot(self, course_descriptor, course_dir):
+        """
+        Return a snapshot of the course `course_descriptor` just loaded from
+        `course_dir`, or None if it can't be snapshotted.
+        """
+        blocks = []
+        for usage_id, block in self.modules[course_descriptor.id].iteritems():
+            if isinstance(block, ErrorDescriptor):
+                return None
+            fields = {}
+            for field in block.fields.itervalues():
+                if field.scope in (Scope.content, Scope.settings, Scope.children) and field.is_set_on(block):
+                    fields[field.name] = _reference_to_json(field, field.read_json(block))
+            blocks.append((block.scope_ids.block_type, usage_id.to_deprecated_string(), fields))
+
+        return {
+            'course_id': course_descriptor.id.to_deprecated_string(),
+            'course': course_descriptor.scope_ids.usage_id.to_deprecated_string(),
+            'blocks': blocks,
+        }
+
+    def _restore_snapshot(self, snapshot, course_dir, tracker):
+        """
+        Load the course in `course_dir` from its `snapshot`, returning the course,
+        or None if it couldn't be restored.
+        """
+        course_id = SlashSeparatedCourseKey.from_deprecated_string(snapshot['course_id'])
+        # Policies only matter when parsing the xml, and have been applied
+        system = self._make_import_system(course_id, course_dir, tracker, lambda usage_id: {})
+        try:
+            for block_type, block_id, fields in snapshot['blocks']:
+                usage_id = course_id.make_usage_key_from_deprecated_string(block_id)
+                block = system.construct_xblock_from_class(
+                    system.load_block_type(block_type),
+                    ScopeIds(None, block_type, usage_id, usage_id),
+                    KvsFieldData(InheritanceKeyValueStore(initial_values=fields)),
+                )
+                _convert_reference_fields_to_keys(block)
+                block.data_dir = course_dir
+                block.save()
+                self.modules[course_id][usage_id] = block
+
+            # as process_xml would have done
+            for usage_id, block in self.modules[course_id].iteritems():
+                if block.has_children:
+                    for child in block.children:
+                        self.parent_trackers[course_id].add_parent(child, usage_id)
+
+            course_descriptor = self.modules[course_id][course_id.make_usage_key_from_deprecated_string(snapshot['course'])]
+            compute_inherited_metadata(course_descriptor)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Couldn't restore the course in %s from its snapshot, loading its xml instead", course_dir)
+            self.modules.pop(course_id, None)
+            self.parent_trackers.pop(course_id, None)
+            return None
+
+        log.debug('========> Restored course %s from its snapshot', course_dir)
+        return course_descriptor
 
     def __unicode__(self):
         '''
@@ -477,15 +647,11 @@ class XMLModuleStore(ModuleStoreReadBase):
             log.warning(msg + " " + str(err))
         return {}
 
-    def load_course(self, course_dir, course_ids, tracker):
+    def _read_course_xml(self, course_dir, tracker):
         """
-        Load a course into this module store
-        course_path: Course directory name
-
-        returns a CourseDescriptor for the course
+        Parse the course.xml of `course_dir`, returning its root element, the
+        course's id, and whether the course has a policy (i.e. sets a url_name).
         """
-        log.debug('========> Starting course import from {0}'.format(course_dir))
-
         with open(self.data_dir / course_dir / "course.xml") as course_file:
 
             # VS[compat]
@@ -495,106 +661,127 @@ class XMLModuleStore(ModuleStoreReadBase):
 
             course_data = etree.parse(course_file, parser=edx_xml_parser).getroot()
 
-            org = course_data.get('org')
-
-            if org is None:
-                msg = ("No 'org' attribute set for course in {dir}. "
-                       "Using default 'edx'".format(dir=course_dir))
-                log.warning(msg)
-                tracker(msg)
-                org = 'edx'
-
-            course = course_data.get('course')
-
-            if course is None:
-                msg = ("No 'course' attribute set for course in {dir}."
-                       " Using default '{default}'".format(dir=course_dir,
-                                                           default=course_dir
-                                                           )
-                       )
-                log.warning(msg)
-                tracker(msg)
-                course = course_dir
-
-            url_name = course_data.get('url_name', course_data.get('slug'))
-            policy_dir = None
-            if url_name:
-                policy_dir = self.data_dir / course_dir / 'policies' / url_name
-                policy_path = policy_dir / 'policy.json'
-
-                policy = self.load_policy(policy_path, tracker)
-
-                # VS[compat]: remove once courses use the policy dirs.
-                if policy == {}:
-                    old_policy_path = self.data_dir / course_dir / 'policies' / '{0}.json'.format(url_name)
-                    policy = self.load_policy(old_policy_path, tracker)
+        org = course_data.get('org')
+
+        if org is None:
+            msg = ("No 'org' attribute set for course in {dir}. "
+                   "Using default 'edx'".format(dir=course_dir))
+            log.warning(msg)
+            tracker(msg)
+            org = 'edx'
+
+        course = course_data.get('course')
+
+        if course is None:
+            msg = ("No 'course' attribute set for course in {dir}."
+                   " Using default '{default}'".format(dir=course_dir,
+                                                       default=course_dir
+                                                       )
+                   )
+            log.warning(msg)
+            tracker(msg)
+            course = course_dir
+
+        url_name = course_data.get('url_name', course_data.get('slug'))
+        has_policy = bool(url_name)
+        if not has_policy:
+            # VS[compat] : 'name' is deprecated, but support it for now...
+            if course_data.get('name'):
+                url_name = Location.clean(course_data.get('name'))
+                tracker("'name' is deprecated for module xml.  Please use "
+                        "display_name and url_name.")
             else:
-                policy = {}
-                # VS[compat] : 'name' is deprecated, but support it for now...
-                if course_data.get('name'):
-                    url_name = Location.clean(course_data.get('name'))
-                    tracker("'name' is deprecated for module xml.  Please use "
-                            "display_name and url_name.")
-                else:
-                    raise ValueError("Can't load a course without a 'url_name' "
-                                     "(or 'name') set.  Set url_name.")
-
-            course_id = SlashSeparatedCourseKey(org, course, url_name)
-            if course_ids is not None and course_id not in course_ids:
-                return None
+                raise ValueError("Can't load a course without a 'url_name' "
+                                 "(or 'name') set.  Set url_name.")
 
-            def get_policy(usage_id):
-                """
-                Return the policy dictionary to be applied to the specified XBlock usage
-                """
-                return policy.get(policy_key(usage_id), {})
-
-            services = {}
-            if self.i18n_service:
-                services['i18n'] = self.i18n_service
-
-            system = ImportSystem(
-                xmlstore=self,
-                course_id=course_id,
-                course_dir=course_dir,
-                error_tracker=tracker,
-                parent_tracker=self.parent_trackers[course_id],
-                load_error_modules=self.load_error_modules,
-                get_policy=get_policy,
-                mixins=self.xblock_mixins,
-                default_class=self.default_class,
-                select=self.xblock_select,
-                field_data=self.field_data,
-                services=services,
-            )
+        return course_data, SlashSeparatedCourseKey(org, course, url_name), has_policy
 
-            course_descriptor = system.process_xml(etree.tostring(course_data, encoding='unicode'))
+    def _make_import_system(self, course_id, course_dir, tracker, get_policy):
+        """
+        Make the ImportSystem for loading the course `course_id` from `course_dir`.
+        """
+        services = {}
+        if self.i18n_service:
+            services['i18n'] = self.i18n_service
+
+        return ImportSystem(
+            xmlstore=self,
+            course_id=course_id,
+            course_dir=course_dir,
+            error_tracker=tracker,
+            parent_tracker=self.parent_trackers[course_id],
+            load_error_modules=self.load_error_modules,
+            get_policy=get_policy,
+            mixins=self.xblock_mixins,
+            default_class=self.default_class,
+            select=self.xblock_select,
+            field_data=self.field_data,
+            services=services,
+        )
 
-            # If we fail to load the course, then skip the rest of the loading steps
-            if isinstance(course_descriptor, ErrorDescriptor):
-                return course_descriptor
+    def load_course(self, course_dir, course_ids, tracker):
+        """
+        Load a course into this module store
+        course_path: Course directory name
 
-            # NOTE: The descriptors end up loading somewhat bottom up, which
-            # breaks metadata inheritance via get_children().  Instead
-            # (actually, in addition to, for now), we do a final inheritance pass
-            # after we have the course descriptor.
-            compute_inherited_metadata(course_descriptor)
+        returns a CourseDescriptor for the course
+        """
+        log.debug('========> Starting course import from {0}'.format(course_dir))
+
+        course_data, course_id, has_policy = self._read_course_xml(course_dir, tracker)
+        url_name = course_id.run
+
+        if has_policy:
+            policy_dir = self.data_dir / course_dir / 'policies' / url_name
+            policy_path = policy_dir / 'policy.json'
 
-            # now import all pieces of course_info which is expected to be stored
-            # in <content_dir>/info or <content_dir>/info/<url_name>
-            self.load_extra_content(system, course_descriptor, 'course_info', self.data_dir / course_dir / 'info', course_dir, url_name)
+            policy = self.load_policy(policy_path, tracker)
 
-            # now import all static tabs which are expected to be stored in
-            # in <content_dir>/tabs or <content_dir>/tabs/<url_name>
-            self.load_extra_content(system, course_descriptor, 'static_tab', self.data_dir / course_dir / 'tabs', course_dir, url_name)
+            # VS[compat]: remove once courses use the policy dirs.
+            if policy == {}:
+                old_policy_path = self.data_dir / course_dir / 'policies' / '{0}.json'.format(url_name)
+                policy = self.load_policy(old_policy_path, tracker)
+        else:
+            policy = {}
 
-            self.load_extra_content(system, course_descriptor, 'custom_tag_template', self.data_dir / course_dir / 'custom_tags', course_dir, url_name)
+        if course_ids is not None and course_id not in course_ids:
+            return None
 
-            self.load_extra_content(system, course_descriptor, 'about', self.data_dir / course_dir / 'about', course_dir, url_name)
+        def get_policy(usage_id):
+            """
+            Return the policy dictionary to be applied to the specified XBlock usage
+            """
+            return policy.get(policy_key(usage_id), {})
 
-            log.debug('========> Done with course import from {0}'.format(course_dir))
+        system = self._make_import_system(course_id, course_dir, tracker, get_policy)
+
+        course_descriptor = system.process_xml(etree.tostring(course_data, encoding='unicode'))
+
+        # If we fail to load the course, then skip the rest of the loading steps
+        if isinstance(course_descriptor, ErrorDescriptor):
             return course_descriptor
 
+        # NOTE: The descriptors end up loading somewhat bottom up, which
+        # breaks metadata inheritance via get_children().  Instead
+        # (actually, in addition to, for now), we do a final inheritance pass
+        # after we have the course descriptor.
+        compute_inherited_metadata(course_descriptor)
+
+        # now import all pieces of course_info which is expected to be stored
+        # in <content_dir>/info or <content_dir>/info/<url_name>
+        self.load_extra_content(system, course_descriptor, 'course_info', self.data_dir / course_dir / 'info', course_dir, url_name)
+
+        # now import all static tabs which are expected to be stored in
+        # in <content_dir>/tabs or <content_dir>/tabs/<url_name>
+        self.load_extra_content(system, course_descriptor, 'static_tab', self.data_dir / course_dir / 'tabs', course_dir, url_name)
+
+        self.load_extra_content(system, course_descriptor, 'custom_tag_template', self.data_dir / course_dir / 'custom_tags', course_dir, url_name)
+
+        self.load_extra_content(system, course_descriptor, 'about', self.data_dir / course_dir / 'about', course_dir, url_name)
+
+        log.debug('========> Done with course import from {0}'.format(course_dir))
+        return course_descriptor
+
     def load_extra_content(self, system, course_descriptor, category, base_dir, course_dir, url_name):
         self._load_extra_content(system, course_descriptor, category, base_dir, course_dir)
 
@@ -697,6 +884,7 @@ class XMLModuleStore(ModuleStoreReadBase):
         """
         Returns True if location exists in this ModuleStore.
         """
+        self._ensure_loaded(usage_key.course_key)
         return usage_key in self.modules[usage_key.course_key]
 
     def get_item(self, usage_key, depth=0):
@@ -711,6 +899,7 @@ class XMLModuleStore(ModuleStoreReadBase):
 
         usage_key: a UsageKey that matches the module we are looking for.
         """
+        self._ensure_loaded(usage_key.course_key)
         try:
             return self.modules[usage_key.course_key][usage_key]
         except KeyError:
@@ -741,6 +930,7 @@ class XMLModuleStore(ModuleStoreReadBase):
                 you can search dates by providing either a datetime for == (probably
                 useless) or a tuple (">"|"<" datetime) for after or before, etc.
         """
+        self._ensure_loaded(course_id)
         items = []
 
         category = kwargs.pop('category', None)
@@ -767,13 +957,42 @@ class XMLModuleStore(ModuleStoreReadBase):
         Returns a list of course descriptors.  If there were errors on loading,
         some of these may be ErrorDescriptors instead.
         """
+        self._ensure_all_loaded()
         return self.courses.values()
 
+    def get_course(self, course_id, depth=None):
+        """
+        Returns the course with the id course_id, loading only that course if
+        need be, or None if there isn't one.
+        """
+        assert(isinstance(course_id, CourseKey))
+        self._ensure_loaded(course_id)
+        for course in self.courses.itervalues():
+            if course.id == course_id:
+                return course
+        return None
+
+    def has_course(self, course_id, ignore_case=False):
+        """
+        Returns whether there's a course with the id course_id (see ModuleStoreRead.has_course).
+        """
+        if ignore_case:
+            return super(XMLModuleStore, self).has_course(course_id, ignore_case)
+        return self.get_course(course_id) is not None
+
+    def get_course_errors(self, course_key):
+        """
+        Return list of errors for this :class:`.CourseKey`, if any.
+        """
+        self._ensure_loaded(course_key)
+        return super(XMLModuleStore, self).get_course_errors(course_key)
+
     def get_errored_courses(self):
         """
         Return a dictionary of course_dir -> [(msg, exception_str)], for each
         course_dir where course loading failed.
         """
+        self._ensure_all_loaded()
         return dict((k, self.errored_courses[k].errors) for k in self.errored_courses)
 
     def get_orphans(self, course_key):
@@ -792,6 +1011,7 @@ class XMLModuleStore(ModuleStoreReadBase):
         returns an iterable of things that can be passed to Location.  This may
         be empty if there are no parents.
         '''
+        self._ensure_loaded(location.course_key)
         if not self.parent_trackers[location.course_key].is_known(location):
             raise ItemNotFoundError("{0} not in {1}".format(location, location.course_key))
 
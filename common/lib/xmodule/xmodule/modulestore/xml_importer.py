@@ -1,6 +1,7 @@
 import logging
 import os
 import mimetypes
+from multiprocessing.pool import ThreadPool
 from path import path
 import json
 
@@ -19,11 +20,22 @@ from xmodule.modulestore.exceptions import InvalidLocationError
 
 log = logging.getLogger(__name__)
 
+# How many modules to write to the store at once
+IMPORT_BATCH_SIZE = 100
+
+# How many static assets to upload to the content store at once
+STATIC_CONTENT_IMPORT_THREADS = 4
+
 
 def import_static_content(
         course_data_path, static_content_store,
-        target_course_id, subpath='static', verbose=False):
-
+        target_course_id, subpath='static', verbose=False,
+        threads=STATIC_CONTENT_IMPORT_THREADS):
+    """
+    Import the files under `subpath` of `course_data_path` into the static
+    content store, `threads` at a time, returning a dict mapping their paths
+    to their asset keys.
+    """
     remap_dict = {}
 
     # now import all static assets
@@ -42,66 +54,84 @@ def import_static_content(
     mimetypes.add_type('application/octet-stream', '.srt')
     mimetypes_list = mimetypes.types_map.values()
 
-    for dirname, _, filenames in os.walk(static_dir):
-        for filename in filenames:
-
-            content_path = os.path.join(dirname, filename)
-
-            if filename.endswith('~'):
-                if verbose:
-                    log.debug('skipping static content %s...', content_path)
-                continue
+    def _import_file(content_path):
+        """
+        Import the file at `content_path`, returning its path in the course
+        and asset key, or None if it was skipped.
+        """
+        filename = os.path.basename(content_path)
 
+        if filename.endswith('~'):
             if verbose:
-                log.debug('importing static content %s...', content_path)
+                log.debug('skipping static content %s...', content_path)
+            return None
 
-            try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
-            except IOError:
-                if filename.startswith('._'):
-                    # OS X "companion files". See
-                    # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
-                    continue
-                # Not a 'hidden file', then re-raise exception
-                raise
-
-            # strip away leading path from the name
-            fullname_with_subpath = content_path.replace(static_dir, '')
-            if fullname_with_subpath.startswith('/'):
-                fullname_with_subpath = fullname_with_subpath[1:]
-            asset_key = StaticContent.compute_location(target_course_id, fullname_with_subpath)
-
-            policy_ele = policy.get(asset_key.path, {})
-            displayname = policy_ele.get('displayname', filename)
-            locked = policy_ele.get('locked', False)
-            mime_type = policy_ele.get('contentType')
-
-            # Check extracted contentType in list of all valid mimetypes
-            if not mime_type or mime_type not in mimetypes_list:
-                mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
-            content = StaticContent(
-                asset_key, displayname, mime_type, data,
-                import_path=fullname_with_subpath, locked=locked
-            )
+        if verbose:
+            log.debug('importing static content %s...', content_path)
 
-            # first let's save a thumbnail so we can get back a thumbnail location
-            thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
+        try:
+            with open(content_path, 'rb') as f:
+                data = f.read()
+        except IOError:
+            if filename.startswith('._'):
+                # OS X "companion files". See
+                # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
+                return None
+            # Not a 'hidden file', then re-raise exception
+            raise
+
+        # strip away leading path from the name
+        fullname_with_subpath = content_path.replace(static_dir, '')
+        if fullname_with_subpath.startswith('/'):
+            fullname_with_subpath = fullname_with_subpath[1:]
+        asset_key = StaticContent.compute_location(target_course_id, fullname_with_subpath)
+
+        policy_ele = policy.get(asset_key.path, {})
+        displayname = policy_ele.get('displayname', filename)
+        locked = policy_ele.get('locked', False)
+        mime_type = policy_ele.get('contentType')
+
+        # Check extracted contentType in list of all valid mimetypes
+        if not mime_type or mime_type not in mimetypes_list:
+            mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
+        content = StaticContent(
+            asset_key, displayname, mime_type, data,
+            import_path=fullname_with_subpath, locked=locked
+        )
 
-            if thumbnail_content is not None:
-                content.thumbnail_location = thumbnail_location
+        # first let's save a thumbnail so we can get back a thumbnail location
+        thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
 
-            # then commit the content
-            try:
-                static_content_store.save(content)
-            except Exception as err:
-                log.exception('Error importing {0}, error={1}'.format(
-                    fullname_with_subpath, err
-                ))
+        if thumbnail_content is not None:
+            content.thumbnail_location = thumbnail_location
 
-            # store the remapping information which will be needed
-            # to subsitute in the module data
-            remap_dict[fullname_with_subpath] = asset_key
+        # then commit the content
+        try:
+            static_content_store.save(content)
+        except Exception as err:
+            log.exception('Error importing {0}, error={1}'.format(
+                fullname_with_subpath, err
+            ))
+
+        return fullname_with_subpath, asset_key
+
+    content_paths = (
+        os.path.join(dirname, filename)
+        for dirname, _, filenames in os.walk(static_dir)
+        for filename in filenames
+    )
+
+    # The files are read in the threads, so only `threads` of them are in memory at once
+    pool = ThreadPool(threads)
+    try:
+        for imported in pool.imap_unordered(_import_file, content_paths):
+            if imported is not None:
+                fullname_with_subpath, asset_key = imported
+                # store the remapping information which will be needed
+                # to subsitute in the module data
+                remap_dict[fullname_with_subpath] = asset_key
+    finally:
+        pool.terminate()
 
     return remap_dict
 
@@ -291,7 +321,9 @@ def import_from_xml(
                     dest_course_id, subpath=simport, verbose=verbose
                 )
 
-            # finally loop through all the modules
+            # finally loop through all the modules, writing them to the
+            # store IMPORT_BATCH_SIZE at a time
+            new_modules = []
             for module in xml_module_store.modules[course_key].itervalues():
                 if module.scope_ids.block_type == 'course':
                     # we've already saved the course module up at the top
@@ -303,13 +335,17 @@ def import_from_xml(
                         loc=module.location
                     ))
 
-                import_module(
+                new_modules.append(_copy_module_into_course(
                     module, store,
                     course_key,
                     dest_course_id,
                     do_import_static=do_import_static,
                     system=course.runtime
-                )
+                ))
+                if len(new_modules) >= IMPORT_BATCH_SIZE:
+                    store.update_items(new_modules, '**replace_user**', allow_not_found=True)
+                    new_modules = []
+            store.update_items(new_modules, '**replace_user**', allow_not_found=True)
 
             # now import any 'draft' items
             if draft_store is not None:
@@ -338,7 +374,26 @@ def import_module(
         module, store,
         source_course_id, dest_course_id,
         do_import_static=True, system=None):
+    """
+    Save a copy of `module` in the course `dest_course_id` of `store`, and
+    return the copy.
+    """
+    new_module = _copy_module_into_course(
+        module, store, source_course_id, dest_course_id,
+        do_import_static=do_import_static, system=system
+    )
+    store.update_item(new_module, '**replace_user**', allow_not_found=True)
+    return new_module
+
 
+def _copy_module_into_course(
+        module, store,
+        source_course_id, dest_course_id,
+        do_import_static=True, system=None):
+    """
+    Return a copy of `module` in the course `dest_course_id` of `store`,
+    without saving it.
+    """
     logging.debug(u'processing import of module {}...'.format(module.location.to_deprecated_string()))
 
     if do_import_static and 'data' in module.fields and isinstance(module.fields['data'], xblock.fields.String):
@@ -398,7 +453,6 @@ def import_module(
                 setattr(new_module, field_name, value)
             else:
                 setattr(new_module, field_name, getattr(module, field_name))
-    store.update_item(new_module, '**replace_user**', allow_not_found=True)
     return new_module
 
 
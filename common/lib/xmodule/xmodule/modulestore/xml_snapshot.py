@@ -0,0 +1,77 @@
+"""
+Snapshots of the courses an XMLModuleStore has parsed, which load much faster
+than parsing the XML again.
+
+A snapshot is the course's blocks (their types, ids and explicitly set fields)
+and parent pointers, stored as compressed json under a digest of the contents
+of the course directory. Changing anything in the course changes the digest,
+so a stale snapshot is never used; old ones are never deleted, so point
+`snapshot_dir` at a directory which is cleaned up by other means.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import zlib
+
+log = logging.getLogger(__name__)
+
+# Change this when the snapshots' format changes, to ignore older ones
+SNAPSHOT_VERSION = 1
+
+# Files under these directories of a course aren't parsed, so don't affect snapshots
+IGNORED_DIRS = ('static',)
+
+# How much of a file to read at once when taking its digest
+CHUNK_SIZE = 65536
+
+
+def course_dir_digest(course_path, salt=''):
+    """
+    Return a hex digest of the names and contents of the files in
+    `course_path` (and `salt`, for anything else a snapshot depends on).
+    """
+    digest = hashlib.sha1('{}\0{}\0'.format(SNAPSHOT_VERSION, salt))
+    for dirpath, dirnames, filenames in os.walk(course_path):
+        # walk in the same order everywhere
+        dirnames.sort()
+        if dirpath == course_path:
+            dirnames[:] = [dirname for dirname in dirnames if dirname not in IGNORED_DIRS]
+        for filename in sorted(filenames):
+            file_path = os.path.join(dirpath, filename)
+            digest.update('{}\0{}\0'.format(os.path.relpath(file_path, course_path), os.path.getsize(file_path)))
+            with open(file_path, 'rb') as course_file:
+                for chunk in iter(lambda: course_file.read(CHUNK_SIZE), ''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_snapshot(snapshot_path):
+    """
+    Return the snapshot stored at `snapshot_path`, or None if there isn't one
+    (or it can't be read).
+    """
+    try:
+        with open(snapshot_path, 'rb') as snapshot_file:
+            return json.loads(zlib.decompress(snapshot_file.read()))
+    except IOError:
+        return None
+    except (ValueError, zlib.error):
+        log.warning("Ignoring the damaged course snapshot %s", snapshot_path)
+        return None
+
+
+def write_snapshot(snapshot_path, snapshot):
+    """
+    Store `snapshot` at `snapshot_path`. Readers see all of it or none of it.
+    """
+    directory = os.path.dirname(snapshot_path)
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as temp_file:
+            temp_file.write(zlib.compress(json.dumps(snapshot)))
+        os.rename(temp_file.name, snapshot_path)
+    except (IOError, OSError):
+        log.exception("Couldn't save the course snapshot %s", snapshot_path)
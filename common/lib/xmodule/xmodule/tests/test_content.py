@@ -1,5 +1,6 @@
 import unittest
-from xmodule.contentstore.content import StaticContent
+from StringIO import StringIO
+from xmodule.contentstore.content import StaticContent, StaticContentStream
 from xmodule.contentstore.content import ContentStore
 from xmodule.modulestore.locations import SlashSeparatedCourseKey, AssetLocation
 
@@ -46,3 +47,15 @@ class ContentTest(unittest.TestCase):
             AssetLocation(u'foo', u'bar', None, u'asset', u'images_course_image.jpg', None),
             asset_location
         )
+
+    def test_stream_data_in_range(self):
+        data = 'abcdefghijklmnopqrstuvwxyz'
+        location = AssetLocation(u'foo', u'bar', None, u'asset', u'letters.txt', None)
+        content = StaticContent(location, 'letters.txt', 'text/plain', data, length=len(data))
+        self.assertEqual(''.join(content.stream_data_in_range(3, 5)), 'def')
+
+        stream = StringIO(data)
+        stream.chunk_size = 4
+        content = StaticContentStream(location, 'letters.txt', 'text/plain', stream, length=len(data))
+        self.assertEqual(list(content.stream_data_in_range(3, 12)), ['defg', 'hijk', 'lm'])
+        self.assertEqual(''.join(content.stream_data_in_range(20, 25)), 'uvwxyz')
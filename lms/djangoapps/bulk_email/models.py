@@ -17,7 +17,7 @@ from django.contrib.auth.models import User
 from django.db import models, transaction
 
 from html_to_text import html_to_text
-from mail_utils import wrap_message
+from mail_utils import wrap_message, wrap_line_start
 
 from xmodule_django.models import CourseKeyField
 
@@ -139,6 +139,57 @@ class Optout(models.Model):
 # the location where the email message body is to be inserted.
 COURSE_EMAIL_MESSAGE_BODY_TAG = '{{message_body}}'
 
+# The context values which differ between the recipients of an email.
+RECIPIENT_CONTEXT_FIELDS = ('name', 'email')
+
+# Stands in for a recipient's value in a compiled template, until it's filled in.
+RECIPIENT_FIELD_PLACEHOLDER = u'\x00{}\x00'
+
+
+class CompiledEmailTemplate(object):
+    """
+    A template rendered with a message body and the context that's the same
+    for every recipient of an email, leaving the recipient's own values
+    (RECIPIENT_CONTEXT_FIELDS) to be filled in for each of them by `render`.
+
+    Only the parts of lines from a recipient's values on need to be wrapped
+    again.
+    """
+    def __init__(self, format_string, message_body, context):
+        context = dict(context)
+        for field in RECIPIENT_CONTEXT_FIELDS:
+            context[field] = RECIPIENT_FIELD_PLACEHOLDER.format(field)
+        result = CourseEmailTemplate._render(format_string, message_body, context, wrap=False)
+
+        # Each line, as the wrapped lines it starts with, the rest of it,
+        # and the recipient fields the rest needs (none if it's all wrapped)
+        self.lines = []
+        for line in result.split('\n'):
+            positions = dict(
+                (field, line.find(RECIPIENT_FIELD_PLACEHOLDER.format(field)))
+                for field in RECIPIENT_CONTEXT_FIELDS
+            )
+            fields = [field for field in RECIPIENT_CONTEXT_FIELDS if positions[field] >= 0]
+            if fields:
+                start_lines, rest = wrap_line_start(line, min(positions[field] for field in fields))
+                self.lines.append((start_lines, rest, fields))
+            else:
+                self.lines.append(([wrap_message(line)], u'', fields))
+
+    def render(self, context):
+        """
+        Return the message for the recipient whose values are in `context`,
+        the same as CourseEmailTemplate.render_* would.
+        """
+        lines = []
+        for start_lines, rest, fields in self.lines:
+            lines.extend(start_lines)
+            if fields:
+                for field in fields:
+                    rest = rest.replace(RECIPIENT_FIELD_PLACEHOLDER.format(field), context[field])
+                lines.append(wrap_message(rest))
+        return u'\n'.join(lines)
+
 
 class CourseEmailTemplate(models.Model):
     """
@@ -166,7 +217,7 @@ class CourseEmailTemplate(models.Model):
             raise
 
     @staticmethod
-    def _render(format_string, message_body, context):
+    def _render(format_string, message_body, context, wrap=True):
         """
         Create a text message using a template, message body and context.
 
@@ -185,6 +236,8 @@ class CourseEmailTemplate(models.Model):
         Output is returned as a unicode string.  It is not encoded as utf-8.
         Such encoding is left to the email code, which will use the value
         of settings.DEFAULT_CHARSET to encode the message.
+
+        Long lines are wrapped, unless `wrap` is False.
         """
         # If we wanted to support substitution, we'd call:
         # format_string = format_string.replace(COURSE_EMAIL_MESSAGE_BODY_TAG, message_body)
@@ -196,7 +249,7 @@ class CourseEmailTemplate(models.Model):
         result = result.replace(message_body_tag, message_body, 1)
 
         # finally, return the result, after wrapping long lines and without converting to an encoded byte array.
-        return wrap_message(result)
+        return wrap_message(result) if wrap else result
 
     def render_plaintext(self, plaintext, context):
         """
@@ -216,6 +269,22 @@ class CourseEmailTemplate(models.Model):
         """
         return CourseEmailTemplate._render(self.html_template, htmltext, context)
 
+    def compile_plaintext(self, plaintext, context):
+        """
+        Like `render_plaintext`, but returns a CompiledEmailTemplate, for
+        rendering the message for many recipients.  `context` need not
+        include the recipient's values.
+        """
+        return CompiledEmailTemplate(self.plain_template, plaintext, context)
+
+    def compile_htmltext(self, htmltext, context):
+        """
+        Like `render_htmltext`, but returns a CompiledEmailTemplate, for
+        rendering the message for many recipients.  `context` need not
+        include the recipient's values.
+        """
+        return CompiledEmailTemplate(self.html_template, htmltext, context)
+
 
 class CourseAuthorization(models.Model):
     """
@@ -245,6 +314,19 @@ class CourseAuthorization(models.Model):
         except cls.DoesNotExist:
             return False
 
+    @classmethod
+    def instructor_email_enabled_courses(cls, course_ids):
+        """
+        Returns the set of the given course ids for which email is enabled
+        (see instructor_email_enabled), found with one query.
+        """
+        if not settings.FEATURES['REQUIRE_COURSE_EMAIL_AUTH']:
+            return set(course_ids)
+
+        return set(
+            cls.objects.filter(course_id__in=course_ids, email_enabled=True).values_list('course_id', flat=True)
+        )
+
     def __unicode__(self):
         not_en = "Not "
         if self.email_enabled:
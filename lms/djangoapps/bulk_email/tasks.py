@@ -5,7 +5,6 @@ to a course.
 import re
 import random
 import json
-from time import sleep
 
 from dogapi import dog_stats_api
 from smtplib import SMTPServerDisconnected, SMTPDataError, SMTPConnectError, SMTPException
@@ -36,6 +35,7 @@ from bulk_email.models import (
     CourseEmail, Optout, CourseEmailTemplate,
     SEND_TO_MYSELF, SEND_TO_ALL, TO_OPTIONS,
 )
+from bulk_email.throttle import TokenBucket
 from courseware.courses import get_course, course_image_url
 from student.roles import CourseStaffRole, CourseInstructorRole
 from instructor_task.models import InstructorTask
@@ -433,13 +433,26 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
     from_addr = _get_source_address(course_email.course_id, course_title)
 
     course_email_template = CourseEmailTemplate.get_template()
+
+    # Throttle if we have gotten the rate limiter.  If a task has been retried
+    # for rate-limiting reasons, then it takes a token from a bucket shared by
+    # all of the workers before each email, so that together they send no
+    # faster than BULK_EMAIL_MAX_SENDS_PER_SECOND.
+    throttle = None
+    if subtask_status.retried_nomax > 0:
+        throttle = TokenBucket('bulk_email.sends', settings.BULK_EMAIL_MAX_SENDS_PER_SECOND)
+
     try:
+        # All of the emails go over the one connection.
         connection = get_connection()
         connection.open()
 
-        # Define context values to use in all course emails:
+        # Render the templates once, leaving only the recipients' own values to fill in:
+        plaintext_template = course_email_template.compile_plaintext(course_email.text_message, global_email_context)
+        html_template = course_email_template.compile_htmltext(course_email.html_message, global_email_context)
+
+        # Define context values specific to each recipient:
         email_context = {'name': '', 'email': ''}
-        email_context.update(global_email_context)
 
         while to_list:
             # Update context with user-specific values from the user at the end of the list.
@@ -453,8 +466,8 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             email_context['name'] = current_recipient['profile__name']
 
             # Construct message content using templates and context:
-            plaintext_msg = course_email_template.render_plaintext(course_email.text_message, email_context)
-            html_msg = course_email_template.render_htmltext(course_email.html_message, email_context)
+            plaintext_msg = plaintext_template.render(email_context)
+            html_msg = html_template.render(email_context)
 
             # Create email:
             email_msg = EmailMultiAlternatives(
@@ -466,13 +479,9 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             )
             email_msg.attach_alternative(html_msg, 'text/html')
 
-            # Throttle if we have gotten the rate limiter.  This is not very high-tech,
-            # but if a task has been retried for rate-limiting reasons, then we sleep
-            # for a period of time between all emails within this task.  Choice of
-            # the value depends on the number of workers that might be sending email in
-            # parallel, and what the SES throttle rate is.
-            if subtask_status.retried_nomax > 0:
-                sleep(settings.BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
+            if throttle is not None:
+                waited = throttle.take()
+                dog_stats_api.histogram('course_email.throttle.wait', waited, tags=[_statsd_tag(course_title)])
 
             try:
                 log.debug('Email with id %s to be sent to %s', email_id, email)
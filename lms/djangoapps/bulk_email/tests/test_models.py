@@ -104,6 +104,25 @@ class CourseEmailTemplateTest(TestCase):
         context = self._get_sample_plain_context()
         template.render_plaintext("My new plain text.", context)
 
+    def test_compiled_matches_render(self):
+        template = CourseEmailTemplate.get_template()
+        context = self._get_sample_html_context()
+        global_context = dict(context)
+        del global_context['email']
+        body = u"<p>{name} ｲ乇丂ｲ</p>" + u"x " * 1000
+        compiled_html = template.compile_htmltext(body, global_context)
+        compiled_plain = template.compile_plaintext(body, global_context)
+        for name, email in [(u'Ŧëṡẗ', 'student@example.com'), (u'x' * 1000, 'y' * 1000 + '@example.com')]:
+            context.update(name=name, email=email)
+            self.assertEquals(compiled_html.render(context), template.render_htmltext(body, context))
+            self.assertEquals(compiled_plain.render(context), template.render_plaintext(body, context))
+
+    def test_compiled_without_recipient_context(self):
+        template = CourseEmailTemplate.get_template()
+        compiled = template.compile_plaintext("My new plain text.", self._get_sample_plain_context())
+        with self.assertRaises(KeyError):
+            compiled.render({})
+
 
 class CourseAuthorizationTest(TestCase):
     """Test the CourseAuthorization model."""
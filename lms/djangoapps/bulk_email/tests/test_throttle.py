@@ -0,0 +1,53 @@
+"""
+Unit tests for the rate limiter shared by bulk email workers.
+"""
+from django.core.cache import cache
+from django.test import TestCase
+from mock import patch
+
+from bulk_email.throttle import TokenBucket
+
+
+class FakeClock(object):
+    """A clock which only moves when slept on."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):  # pylint: disable=missing-docstring
+        return self.now
+
+    def sleep(self, seconds):  # pylint: disable=missing-docstring
+        self.now += seconds
+
+
+class TokenBucketTest(TestCase):
+    """Test the TokenBucket rate limiter."""
+
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock(1000.25)
+        patcher = patch('bulk_email.throttle.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_waits_for_next_period(self):
+        bucket = TokenBucket('test.sends', 3)
+        self.assertEquals([bucket.take() for _ in range(3)], [0, 0, 0])
+        self.assertEquals(bucket.take(), 0.75)
+        self.assertEquals(self.clock.now, 1001)
+        self.assertEquals([bucket.take() for _ in range(2)], [0, 0])
+        self.assertEquals(bucket.take(), 1)
+
+    def test_shared_between_buckets(self):
+        # e.g. in two workers
+        first, second = TokenBucket('test.sends', 2), TokenBucket('test.sends', 2)
+        self.assertEquals([first.take(), second.take()], [0, 0])
+        self.assertEquals(second.take(), 0.75)
+        # but not with other keys
+        self.assertEquals(TokenBucket('test.other', 2).take(), 0)
+
+    def test_fractional_rate(self):
+        bucket = TokenBucket('test.sends', 0.5, period=4)
+        self.assertEquals([bucket.take(), bucket.take()], [0, 0])
+        self.assertEquals(bucket.take(), 3.75)
@@ -0,0 +1,59 @@
+"""
+A rate limiter for sending email, shared by all of the workers sending it.
+
+The workers share a token bucket through the cache: each period of
+`period` seconds, the bucket holds `rate * period` tokens, and a worker
+takes one for each email it sends, waiting for the next period if the bucket
+is empty.  Tokens are counted with the cache's atomic `incr`, so the workers
+don't have to lock anything.
+"""
+import math
+import time
+
+from django.core.cache import get_cache
+
+
+class TokenBucket(object):
+    """
+    Lets through at most `rate` calls of `take` a second, across all of the
+    processes using the same `cache` (the name of one of settings.CACHES) and
+    `key`.
+    """
+    def __init__(self, key, rate, period=1, cache='default'):
+        self.key = key
+        self.tokens_per_period = max(int(rate * period), 1)
+        self.period = period
+        self.cache = get_cache(cache)
+
+    def take(self):
+        """
+        Take a token from the bucket, waiting until there is one if need be.
+        Returns the number of seconds spent waiting.
+        """
+        waited = 0
+        while True:
+            now = time.time()
+            period_number = int(now // self.period)
+            if self._take_from(period_number):
+                return waited
+            delay = (period_number + 1) * self.period - now
+            time.sleep(delay)
+            waited += delay
+
+    def _take_from(self, period_number):
+        """
+        Take a token from the bucket for period `period_number`, returning
+        whether there was one left.
+        """
+        key = u'{}:{}'.format(self.key, period_number)
+        # Expire the counter once its period is over, with a little to spare
+        timeout = int(math.ceil(self.period)) + 1
+        self.cache.add(key, 0, timeout)
+        try:
+            taken = self.cache.incr(key)
+        except ValueError:
+            # The counter went between adding and incrementing it (e.g. it
+            # was evicted), so it's as good as a new period.
+            self.cache.add(key, 1, timeout)
+            return True
+        return taken <= self.tokens_per_period
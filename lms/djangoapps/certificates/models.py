@@ -146,3 +146,23 @@ def certificate_status_for_student(student, course_id):
     except GeneratedCertificate.DoesNotExist:
         pass
     return {'status': CertificateStatuses.unavailable, 'mode': GeneratedCertificate.MODES.honor}
+
+
+def certificate_statuses_for_student(student, course_ids):
+    """
+    Returns a dict of the certificate status (see certificate_status_for_student)
+    for each of the given course ids, found with one query.
+    """
+    statuses = {
+        course_id: {'status': CertificateStatuses.unavailable, 'mode': GeneratedCertificate.MODES.honor}
+        for course_id in course_ids
+    }
+    for generated_certificate in GeneratedCertificate.objects.filter(user=student, course_id__in=course_ids):
+        d = {'status': generated_certificate.status,
+             'mode': generated_certificate.mode}
+        if generated_certificate.grade:
+            d['grade'] = generated_certificate.grade
+        if generated_certificate.status == CertificateStatuses.downloadable:
+            d['download_url'] = generated_certificate.download_url
+        statuses[generated_certificate.course_id] = d
+    return statuses
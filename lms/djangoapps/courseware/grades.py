@@ -1,11 +1,13 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 from collections import defaultdict
+import hashlib
 import json
 import random
 import logging
 
 from contextlib import contextmanager
+from itertools import islice
 from django.conf import settings
 from django.db import transaction
 from django.test.client import RequestFactory
@@ -13,15 +15,16 @@ from django.test.client import RequestFactory
 from dogapi import dog_stats_api
 
 from courseware import courses
-from courseware.model_data import FieldDataCache
+from courseware.model_data import FieldDataCache, chunks
 from student.models import anonymous_id_for_user
 from submissions import api as sub_api
+from xblock.fields import Scope
 from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.util.duedate import get_extended_due_date
-from .models import StudentModule
+from .models import OfflineComputedGrade, StudentModule
 from .module_render import get_module_for_descriptor
 from opaque_keys import InvalidKeyError
 
@@ -140,17 +143,93 @@ def answer_distributions(course_key):
 
     return answer_counts
 
+
+class ScoreSnapshot(object):
+    """
+    A read-only snapshot of every StudentModule grade/max_grade for a single
+    student in a single course, loaded with one query.
+
+    Grading used to look up each problem's StudentModule row individually,
+    which made rendering a progress page cost one round trip per problem. The
+    snapshot lets `_grade`, `_progress_summary` and `get_score` answer those
+    lookups from memory instead.
+    """
+    def __init__(self, course_id, student, scores=None):
+        """
+        course_id: the course whose scores are loaded
+        student: the User whose scores are loaded
+        scores: an already fetched dict of usage keys to (grade, max_grade)
+            tuples. If None, the scores are queried from the database.
+        """
+        self.course_id = course_id
+        self.student = student
+
+        if scores is not None:
+            self.scores = scores
+        else:
+            self.scores = {}
+            if student.is_authenticated():
+                student_modules = StudentModule.objects.filter(
+                    student=student,
+                    course_id=course_id,
+                ).only('module_state_key', 'grade', 'max_grade')
+
+                for student_module in student_modules:
+                    usage_key = student_module.module_state_key.map_into_course(course_id)
+                    self.scores[usage_key] = (student_module.grade, student_module.max_grade)
+
+    @classmethod
+    def for_students(cls, course_id, students, chunk_size=500):
+        """
+        Return a dict mapping student ids to a ScoreSnapshot for every student
+        in `students`, issuing one query per `chunk_size` students rather than
+        one per student.
+
+        The chunking works around the limit sqlite3 places on the number of
+        parameters in a single query, as FieldDataCache._chunked_query does.
+        """
+        scores = defaultdict(dict)
+        student_ids = [student.id for student in students if student.is_authenticated()]
+        for student_id_chunk in chunks(student_ids, chunk_size):
+            student_modules = StudentModule.objects.filter(
+                student__in=student_id_chunk,
+                course_id=course_id,
+            ).only('student', 'module_state_key', 'grade', 'max_grade')
+
+            for student_module in student_modules:
+                usage_key = student_module.module_state_key.map_into_course(course_id)
+                scores[student_module.student_id][usage_key] = (student_module.grade, student_module.max_grade)
+
+        return dict(
+            (student.id, cls(course_id, student, scores=scores[student.id]))
+            for student in students
+        )
+
+    def has_any(self, locations):
+        """
+        Return True if the student has a StudentModule for any of `locations`.
+        """
+        return any(location in self.scores for location in locations)
+
+    def get(self, location):
+        """
+        Return the (grade, max_grade) tuple for `location`, or None if the
+        student has no StudentModule for it.
+        """
+        return self.scores.get(location)
+
+
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False):
+def grade(student, request, course, keep_raw_scores=False, score_snapshot=None):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     """
     with manual_transaction():
-        return _grade(student, request, course, keep_raw_scores)
+        return _grade(student, request, course, keep_raw_scores, score_snapshot)
 
 
-def _grade(student, request, course, keep_raw_scores):
+def _grade(student, request, course, keep_raw_scores, score_snapshot=None):
     """
     Unwrapped version of "grade"
 
@@ -169,6 +248,13 @@ def _grade(student, request, course, keep_raw_scores):
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
 
+    If `score_snapshot` is given, it must be a ScoreSnapshot for this student
+    and course; otherwise one is loaded here.
+
+    If the ENABLE_GRADE_CACHE feature is on, the results for each section are
+    persisted (see GradeCache), and a section is only graded again once the
+    scores it depends on have changed.
+
     More information on the format is in the docstring for CourseGrader.
     """
     grading_context = course.grading_context
@@ -181,6 +267,17 @@ def _grade(student, request, course, keep_raw_scores):
         course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
     )
 
+    # Load every StudentModule score for this student up front, so that the
+    # loops below don't need a query per section or per problem.
+    if score_snapshot is None:
+        with manual_transaction():
+            score_snapshot = ScoreSnapshot(course.id, student)
+
+    grade_cache = None
+    if settings.FEATURES.get('ENABLE_GRADE_CACHE') and not settings.GENERATE_PROFILE_SCORES:
+        with manual_transaction():
+            grade_cache = GradeCache(course, student)
+
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
     # passed to the grader
@@ -188,72 +285,21 @@ def _grade(student, request, course, keep_raw_scores):
         format_scores = []
         for section in sections:
             section_descriptor = section['section_descriptor']
-            section_name = section_descriptor.display_name_with_default
 
-            # some problems have state that is updated independently of interaction
-            # with the LMS, so they need to always be scored. (E.g. foldit.,
-            # combinedopenended)
-            should_grade_section = any(
-                descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
-            )
+            section_grade = None
+            if grade_cache is not None:
+                score_inputs = _section_score_inputs(section, score_snapshot, submissions_scores)
+                section_grade = grade_cache.get(section, score_inputs)
 
-            # If there are no problems that always have to be regraded, check to
-            # see if any of our locations are in the scores from the submissions
-            # API. If scores exist, we have to calculate grades for this section.
-            if not should_grade_section:
-                should_grade_section = any(
-                    descriptor.location.to_deprecated_string() in submissions_scores
-                    for descriptor in section['xmoduledescriptors']
+            if section_grade is None:
+                section_grade = _grade_section(
+                    student, request, course, section, score_snapshot, submissions_scores
                 )
+                if grade_cache is not None:
+                    grade_cache.set(section, score_inputs, *section_grade)
 
-            if not should_grade_section:
-                with manual_transaction():
-                    should_grade_section = StudentModule.objects.filter(
-                        student=student,
-                        module_state_key__in=[
-                            descriptor.location for descriptor in section['xmoduledescriptors']
-                        ]
-                    ).exists()
-
-            # If we haven't seen a single problem in the section, we don't have
-            # to grade it at all! We can assume 0%
-            if should_grade_section:
-                scores = []
-
-                def create_module(descriptor):
-                    '''creates an XModule instance given a descriptor'''
-                    # TODO: We need the request to pass into here. If we could forego that, our arguments
-                    # would be simpler
-                    with manual_transaction():
-                        field_data_cache = FieldDataCache([descriptor], course.id, student)
-                    return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
-
-                    (correct, total) = get_score(
-                        course.id, student, module_descriptor, create_module, scores_cache=submissions_scores
-                    )
-                    if correct is None and total is None:
-                        continue
-
-                    if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
-                        if total > 1:
-                            correct = random.randrange(max(total - 2, 1), total + 1)
-                        else:
-                            correct = total
-
-                    graded = module_descriptor.graded
-                    if not total > 0:
-                        #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
-                        graded = False
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
-
-                _, graded_total = graders.aggregate_scores(scores, section_name)
-                if keep_raw_scores:
-                    raw_scores += scores
-            else:
-                graded_total = Score(0.0, 1.0, True, section_name)
+            graded_total, scores = section_grade
+            raw_scores += scores
 
             #Add the graded total to totaled_scores
             if graded_total.possible > 0:
@@ -276,9 +322,245 @@ def _grade(student, request, course, keep_raw_scores):
     if keep_raw_scores:
         grade_summary['raw_scores'] = raw_scores        # way to get all RAW scores out to instructor
                                                         # so grader can be double-checked
+
+    if grade_cache is not None:
+        with manual_transaction():
+            grade_cache.save()
+
     return grade_summary
 
 
+def _grade_section(student, request, course, section, score_snapshot, submissions_scores):
+    """
+    Grade a single section of the course's grading context for `student`.
+
+    Returns a tuple of `(graded_total, scores)`: the Score for the section as a
+    whole, and the list of Scores of the problems within it.
+    """
+    section_descriptor = section['section_descriptor']
+    section_name = section_descriptor.display_name_with_default
+
+    # some problems have state that is updated independently of interaction
+    # with the LMS, so they need to always be scored. (E.g. foldit.,
+    # combinedopenended)
+    should_grade_section = any(
+        descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
+    )
+
+    # If there are no problems that always have to be regraded, check to
+    # see if any of our locations are in the scores from the submissions
+    # API. If scores exist, we have to calculate grades for this section.
+    if not should_grade_section:
+        should_grade_section = any(
+            descriptor.location.to_deprecated_string() in submissions_scores
+            for descriptor in section['xmoduledescriptors']
+        )
+
+    if not should_grade_section:
+        should_grade_section = score_snapshot.has_any(
+            descriptor.location for descriptor in section['xmoduledescriptors']
+        )
+
+    # If we haven't seen a single problem in the section, we don't have
+    # to grade it at all! We can assume 0%
+    if not should_grade_section:
+        return Score(0.0, 1.0, True, section_name), []
+
+    scores = []
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        # TODO: We need the request to pass into here. If we could forego that, our arguments
+        # would be simpler
+        with manual_transaction():
+            field_data_cache = FieldDataCache([descriptor], course.id, student)
+        return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
+
+    for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
+
+        (correct, total) = get_score(
+            course.id, student, module_descriptor, create_module,
+            scores_cache=submissions_scores, score_snapshot=score_snapshot
+        )
+        if correct is None and total is None:
+            continue
+
+        if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
+            if total > 1:
+                correct = random.randrange(max(total - 2, 1), total + 1)
+            else:
+                correct = total
+
+        graded = module_descriptor.graded
+        if not total > 0:
+            #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
+            graded = False
+
+        scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+
+    _, graded_total = graders.aggregate_scores(scores, section_name)
+    return graded_total, scores
+
+
+def _section_score_inputs(section, score_snapshot, submissions_scores):
+    """
+    Return everything stored about `section`'s problems that grading it
+    depends on, in a JSON-serializable form: each problem's location along
+    with its submissions API score and StudentModule (grade, max_grade), if any.
+    """
+    score_inputs = []
+    for descriptor in section['xmoduledescriptors']:
+        location_url = descriptor.location.to_deprecated_string()
+        submissions_score = submissions_scores.get(location_url)
+        student_module_score = score_snapshot.get(descriptor.location)
+        score_inputs.append([
+            location_url,
+            list(submissions_score) if submissions_score is not None else None,
+            list(student_module_score) if student_module_score is not None else None,
+        ])
+    return score_inputs
+
+
+class GradeCache(object):
+    """
+    The per-section grading results for one student in one course, persisted
+    in the student's OfflineComputedGrade row.
+
+    Each section's graded total and problem scores are stored along with the
+    scores they were computed from (see `_section_score_inputs`). A section is
+    only graded again when those inputs change, e.g. after the student submits
+    an answer in it, or when it contains problems that must always be
+    recalculated. Sections are stored under a fingerprint of the course's
+    grading policy and graded content, so that any change to those discards
+    every stored section.
+
+    Only the `sections` and `grading_fingerprint` fields are ours: `gradeset`
+    belongs to `instructor.offline_gradecalc`, and is left alone. The row is
+    only written when a section was graded again, and only created once there
+    is something to save in it.
+    """
+    # Bump this to discard every cached section, e.g. if the format changes.
+    VERSION = 2
+
+    def __init__(self, course, student):
+        self.fingerprint = self.grading_fingerprint(course)
+        self.student = student
+        self.course_id = course.id
+        records = list(
+            OfflineComputedGrade.objects.filter(user=student, course_id=course.id).values_list(
+                'grading_fingerprint', 'sections'
+            )[:1]
+        )
+        self.has_record = bool(records)
+        if records and records[0][0] == self.fingerprint and records[0][1]:
+            self.cached_sections = json.loads(records[0][1])
+        else:
+            self.cached_sections = {}
+        self.sections = {}
+        self.changed = False
+
+    @staticmethod
+    def content_version(descriptor):
+        """
+        Return a string which changes whenever `descriptor`'s content does,
+        e.g. a problem's xml, which its max score depends on.
+        """
+        edited_on = getattr(descriptor, 'edited_on', None)
+        if edited_on is not None:
+            return edited_on.isoformat()
+        content = descriptor.get_explicitly_set_fields_by_scope(Scope.content)
+        return hashlib.md5(json.dumps(content, sort_keys=True, default=unicode)).hexdigest()
+
+    @classmethod
+    def grading_fingerprint(cls, course):
+        """
+        Return a hash of everything about `course` that affects how cached
+        sections were graded, other than the student's own scores.
+        """
+        # The graded content is only walked once per course descriptor, along
+        # with the grading context it comes from.
+        grading_context = course.grading_context
+        if '_grade_cache_fingerprint' not in grading_context:
+            grading_context['_grade_cache_fingerprint'] = cls.content_fingerprint(grading_context)
+        fingerprint_data = [
+            cls.VERSION, course.raw_grader, course.grade_cutoffs, grading_context['_grade_cache_fingerprint'],
+        ]
+        return hashlib.md5(json.dumps(fingerprint_data, sort_keys=True)).hexdigest()
+
+    @classmethod
+    def content_fingerprint(cls, grading_context):
+        """
+        Return a hash of the graded sections and problems in `grading_context`.
+        """
+        sections = []
+        for section_format, format_sections in sorted(grading_context['graded_sections'].iteritems()):
+            for section in format_sections:
+                section_descriptor = section['section_descriptor']
+                sections.append([
+                    section_format,
+                    section_descriptor.location.to_deprecated_string(),
+                    section_descriptor.display_name_with_default,
+                    [
+                        [
+                            descriptor.location.to_deprecated_string(),
+                            descriptor.display_name_with_default,
+                            descriptor.weight,
+                            descriptor.graded,
+                            cls.content_version(descriptor),
+                        ]
+                        for descriptor in section['xmoduledescriptors']
+                    ],
+                ])
+        return hashlib.md5(json.dumps(sections, sort_keys=True)).hexdigest()
+
+    @staticmethod
+    def _section_key(section):
+        """Return the key under which `section` is cached."""
+        return section['section_descriptor'].location.to_deprecated_string()
+
+    def get(self, section, score_inputs):
+        """
+        Return the cached `(graded_total, scores)` for `section` if it was
+        computed from `score_inputs`, or None if it has to be graded again.
+        """
+        if any(descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']):
+            return None
+
+        section_key = self._section_key(section)
+        cached_section = self.cached_sections.get(section_key)
+        if cached_section is None or cached_section['inputs'] != score_inputs:
+            return None
+
+        self.sections[section_key] = cached_section
+        return (
+            Score(*cached_section['graded_total']),
+            [Score(*score) for score in cached_section['scores']]
+        )
+
+    def set(self, section, score_inputs, graded_total, scores):
+        """Record the result of grading `section` from `score_inputs`."""
+        self.sections[self._section_key(section)] = {
+            'inputs': score_inputs,
+            'graded_total': graded_total,
+            'scores': scores,
+        }
+        self.changed = True
+
+    def save(self):
+        """
+        Persist the sections graded since this cache was loaded. Does nothing
+        if no section changed.
+        """
+        if not self.changed:
+            return
+
+        fields = {'grading_fingerprint': self.fingerprint, 'sections': json.dumps(self.sections)}
+        records = OfflineComputedGrade.objects.filter(user=self.student, course_id=self.course_id)
+        if not (self.has_record and records.update(**fields)):
+            OfflineComputedGrade.objects.create(user=self.student, course_id=self.course_id, **fields)
+            self.has_record = True
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -348,6 +630,9 @@ def _progress_summary(student, request, course):
 
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
 
+    with manual_transaction():
+        score_snapshot = ScoreSnapshot(course.id, student)
+
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
     for chapter_module in course_module.get_display_items():
@@ -371,7 +656,8 @@ def _progress_summary(student, request, course):
                 for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
                     course_id = course.id
                     (correct, total) = get_score(
-                        course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores
+                        course_id, student, module_descriptor, module_creator,
+                        scores_cache=submissions_scores, score_snapshot=score_snapshot
                     )
                     if correct is None and total is None:
                         continue
@@ -403,7 +689,7 @@ def _progress_summary(student, request, course):
     return chapters
 
 
-def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None):
+def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None, score_snapshot=None):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
     e.g. (5,7) if you got 5 out of 7 points.
@@ -417,6 +703,9 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
            Can return None if user doesn't have access, or if something else went wrong.
     scores_cache: A dict of location names to (earned, possible) point tuples.
            If an entry is found in this cache, it takes precedence.
+    score_snapshot: An optional ScoreSnapshot for this user and course. If
+           given, StudentModule scores are read from it rather than queried
+           one problem at a time.
     """
     scores_cache = scores_cache or {}
 
@@ -443,18 +732,23 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
         # These are not problems, and do not have a score
         return (None, None)
 
-    try:
-        student_module = StudentModule.objects.get(
-            student=user,
-            course_id=course_id,
-            module_state_key=problem_descriptor.location
-        )
-    except StudentModule.DoesNotExist:
+    if score_snapshot is not None:
         student_module = None
+        grade_pair = score_snapshot.get(problem_descriptor.location)
+    else:
+        try:
+            student_module = StudentModule.objects.get(
+                student=user,
+                course_id=course_id,
+                module_state_key=problem_descriptor.location
+            )
+        except StudentModule.DoesNotExist:
+            student_module = None
+        grade_pair = (student_module.grade, student_module.max_grade) if student_module is not None else None
 
-    if student_module is not None and student_module.max_grade is not None:
-        correct = student_module.grade if student_module.grade is not None else 0
-        total = student_module.max_grade
+    if grade_pair is not None and grade_pair[1] is not None:
+        correct = grade_pair[0] if grade_pair[0] is not None else 0
+        total = grade_pair[1]
     else:
         # If the problem was not in the cache, or hasn't been graded yet,
         # we need to instantiate the problem.
@@ -475,7 +769,7 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
     weight = problem_descriptor.weight
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(problem_descriptor.location))
             return (correct, total)
         correct = correct * weight / total
         total = weight
@@ -496,11 +790,28 @@ def manual_transaction():
         transaction.commit()
 
 
-def iterate_grades_for(course_id, students):
+def _batches(items, batch_size):
+    """
+    Yields lists of up to batch_size values from the iterable items, without
+    materializing all of items at once.
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def iterate_grades_for(course_id, students, batch_size=None):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
 
+    Students are graded in batches of `batch_size` (settings.GRADES_BATCH_SIZE
+    by default). The StudentModule scores for a whole batch are fetched
+    together before any student in it is graded.
+
     If an error occurred, gradeset will be an empty dict and err_msg will be an
     exception message. If there was no error, err_msg is an empty string.
 
@@ -521,25 +832,32 @@ def iterate_grades_for(course_id, students):
     # grading that student.
     request = RequestFactory().get('/')
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=['action:{}'.format(course_id)]):
-            try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course_id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+    if batch_size is None:
+        batch_size = settings.GRADES_BATCH_SIZE
+
+    for student_batch in _batches(students, batch_size):
+        with dog_stats_api.timer('lms.grades.iterate_grades_for.prefetch', tags=['action:{}'.format(course_id)]):
+            score_snapshots = ScoreSnapshot.for_students(course.id, student_batch)
+
+        for student in student_batch:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=['action:{}'.format(course_id)]):
+                try:
+                    request.user = student
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    gradeset = grade(student, request, course, score_snapshot=score_snapshots[student.id])
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course_id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
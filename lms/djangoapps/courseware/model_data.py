@@ -2,6 +2,7 @@
 Classes to provide the LMS runtime data storage to XBlocks
 """
 
+import copy
 import json
 from collections import defaultdict
 from itertools import chain
@@ -39,6 +40,14 @@ def chunks(items, chunk_size):
     return (items[i:i + chunk_size] for i in xrange(0, len(items), chunk_size))
 
 
+def _copy(value):
+    """
+    Return a copy of value if it's mutable, so that changing one of them
+    doesn't change the other.
+    """
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+
 class FieldDataCache(object):
     """
     A cache of django model objects needed to supply the data
@@ -58,6 +67,8 @@ class FieldDataCache(object):
         select_for_update: True if rows should be locked until end of transaction
         '''
         self.cache = {}
+        # cache key -> (StudentModule.state, that state decoded), for the StudentModules that have been read
+        self._user_states = {}
         self.descriptors = descriptors
         self.select_for_update = select_for_update
 
@@ -269,6 +280,28 @@ class FieldDataCache(object):
         self.cache[cache_key] = field_object
         return field_object
 
+    def user_state(self, key, field_object):
+        """
+        Return the decoded state of the StudentModule `field_object` found for the
+        Scope.user_state `key`. The state is only decoded again if it has changed.
+
+        The state returned is shared: change it with `set_user_state`.
+        """
+        cache_key = self._cache_key_from_kvs_key(key)
+        encoded, state = self._user_states.get(cache_key, (None, None))
+        if encoded is None or encoded is not field_object.state:
+            state = json.loads(field_object.state)
+            self._user_states[cache_key] = (field_object.state, state)
+        return state
+
+    def set_user_state(self, key, field_object, state):
+        """
+        Set the state of the StudentModule `field_object` found for the
+        Scope.user_state `key` to `state` (without saving it)
+        """
+        field_object.state = json.dumps(state)
+        self._user_states[self._cache_key_from_kvs_key(key)] = (field_object.state, state)
+
 
 class DjangoKeyValueStore(KeyValueStore):
     """
@@ -307,7 +340,7 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            return json.loads(field_object.state)[key.field_name]
+            return _copy(self._field_data_cache.user_state(key, field_object)[key.field_name])
         else:
             return json.loads(field_object.value)
 
@@ -328,6 +361,9 @@ class DjangoKeyValueStore(KeyValueStore):
         saved_fields = []
         # field_objects maps a field_object to a list of associated fields
         field_objects = dict()
+        # user_states maps a StudentModule to a key for it and its new state,
+        # so that its state is only encoded once
+        user_states = dict()
         for field in kv_dict:
             # Check field for validity
             if field.scope not in self._allowed_scopes:
@@ -342,14 +378,17 @@ class DjangoKeyValueStore(KeyValueStore):
 
             # Special case when scope is for the user state, because this scope saves fields in a single row
             if field.scope == Scope.user_state:
-                state = json.loads(field_object.state)
-                state[field.field_name] = kv_dict[field]
-                field_object.state = json.dumps(state)
+                if field_object not in user_states:
+                    user_states[field_object] = (field, dict(self._field_data_cache.user_state(field, field_object)))
+                user_states[field_object][1][field.field_name] = _copy(kv_dict[field])
             else:
             # The remaining scopes save fields on different rows, so
             # we don't have to worry about conflicts
                 field_object.value = json.dumps(kv_dict[field])
 
+        for field_object, (key, state) in user_states.iteritems():
+            self._field_data_cache.set_user_state(key, field_object, state)
+
         for field_object in field_objects:
             try:
                 # Save the field object that we made above
@@ -370,9 +409,9 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            state = json.loads(field_object.state)
+            state = dict(self._field_data_cache.user_state(key, field_object))
             del state[key.field_name]
-            field_object.state = json.dumps(state)
+            self._field_data_cache.set_user_state(key, field_object, state)
             field_object.save()
         else:
             field_object.delete()
@@ -386,6 +425,6 @@ class DjangoKeyValueStore(KeyValueStore):
             return False
 
         if key.scope == Scope.user_state:
-            return key.field_name in json.loads(field_object.state)
+            return key.field_name in self._field_data_cache.user_state(key, field_object)
         else:
             return True
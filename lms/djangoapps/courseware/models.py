@@ -236,6 +236,12 @@ class OfflineComputedGrade(models.Model):
 
     gradeset = models.TextField(null=True, blank=True)		# grades, stored as JSON
 
+    # Per-section grading results, stored as JSON, that let the grade be
+    # recomputed incrementally (see courseware.grades.GradeCache), and a hash
+    # of the course grading setup they were computed under.
+    sections = models.TextField(null=True, blank=True)
+    grading_fingerprint = models.CharField(max_length=32, null=True, blank=True)
+
     class Meta:
         unique_together = (('user', 'course_id'), )
 
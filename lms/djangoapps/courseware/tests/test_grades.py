@@ -1,20 +1,31 @@
 """
 Test grade calculation.
 """
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
 from django.http import Http404
+from django.test import TestCase
+from django.test.client import RequestFactory
 from django.test.utils import override_settings
 from mock import patch
 
+from courseware.tests.factories import StudentModuleFactory
 from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
 from student.tests.factories import UserFactory
-from xmodule.modulestore.tests.factories import CourseFactory
+from capa.tests.response_xml_factory import OptionResponseXMLFactory
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.locations import SlashSeparatedCourseKey
 
-from courseware.grades import grade, iterate_grades_for
+from courseware import grades
+from courseware.grades import GradeCache, ScoreSnapshot, grade, iterate_grades_for
+from courseware.models import OfflineComputedGrade
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, score_snapshot=None):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -25,7 +36,7 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(student, request, course, keep_raw_scores=keep_raw_scores, score_snapshot=score_snapshot)
 
 
 @override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
@@ -106,6 +117,23 @@ class TestGradeIteration(ModuleStoreTestCase):
         self.assertTrue(all_gradesets[student2])
         self.assertTrue(all_gradesets[student5])
 
+    def test_batched_grading(self):
+        """Batch sizes that don't evenly divide the students should still
+        grade every student exactly once, in order."""
+        results = list(iterate_grades_for(self.course.id, iter(self.students), batch_size=2))
+        self.assertEqual([student for student, _, _ in results], self.students)
+        for _, gradeset, err_msg in results:
+            self.assertEqual(err_msg, "")
+            self.assertEqual(gradeset['percent'], 0.0)
+
+    @patch('courseware.grades.ScoreSnapshot.for_students', wraps=ScoreSnapshot.for_students)
+    def test_scores_prefetched_per_batch(self, mock_for_students):
+        list(iterate_grades_for(self.course.id, self.students, batch_size=2))
+        self.assertEqual(
+            [call_args[0][1] for call_args in mock_for_students.call_args_list],
+            [self.students[0:2], self.students[2:4], self.students[4:5]]
+        )
+
     ################################# Helpers #################################
     def _gradesets_and_errors_for(self, course_id, students):
         """Simple helper method to iterate through student grades and give us
@@ -121,3 +149,188 @@ class TestGradeIteration(ModuleStoreTestCase):
                 students_to_errors[student] = err_msg
 
         return students_to_gradesets, students_to_errors
+
+
+class TestScoreSnapshot(TestCase):
+    """
+    Test that ScoreSnapshot loads a student's scores in a single query.
+    """
+    def setUp(self):
+        self.course_id = SlashSeparatedCourseKey('edX', 'snapshot', '2014')
+        self.student = UserFactory.create()
+        self.graded_location = self.course_id.make_usage_key('problem', 'graded')
+        self.ungraded_location = self.course_id.make_usage_key('problem', 'ungraded')
+        StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course_id,
+            module_state_key=self.graded_location,
+            grade=2,
+            max_grade=3,
+        )
+        StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course_id,
+            module_state_key=self.ungraded_location,
+        )
+        # A score for another student should never show up in the snapshot
+        StudentModuleFactory.create(
+            course_id=self.course_id,
+            module_state_key=self.course_id.make_usage_key('problem', 'other'),
+            grade=1,
+            max_grade=1,
+        )
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            snapshot = ScoreSnapshot(self.course_id, self.student)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(snapshot.get(self.graded_location), (2, 3))
+            self.assertEqual(snapshot.get(self.ungraded_location), (None, None))
+            self.assertIsNone(snapshot.get(self.course_id.make_usage_key('problem', 'other')))
+
+    def test_has_any(self):
+        snapshot = ScoreSnapshot(self.course_id, self.student)
+        missing_location = self.course_id.make_usage_key('problem', 'missing')
+        self.assertTrue(snapshot.has_any([missing_location, self.ungraded_location]))
+        self.assertFalse(snapshot.has_any([missing_location]))
+        self.assertFalse(snapshot.has_any([]))
+
+    def test_for_students(self):
+        other_student = UserFactory.create()
+        with self.assertNumQueries(1):
+            snapshots = ScoreSnapshot.for_students(self.course_id, [self.student, other_student])
+
+        self.assertEqual(snapshots[self.student.id].get(self.graded_location), (2, 3))
+        self.assertEqual(snapshots[self.student.id].scores, ScoreSnapshot(self.course_id, self.student).scores)
+        self.assertEqual(snapshots[other_student.id].scores, {})
+
+    def test_for_students_chunked(self):
+        students = [self.student] + [UserFactory.create() for _ in range(4)]
+        with self.assertNumQueries(3):
+            snapshots = ScoreSnapshot.for_students(self.course_id, students, chunk_size=2)
+        self.assertEqual(len(snapshots), 5)
+
+    def test_anonymous_user(self):
+        with self.assertNumQueries(0):
+            snapshot = ScoreSnapshot(self.course_id, AnonymousUser())
+        self.assertFalse(snapshot.has_any([self.graded_location]))
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+@patch.dict(settings.FEATURES, {'ENABLE_GRADE_CACHE': True})
+class TestGradeCache(ModuleStoreTestCase):
+    """
+    Test that per-section grades are persisted, and only recomputed for
+    sections whose scores changed.
+    """
+    def setUp(self):
+        self.course = CourseFactory.create(display_name='grade_cache_course')
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        self.problems = []
+        for number in range(2):
+            section = ItemFactory.create(
+                parent_location=chapter.location,
+                category='sequential',
+                metadata={'graded': True, 'format': 'Homework'},
+                display_name='Homework {}'.format(number),
+            )
+            self.problems.append(ItemFactory.create(
+                parent_location=section.location,
+                category='problem',
+                data=OptionResponseXMLFactory().build_xml(options=['Option 1', 'Option 2'], correct_option='Option 1'),
+                display_name='Problem {}'.format(number),
+            ))
+        self.course = modulestore().get_course(self.course.id)
+        self.student = UserFactory.create()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.student
+        self.request.session = {}
+
+    def _grade(self, expected_sections_graded):
+        """Grade the student, checking how many sections had to be graded."""
+        with patch('courseware.grades._grade_section', wraps=grades._grade_section) as mock_grade_section:
+            gradeset = grade(self.student, self.request, self.course)
+        self.assertEqual(mock_grade_section.call_count, expected_sections_graded)
+        return gradeset
+
+    def test_unchanged_sections_are_reused(self):
+        first_gradeset = self._grade(2)
+        second_gradeset = self._grade(0)
+        self.assertEqual(first_gradeset['percent'], second_gradeset['percent'])
+        self.assertEqual(first_gradeset['section_breakdown'], second_gradeset['section_breakdown'])
+
+        cached_grade = OfflineComputedGrade.objects.get(user=self.student, course_id=self.course.id)
+        self.assertEqual(len(json.loads(cached_grade.sections)), 2)
+        self.assertIsNone(cached_grade.gradeset)
+
+    def test_offline_gradeset_left_alone(self):
+        OfflineComputedGrade.objects.create(user=self.student, course_id=self.course.id, gradeset='{"percent": 0.5}')
+        self._grade(2)
+        cached_grade = OfflineComputedGrade.objects.get(user=self.student, course_id=self.course.id)
+        self.assertEqual(len(json.loads(cached_grade.sections)), 2)
+        self.assertEqual(cached_grade.gradeset, '{"percent": 0.5}')
+
+    def test_fingerprint_computed_once_per_course(self):
+        GradeCache.grading_fingerprint(self.course)
+        with patch.object(GradeCache, 'content_fingerprint') as content_fingerprint:
+            GradeCache.grading_fingerprint(self.course)
+        self.assertFalse(content_fingerprint.called)
+
+    def test_changed_section_is_regraded(self):
+        self.assertEqual(self._grade(2)['percent'], 0.0)
+
+        StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course.id,
+            module_state_key=self.problems[0].location,
+            grade=1,
+            max_grade=1,
+        )
+        gradeset = self._grade(1)
+        self.assertGreater(gradeset['percent'], 0.0)
+        self.assertEqual(self._grade(0)['percent'], gradeset['percent'])
+
+    def test_raw_scores_from_cache(self):
+        StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course.id,
+            module_state_key=self.problems[1].location,
+            grade=1,
+            max_grade=2,
+        )
+        self._grade(2)
+        with patch('courseware.grades._grade_section') as mock_grade_section:
+            gradeset = grade(self.student, self.request, self.course, keep_raw_scores=True)
+        self.assertFalse(mock_grade_section.called)
+        self.assertEqual([tuple(score) for score in gradeset['raw_scores']], [(1, 2, True, 'Problem 1')])
+        self.assertEqual(gradeset['raw_scores'][0].earned, 1)
+
+    def test_grading_policy_change_regrades_everything(self):
+        self._grade(2)
+        self.course.grade_cutoffs = {'Pass': 0.9}
+        self._grade(2)
+
+    def test_problem_content_change_regrades_everything(self):
+        self._grade(2)
+        problem = modulestore().get_item(self.problems[0].location)
+        problem.data = OptionResponseXMLFactory().build_xml(
+            options=['Option 1', 'Option 2'], correct_option='Option 2', num_responses=2
+        )
+        modulestore().update_item(problem, '**replace_user**')
+        self.course = modulestore().get_course(self.course.id)
+        self._grade(2)
+
+    def test_no_record_until_saved(self):
+        cache = GradeCache(self.course, self.student)
+        self.assertFalse(OfflineComputedGrade.objects.filter(user=self.student).exists())
+        cache.save()
+        self.assertFalse(OfflineComputedGrade.objects.filter(user=self.student).exists())
+        self._grade(2)
+        self.assertTrue(OfflineComputedGrade.objects.filter(user=self.student).exists())
+
+    def test_no_writes_when_unchanged(self):
+        self._grade(2)
+        cache = GradeCache(self.course, self.student)
+        with self.assertNumQueries(0):
+            cache.save()
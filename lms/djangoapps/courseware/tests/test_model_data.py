@@ -175,6 +175,30 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
                 self.kvs.set_many(kv_dict)
         self.assertEquals(len(exception_context.exception.saved_field_names), 0)
 
+    def test_state_decoded_once(self):
+        "Test that the StudentModule's state is decoded once for many reads, and encoded once per set_many"
+        with patch('courseware.model_data.json', wraps=json) as mock_json:
+            for _ in range(12):
+                self.kvs.get(user_state_key('a_field'))
+                self.kvs.has(user_state_key('b_field'))
+            self.assertEquals(1, mock_json.loads.call_count)
+
+            self.kvs.set_many(self.construct_kv_dict())
+            self.assertEquals(1, mock_json.dumps.call_count)
+            self.assertEquals('new value', self.kvs.get(user_state_key('field_a')))
+            self.assertEquals(1, mock_json.loads.call_count)
+
+        self.assertEquals(
+            {'a_field': 'a_value', 'b_field': 'b_value', 'field_a': 'new value', 'field_b': 'newer value'},
+            json.loads(StudentModule.objects.all()[0].state)
+        )
+
+    def test_get_mutable_field(self):
+        "Test that changing a value got from the kvs doesn't change the stored value"
+        self.kvs.set(user_state_key('a_field'), ['a_value'])
+        self.kvs.get(user_state_key('a_field')).append('b_value')
+        self.assertEquals(['a_value'], self.kvs.get(user_state_key('a_field')))
+
 
 class TestMissingStudentModule(TestCase):
     def setUp(self):
@@ -463,12 +463,12 @@ class Courses(SysadminDashboardView):
                 _('Successfully switched to branch: '
                   '{branch_name}'.format(branch_name=branch)))
 
-        self.def_ms.try_load_course(os.path.abspath(gdir))
+        loaded = self.def_ms.try_load_course(os.path.abspath(gdir))
         errlog = self.def_ms.errored_courses.get(cdir, '')
-        if errlog:
+        if errlog or loaded is None:
             msg += u'<hr width="50%"><pre>{0}</pre>'.format(escape(errlog))
         else:
-            course = self.def_ms.courses[os.path.abspath(gdir)]
+            course = self.def_ms.get_course(loaded.id)
             msg += _('Loaded course {0} {1}<br/>Errors:').format(
                 cdir, course.display_name)
             errors = self.def_ms.get_course_errors(course.id)
@@ -551,8 +551,10 @@ class Courses(SysadminDashboardView):
 
             is_xml_course = (modulestore().get_modulestore_type(course_key) == XML_MODULESTORE_TYPE)
             if course_found and is_xml_course:
+                # Make sure it's loaded, so a lazy store won't load it again.
+                self.def_ms.get_course(course.id)
                 cdir = course.data_dir
-                self.def_ms.courses.pop(cdir)
+                self.def_ms.courses.pop(cdir, None)
 
                 # now move the directory (don't actually delete it)
                 new_dir = "{course_dir}_deleted_{timestamp}".format(
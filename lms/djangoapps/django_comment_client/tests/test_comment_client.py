@@ -0,0 +1,65 @@
+import threading
+
+from django.test import TestCase
+from django.utils.translation import get_language, override
+from mock import patch, Mock
+
+from lms.lib.comment_client import utils
+
+
+class SessionTestCase(TestCase):
+    def test_session_reused(self):
+        self.assertIs(utils.get_session(), utils.get_session())
+
+    @patch('lms.lib.comment_client.utils.requests.Session.request')
+    def test_requests_use_session(self, mock_request):
+        mock_request.return_value = Mock(status_code=200, text='{}', json=Mock(return_value={}))
+        utils.perform_request('get', 'http://localhost:4567/api/v1/users/1')
+        utils.perform_request('get', 'http://localhost:4567/api/v1/users/2')
+        self.assertEqual(mock_request.call_count, 2)
+
+    def test_endpoint(self):
+        self.assertEqual(
+            utils.endpoint('http://localhost:4567/api/v1/threads/5347f8c2e9d26d0c5b000001/comments?request_id=1'),
+            '/api/v1/threads/:id/comments'
+        )
+        self.assertEqual(
+            utils.endpoint('http://localhost:4567/api/v1/users/12/active_threads'),
+            '/api/v1/users/:id/active_threads'
+        )
+        self.assertEqual(utils.endpoint('http://localhost:4567/api/v1/search/threads'), '/api/v1/search/threads')
+
+
+class PerformConcurrentlyTestCase(TestCase):
+    def test_results_in_order(self):
+        self.assertEqual(utils.perform_concurrently(lambda: 1, lambda: 2, lambda: 3), [1, 2, 3])
+
+    def test_concurrent(self):
+        # Each function waits for all of them to start, so they must run at once
+        started = []
+        lock = threading.Lock()
+        all_started = threading.Event()
+
+        def wait_for_others():
+            with lock:
+                started.append(True)
+                if len(started) == 3:
+                    all_started.set()
+            return all_started.wait(5)
+
+        self.assertEqual(utils.perform_concurrently(wait_for_others, wait_for_others, wait_for_others), [True] * 3)
+
+    def test_first_exception_raised(self):
+        finished = []
+
+        def fail(message):
+            raise utils.CommentClientRequestError(message)
+
+        with self.assertRaises(utils.CommentClientRequestError) as context:
+            utils.perform_concurrently(lambda: finished.append(1), lambda: fail("first"), lambda: fail("second"))
+        self.assertEqual(context.exception.message, "first")
+        self.assertEqual(finished, [1])
+
+    def test_language(self):
+        with override("eo"):
+            self.assertEqual(utils.perform_concurrently(get_language, get_language), ["eo", "eo"])
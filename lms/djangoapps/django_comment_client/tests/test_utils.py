@@ -4,6 +4,7 @@ import json
 import mock
 from datetime import datetime
 from pytz import UTC
+from django.core.cache import get_cache
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 from django.test.utils import override_settings
@@ -11,6 +12,7 @@ from student.tests.factories import UserFactory, CourseEnrollmentFactory
 from django_comment_client.tests.factories import RoleFactory
 from django_comment_client.tests.unicode import UnicodeTestMixin
 import django_comment_client.utils as utils
+from django_comment_common.utils import invalidate_discussion_info
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from courseware.tests.tests import TEST_DATA_MONGO_MODULESTORE
@@ -451,6 +453,26 @@ class CategoryMapTestCase(ModuleStoreTestCase):
             }
         )
 
+    def test_discussion_info_cached(self):
+        locmem = get_cache('django.core.cache.backends.locmem.LocMemCache', LOCATION='discussion_info_test')
+        with mock.patch('django_comment_client.utils.cache', locmem), \
+                mock.patch('django_comment_common.utils.cache', locmem):
+            self.create_discussion("Chapter", "Discussion 1")
+            category_map = utils.get_discussion_category_map(self.course)
+
+            # The modules aren't looked at again until the course changes
+            self.create_discussion("Chapter", "Discussion 2")
+            with mock.patch('django_comment_client.utils.modulestore') as mock_modulestore:
+                self.assertEqual(utils.get_discussion_category_map(self.course), category_map)
+                self.assertEqual(utils._get_discussion_id_map(self.course).keys(), ["discussion1"])  # pylint: disable=protected-access
+                self.assertFalse(mock_modulestore.called)
+
+            invalidate_discussion_info(self.course.id)
+            self.assertItemsEqual(
+                utils.get_discussion_category_map(self.course)["subcategories"]["Chapter"]["children"],
+                ["Discussion 1", "Discussion 2"]
+            )
+
     def test_sort_intermediates(self):
         self.create_discussion("Chapter B", "Discussion 2")
         self.create_discussion("Chapter C", "Discussion")
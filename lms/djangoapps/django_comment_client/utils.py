@@ -9,9 +9,11 @@ from django.db import connection
 from django.http import HttpResponse
 from django.utils import simplejson
 from django_comment_common.models import Role, FORUM_ROLE_STUDENT
+from django_comment_common.utils import get_discussion_info_version, DISCUSSION_INFO_CACHE_TIMEOUT
 from django_comment_client.permissions import check_permissions_by_view
 
 from edxmako import lookup_template
+from util.cache import cache
 import pystache_custom as pystache
 
 from xmodule.modulestore.django import modulestore
@@ -68,14 +70,38 @@ def _get_discussion_modules(course):
     return filter(has_required_keys, all_modules)
 
 
+def _get_discussion_info(course):
+    """
+    Return the id, category, target, sort key, start date and location of each
+    of the course's discussion modules. These are cached for each version of
+    the course (see get_discussion_info_version), so that forum pages don't
+    have to load the modules.
+    """
+    key = u"discussion_info.{}.{}".format(course.id.to_deprecated_string(), get_discussion_info_version(course.id))
+    info = cache.get(key)
+    if info is None:
+        info = [
+            {
+                "id": module.discussion_id,
+                "category": module.discussion_category,
+                "target": module.discussion_target,
+                "sort_key": module.sort_key,
+                "start": module.start,
+                "location": module.location.to_deprecated_string(),
+            }
+            for module in _get_discussion_modules(course)
+        ]
+        cache.set(key, info, DISCUSSION_INFO_CACHE_TIMEOUT)
+    return info
+
+
 def _get_discussion_id_map(course):
-    def get_entry(module):
-        discussion_id = module.discussion_id
-        title = module.discussion_target
-        last_category = module.discussion_category.split("/")[-1].strip()
-        return (discussion_id, {"location": module.location, "title": last_category + " / " + title})
+    def get_entry(discussion):
+        location = course.id.make_usage_key_from_deprecated_string(discussion["location"])
+        last_category = discussion["category"].split("/")[-1].strip()
+        return (discussion["id"], {"location": location, "title": last_category + " / " + discussion["target"]})
 
-    return dict(map(get_entry, _get_discussion_modules(course)))
+    return dict(map(get_entry, _get_discussion_info(course)))
 
 
 def _filter_unstarted_categories(category_map):
@@ -133,15 +159,13 @@ def get_discussion_category_map(course):
 
     unexpanded_category_map = defaultdict(list)
 
-    modules = _get_discussion_modules(course)
-
-    for module in modules:
-        id = module.discussion_id
-        title = module.discussion_target
-        sort_key = module.sort_key
-        category = " / ".join([x.strip() for x in module.discussion_category.split("/")])
+    for discussion in _get_discussion_info(course):
+        id = discussion["id"]
+        title = discussion["target"]
+        sort_key = discussion["sort_key"]
+        category = " / ".join([x.strip() for x in discussion["category"].split("/")])
         #Handle case where module.start is None
-        entry_start_date = module.start if module.start else datetime.max.replace(tzinfo=pytz.UTC)
+        entry_start_date = discussion["start"] if discussion["start"] else datetime.max.replace(tzinfo=pytz.UTC)
         unexpanded_category_map[category].append({"title": title, "id": id, "sort_key": sort_key, "start_date": entry_start_date})
 
     category_map = {"entries": defaultdict(dict), "subcategories": defaultdict(dict)}
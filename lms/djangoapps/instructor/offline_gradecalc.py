@@ -87,6 +87,10 @@ def student_grades(student, request, course, keep_raw_scores=False, use_offline=
     try:
         ocg = models.OfflineComputedGrade.objects.get(user=student, course_id=course.id)
     except models.OfflineComputedGrade.DoesNotExist:
+        ocg = None
+
+    # The row may only hold courseware.grades.GradeCache's sections so far
+    if ocg is None or not ocg.gradeset:
         return dict(
             raw_scores=[],
             section_breakdown=[],
@@ -19,6 +19,8 @@ import csv
 import json
 import hashlib
 import os.path
+import re
+import tempfile
 import urllib
 
 from boto.s3.connection import S3Connection
@@ -193,9 +195,9 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. `store_rows()` accepts any iterable of rows, including a
+    generator, and writes them out as they are produced, so callers never need
+    to hold a whole report in memory.
     """
     @classmethod
     def from_config(cls):
@@ -209,6 +211,63 @@ class ReportStore(object):
         elif storage_type.lower() == "localfs":
             return LocalFSReportStore.from_config()
 
+    # Partial files are written by report subtasks and stitched together once
+    # they have all finished. They are never listed by `links_for()`.
+    PARTIAL_FILENAME_RE = re.compile(r'\.part\d+$')
+
+    @staticmethod
+    def partial_filename(filename, part_number):
+        """
+        Return the name to use for the `part_number`th piece of the report
+        that will eventually be stored as `filename`.
+        """
+        return u"{}.part{:05d}".format(filename, part_number)
+
+    @classmethod
+    def is_partial(cls, filename):
+        """Return True if `filename` names a piece of an unfinished report."""
+        return cls.PARTIAL_FILENAME_RE.search(filename) is not None
+
+
+class MultipartUploadFile(object):
+    """
+    A write-only file-like object that sends everything written to it as the
+    parts of a boto S3 `MultiPartUpload`, buffering at most `part_size` bytes
+    (plus the last write) before sending each part.
+
+    S3 requires every part but the last to be at least 5MB.
+    """
+    def __init__(self, multipart_upload, part_size):
+        self.multipart_upload = multipart_upload
+        self.part_size = part_size
+        self.num_parts = 0
+        self.buffer = StringIO()
+        self.buffer_size = 0
+
+    def write(self, data):
+        """Buffer `data`, sending a part once enough has been buffered."""
+        self.buffer.write(data)
+        self.buffer_size += len(data)
+        if self.buffer_size >= self.part_size:
+            self._upload_part()
+
+    def flush(self):
+        """Parts are only sent once they are full, so there is nothing to do."""
+        pass
+
+    def close(self):
+        """Send whatever is still buffered as the last part."""
+        if self.buffer_size > 0 or self.num_parts == 0:
+            self._upload_part()
+
+    def _upload_part(self):
+        """Send the buffered data as the next part, and start a new buffer."""
+        self.num_parts += 1
+        self.buffer.seek(0)
+        self.multipart_upload.upload_part_from_file(self.buffer, self.num_parts)
+        self.buffer = StringIO()
+        self.buffer_size = 0
+
 
 class S3ReportStore(ReportStore):
     """
@@ -222,6 +281,9 @@ class S3ReportStore(ReportStore):
     conventions on where files are stored to know what to display. Clients using
     this class can name the final file whatever they want.
     """
+    # Size of the parts that `store_rows()` uploads; S3's minimum is 5MB.
+    MULTIPART_PART_SIZE = 5 * 1024 * 1024
+
     def __init__(self, bucket_name, root_path):
         self.root_path = root_path
 
@@ -298,18 +360,54 @@ class S3ReportStore(ReportStore):
     def store_rows(self, course_id, filename, rows):
         """
         Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        strings), stream a gzip'd csv file to S3.
+
+        `rows` may be any iterable, including a generator. The compressed csv is
+        sent as an S3 multipart upload in parts of `MULTIPART_PART_SIZE` bytes,
+        so at most one part is held in memory at a time. S3 only makes the file
+        visible once the upload is completed, so a failure part way through
+        never leaves a partial file behind.
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
         """
-        output_buffer = StringIO()
-        gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
-        csv.writer(gzip_file).writerows(rows)
-        gzip_file.close()
+        key = self.key_for(course_id, filename)
+        multipart_upload = self.bucket.initiate_multipart_upload(
+            key.key,
+            headers={
+                "Content-Encoding": "gzip",
+                "Content-Type": "text/csv",
+            }
+        )
+
+        try:
+            upload_file = MultipartUploadFile(multipart_upload, self.MULTIPART_PART_SIZE)
+            gzip_file = GzipFile(fileobj=upload_file, mode="wb")
+            csv.writer(gzip_file).writerows(rows)
+            gzip_file.close()
+            upload_file.close()
+        except Exception:
+            multipart_upload.cancel_upload()
+            raise
+
+        multipart_upload.complete_upload()
+
+    def read_rows(self, course_id, filename):
+        """
+        Return the rows of the gzip'd csv file previously stored with
+        `store_rows()` as a list of lists of strings, or an empty list if there
+        is no such file.
+        """
+        key = self.bucket.get_key(self.key_for(course_id, filename).key)
+        if key is None:
+            return []
+
+        gzip_file = GzipFile(fileobj=StringIO(key.get_contents_as_string()), mode="rb")
+        return list(csv.reader(gzip_file))
 
-        self.store(course_id, filename, output_buffer)
+    def delete(self, course_id, filename):
+        """Remove `filename` for `course_id`, if it exists."""
+        self.key_for(course_id, filename).delete()
 
     def links_for(self, course_id):
         """
@@ -321,6 +419,7 @@ class S3ReportStore(ReportStore):
             [
                 (key.key.split("/")[-1], key.generate_url(expires_in=300))
                 for key in self.bucket.list(prefix=course_dir.key)
+                if not self.is_partial(key.key)
             ],
             reverse=True
         )
@@ -382,10 +481,46 @@ class LocalFSReportStore(ReportStore):
         """
         Given a course_id, filename, and rows (each row is an iterable of strings),
         write this data out.
+
+        `rows` may be any iterable, including a generator; each row is written
+        to disk as it is produced. The file is written under a temporary name
+        and only moved into place once complete, so that `links_for()` never
+        lists a partially written file.
+        """
+        full_path = self.path_to(course_id, filename)
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+
+        # The temporary file lives directly under root_path, which is never
+        # listed, but is on the same filesystem so that the rename is atomic.
+        handle, temp_path = tempfile.mkstemp(dir=self.root_path)
+        try:
+            with os.fdopen(handle, "wb") as f:
+                csv.writer(f).writerows(rows)
+            os.rename(temp_path, full_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def read_rows(self, course_id, filename):
+        """
+        Return the rows of the csv file previously stored with `store_rows()`
+        as a list of lists of strings, or an empty list if there is no such
+        file.
         """
-        output_buffer = StringIO()
-        csv.writer(output_buffer).writerows(rows)
-        self.store(course_id, filename, output_buffer)
+        full_path = self.path_to(course_id, filename)
+        if not os.path.exists(full_path):
+            return []
+
+        with open(full_path, "rb") as f:
+            return list(csv.reader(f))
+
+    def delete(self, course_id, filename):
+        """Remove `filename` for `course_id`, if it exists."""
+        full_path = self.path_to(course_id, filename)
+        if os.path.exists(full_path):
+            os.remove(full_path)
 
     def links_for(self, course_id):
         """
@@ -402,6 +537,7 @@ class LocalFSReportStore(ReportStore):
             [
                 (filename, ("file://" + urllib.quote(os.path.join(course_dir, filename))))
                 for filename in os.listdir(course_dir)
+                if not self.is_partial(filename)
             ],
             reverse=True
         )
@@ -31,6 +31,7 @@ from instructor_task.tasks_helper import (
     reset_attempts_module_state,
     delete_problem_module_state,
     push_grades_to_s3,
+    push_grade_report_shard,
 )
 from bulk_email.tasks import perform_delegate_email_batches
 
@@ -135,7 +136,24 @@ def send_bulk_course_email(entry_id, _xmodule_instance_args):
 def calculate_grades_csv(entry_id, xmodule_instance_args):
     """
     Grade a course and push the results to an S3 bucket for download.
+
+    The grading itself is split across `calculate_grades_csv_shard` subtasks.
     """
     action_name = ugettext_noop('graded')
-    task_fn = partial(push_grades_to_s3, xmodule_instance_args)
+    task_fn = partial(push_grades_to_s3, calculate_grades_csv_shard, xmodule_instance_args)
     return run_main_task(entry_id, task_fn, action_name)
+
+
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=E1102
+def calculate_grades_csv_shard(entry_id, report_name, shard_number, student_ids, subtask_status_dict):
+    """
+    Grade one shard of the students enrolled in a course, as a subtask of
+    `calculate_grades_csv`.
+
+    `entry_id` is the id value of the InstructorTask entry of the parent task.
+    `report_name` is the name shared by every file of the report, and
+    `shard_number` the position of this shard's partial file within it.
+    `student_ids` are the ids of the Users to grade, and `subtask_status_dict`
+    the initial SubtaskStatus of this subtask, as a dict.
+    """
+    return push_grade_report_shard(entry_id, report_name, shard_number, student_ids, subtask_status_dict)
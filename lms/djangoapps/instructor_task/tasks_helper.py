@@ -4,13 +4,16 @@ running state of a course.
 
 """
 import json
+import traceback
 import urllib
 from datetime import datetime
+from itertools import count
 from time import time
 
 from celery import Task, current_task
 from celery.utils.log import get_task_logger
 from celery.states import SUCCESS, FAILURE
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import transaction, reset_queries
 from dogapi import dog_stats_api
@@ -24,6 +27,12 @@ from courseware.models import StudentModule
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    queue_subtasks_for_query,
+    check_subtask_is_valid,
+    update_subtask_status,
+)
 from student.models import CourseEnrollment
 
 # define different loggers for use within tasks and on client side
@@ -469,58 +478,21 @@ def delete_problem_module_state(xmodule_instance_args, _module_descriptor, stude
     return UPDATE_STATUS_SUCCEEDED
 
 
-def push_grades_to_s3(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+def _grade_report_rows(course_id, students):
     """
-    For a given `course_id`, generate a grades CSV file for all students that
-    are enrolled, and store using a `ReportStore`. Once created, the files can
-    be accessed by instantiating another `ReportStore` (via
-    `ReportStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
-    that are visible in ReportStore will be complete ones.
+    Grade `students` in the course identified by `course_id`, returning a tuple
+    of `(rows, err_rows)`.
 
-    As we start to add more CSV downloads, it will probably be worthwhile to
-    make a more general CSVDoc class instead of building out the rows like we
-    do here.
+    `rows` starts with a header row, followed by one row per student that could
+    be graded; it is empty if nobody could be graded. `err_rows` contains an
+    `[id, username, error_msg]` row for every student that could not be graded.
     """
-    start_time = datetime.now(UTC)
-    status_interval = 100
-
-    enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
-    num_total = enrolled_students.count()
-    num_attempted = 0
-    num_succeeded = 0
-    num_failed = 0
-    curr_step = "Calculating Grades"
-
-    def update_task_progress():
-        """Return a dict containing info about current task"""
-        current_time = datetime.now(UTC)
-        progress = {
-            'action_name': action_name,
-            'attempted': num_attempted,
-            'succeeded': num_succeeded,
-            'failed': num_failed,
-            'total': num_total,
-            'duration_ms': int((current_time - start_time).total_seconds() * 1000),
-            'step': curr_step,
-        }
-        _get_current_task().update_state(state=PROGRESS, meta=progress)
-
-        return progress
-
-    # Loop over all our students and build our CSV lists in memory
     header = None
     rows = []
-    err_rows = [["id", "username", "error_msg"]]
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
-        # Periodically update task status (this is a cache write)
-        if num_attempted % status_interval == 0:
-            update_task_progress()
-        num_attempted += 1
-
+    err_rows = []
+    for student, gradeset, err_msg in iterate_grades_for(course_id, students):
         if gradeset:
             # We were able to successfully grade this student for this course.
-            num_succeeded += 1
             if not header:
                 # Encode the header row in utf-8 encoding in case there are unicode characters
                 header = [section['label'].encode('utf-8') for section in gradeset[u'section_breakdown']]
@@ -542,32 +514,238 @@ def push_grades_to_s3(_xmodule_instance_args, _entry_id, course_id, _task_input,
             rows.append([student.id, student.email, student.username, gradeset['percent']] + row_percents)
         else:
             # An empty gradeset means we failed to grade a student.
-            num_failed += 1
             err_rows.append([student.id, student.username, err_msg])
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    curr_step = "Uploading CSVs"
-    update_task_progress()
+    return rows, err_rows
+
+
+def _grade_report_filenames(report_name):
+    """
+    Return the filenames of the grade report and of its error report for a
+    report whose names start with `report_name`.
+    """
+    return u"{}.csv".format(report_name), u"{}_err.csv".format(report_name)
+
+
+def push_grades_to_s3(shard_task, _xmodule_instance_args, entry_id, course_id, _task_input, action_name):
+    """
+    For a given `course_id`, generate a grades CSV file for all students that
+    are enrolled, and store using a `ReportStore`. Once created, the files can
+    be accessed by instantiating another `ReportStore` (via
+    `ReportStore.from_config()`) and calling `link_for()` on it.
+
+    The enrolled students are split into shards of at most
+    settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK, and a `shard_task` subtask is
+    queued to grade each one (see `push_grade_report_shard`). Each shard writes
+    partial files, which the last subtask to finish stitches into the final
+    report. Partial files are never listed by the `ReportStore`, so any files
+    that are visible in ReportStore will be complete ones.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # If this task gets requeued after its subtasks have already been defined,
+    # don't queue a second set of them.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already been processed for grade report!  InstructorTask = %s",
+                         entry.task_id, entry)
+        return json.loads(entry.task_output)
 
     # Generate parts of the file name
-    timestamp_str = start_time.strftime("%Y-%m-%d-%H%M")
+    timestamp_str = datetime.now(UTC).strftime("%Y-%m-%d-%H%M")
     course_id_prefix = urllib.quote(course_id.to_deprecated_string().replace("/", "_"))
+    report_name = u"{}_grade_report_{}".format(course_id_prefix, timestamp_str)
 
-    # Perform the actual upload
-    report_store = ReportStore.from_config()
-    report_store.store_rows(
-        course_id,
-        u"{}_grade_report_{}.csv".format(course_id_prefix, timestamp_str),
-        rows
-    )
+    enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
+    if not enrolled_students.exists():
+        # There is nothing to shard, so just store the (empty) report directly.
+        report_filename, _ = _grade_report_filenames(report_name)
+        ReportStore.from_config().store_rows(course_id, report_filename, [])
+        return {
+            'action_name': action_name,
+            'attempted': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'total': 0,
+            'duration_ms': 0,
+        }
 
-    # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
-        report_store.store_rows(
-            course_id,
-            u"{}_grade_report_{}_err.csv".format(course_id_prefix, timestamp_str),
-            err_rows
+    # Shards are numbered in the order they are queued, which is also the
+    # order the students are listed in, so that the merged report is too.
+    shard_numbers = count()
+
+    def _create_grade_report_subtask(student_list, initial_subtask_status):
+        """Creates a subtask to grade a shard of the enrolled students."""
+        return shard_task.subtask(
+            (
+                entry_id,
+                report_name,
+                next(shard_numbers),
+                [student['pk'] for student in student_list],
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
         )
 
-    # One last update before we close out...
-    return update_task_progress()
+    TASK_LOG.info(u"Task %s: Preparing to queue subtasks for grade report for course %s", entry.task_id, course_id)
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_grade_report_subtask,
+        enrolled_students,
+        [],
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_QUERY,
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK
+    )
+
+
+def push_grade_report_shard(entry_id, report_name, shard_number, student_ids, subtask_status_dict):
+    """
+    Grade the students with ids in `student_ids` and store their rows as the
+    `shard_number`th partial file of the grade report `report_name`.
+
+    `subtask_status_dict` is the SubtaskStatus for this subtask, as a dict. The
+    subtask that finishes last also merges every shard's partial files into the
+    final report and error report.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+
+    # Check that the requested subtask is actually known to the current InstructorTask entry,
+    # and hasn't already been run.  If this fails, it throws an exception, which should fail
+    # this subtask immediately.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    course_id = entry.course_id
+    num_shards = json.loads(entry.subtasks)['total']
+    report_filename, err_filename = _grade_report_filenames(report_name)
+
+    try:
+        students = User.objects.filter(pk__in=student_ids).order_by('pk')
+        rows, err_rows = _grade_report_rows(course_id, students)
+
+        report_store = ReportStore.from_config()
+        report_store.store_rows(course_id, ReportStore.partial_filename(report_filename, shard_number), rows)
+        report_store.store_rows(course_id, ReportStore.partial_filename(err_filename, shard_number), err_rows)
+    except Exception as exc:
+        TASK_LOG.exception(u"Grade report subtask %s for instructor task %d: failed unexpectedly!",
+                           current_task_id, entry_id)
+        # Put the whole shard in the error report, so that nobody goes missing from both reports
+        _store_failed_grade_report_shard(course_id, report_name, shard_number, student_ids, exc)
+        subtask_status.increment(failed=len(student_ids), state=FAILURE)
+        if update_subtask_status(entry_id, current_task_id, subtask_status):
+            _finish_grade_report(entry_id, course_id, report_name, num_shards)
+        raise
+
+    subtask_status.increment(succeeded=max(len(rows) - 1, 0), failed=len(err_rows), state=SUCCESS)
+    if update_subtask_status(entry_id, current_task_id, subtask_status):
+        _finish_grade_report(entry_id, course_id, report_name, num_shards)
+
+    return subtask_status.to_dict()
+
+
+def _store_failed_grade_report_shard(course_id, report_name, shard_number, student_ids, exc):
+    """
+    Store the partial files of a shard of the grade report `report_name` which
+    failed with the exception `exc`: no rows in the grade report, and an
+    `[id, username, error_msg]` row for each of its students in the error report.
+    """
+    report_filename, err_filename = _grade_report_filenames(report_name)
+    err_msg = u"Grading failed: {}".format(exc)
+    try:
+        usernames = dict(User.objects.filter(pk__in=student_ids).values_list('pk', 'username'))
+    except Exception:  # pylint: disable=broad-except
+        TASK_LOG.exception(u"Could not look up the usernames of the students in a failed grade report shard")
+        usernames = {}
+    err_rows = [[student_id, usernames.get(student_id, u''), err_msg] for student_id in student_ids]
+
+    try:
+        report_store = ReportStore.from_config()
+        # Drop any rows already stored for these students, as they're in the error report now
+        report_store.store_rows(course_id, ReportStore.partial_filename(report_filename, shard_number), [])
+        report_store.store_rows(course_id, ReportStore.partial_filename(err_filename, shard_number), err_rows)
+    except Exception:  # pylint: disable=broad-except
+        TASK_LOG.exception(u"Could not store the error rows of a failed grade report shard")
+
+
+def _finish_grade_report(entry_id, course_id, report_name, num_shards):
+    """
+    Merge the shards of the grade report `report_name`, once the last of them
+    is done and the InstructorTask with id `entry_id` has been marked SUCCESS.
+
+    If the merge fails, the InstructorTask is marked FAILURE instead, and the
+    partial files and anything merged from them are removed.
+    """
+    try:
+        _merge_grade_report_shards(course_id, report_name, num_shards)
+    except Exception as exc:  # pylint: disable=broad-except
+        TASK_LOG.exception(u"Could not merge the shards of the grade report for instructor task %d", entry_id)
+        entry = InstructorTask.objects.get(pk=entry_id)
+        entry.task_output = InstructorTask.create_output_for_failure(exc, traceback.format_exc())
+        entry.task_state = FAILURE
+        entry.save_now()
+
+        report_store = ReportStore.from_config()
+        report_filename, err_filename = _grade_report_filenames(report_name)
+        filenames = [report_filename, err_filename] + [
+            ReportStore.partial_filename(filename, number)
+            for filename in (report_filename, err_filename)
+            for number in range(num_shards)
+        ]
+        for filename in filenames:
+            try:
+                report_store.delete(course_id, filename)
+            except Exception:  # pylint: disable=broad-except
+                TASK_LOG.exception(u"Could not remove %s after failing to merge a grade report", filename)
+
+
+def _merged_grade_rows(report_store, course_id, partial_filenames):
+    """
+    Yield the rows of the grade report partial files named `partial_filenames`
+    in order, under a single header row.
+
+    Shards grade different students, who may not all have the same sections in
+    their gradesets. Rows from a shard whose header differs from the first
+    shard's are rearranged to match it, with 0.0 for any missing sections.
+    """
+    header = None
+    for partial_filename in partial_filenames:
+        partial_rows = report_store.read_rows(course_id, partial_filename)
+        if not partial_rows:
+            continue
+
+        shard_header = partial_rows[0]
+        if header is None:
+            header = shard_header
+            yield header
+
+        for row in partial_rows[1:]:
+            if shard_header == header:
+                yield row
+            else:
+                values = dict(zip(shard_header, row))
+                yield [values.get(label, 0.0) for label in header]
+
+
+def _merge_grade_report_shards(course_id, report_name, num_shards):
+    """
+    Stitch the `num_shards` partial files written by `push_grade_report_shard`
+    into the grade report (and, if anyone couldn't be graded, the error report)
+    for `report_name`, then remove the partial files.
+    """
+    report_store = ReportStore.from_config()
+    report_filename, err_filename = _grade_report_filenames(report_name)
+    report_partials = [ReportStore.partial_filename(report_filename, number) for number in range(num_shards)]
+    err_partials = [ReportStore.partial_filename(err_filename, number) for number in range(num_shards)]
+
+    report_store.store_rows(course_id, report_filename, _merged_grade_rows(report_store, course_id, report_partials))
+
+    # If there are any error rows, write them out as well
+    err_rows = [row for partial in err_partials for row in report_store.read_rows(course_id, partial)]
+    if err_rows:
+        report_store.store_rows(course_id, err_filename, [["id", "username", "error_msg"]] + err_rows)
+
+    for partial in report_partials + err_partials:
+        report_store.delete(course_id, partial)
@@ -0,0 +1,168 @@
+"""
+Tests for the ReportStore classes that store instructor task reports.
+"""
+from cStringIO import StringIO
+from gzip import GzipFile
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from mock import patch
+
+from xmodule.modulestore.locations import SlashSeparatedCourseKey
+
+from instructor_task.models import LocalFSReportStore, S3ReportStore
+
+
+class FakeMultiPartUpload(object):
+    """
+    Stands in for a boto `MultiPartUpload`, recording the parts it is sent.
+    """
+    def __init__(self, bucket, key_name, headers):
+        self.bucket = bucket
+        self.key_name = key_name
+        self.headers = headers
+        self.parts = []
+        self.cancelled = False
+
+    def upload_part_from_file(self, fp, part_num):
+        """Record the contents of the part numbered `part_num`."""
+        assert part_num == len(self.parts) + 1
+        self.parts.append(fp.read())
+
+    def complete_upload(self):
+        """Make the uploaded data visible in the bucket."""
+        self.bucket.contents[self.key_name] = "".join(self.parts)
+
+    def cancel_upload(self):
+        """Discard the uploaded parts."""
+        self.cancelled = True
+
+
+class FakeKey(object):
+    """Stands in for a boto `Key` that has been fetched from a bucket."""
+    def __init__(self, data):
+        self.data = data
+
+    def get_contents_as_string(self):
+        """Return the stored data."""
+        return self.data
+
+
+class FakeBucket(object):
+    """
+    Stands in for the boto `Bucket` used by S3ReportStore, keeping its
+    contents in memory.
+    """
+    def __init__(self):
+        self.contents = {}
+        self.uploads = []
+
+    def initiate_multipart_upload(self, key_name, headers=None):
+        """Start recording a new multipart upload."""
+        upload = FakeMultiPartUpload(self, key_name, headers)
+        self.uploads.append(upload)
+        return upload
+
+    def get_key(self, key_name):
+        """Return a FakeKey for `key_name`, or None if it was never stored."""
+        if key_name not in self.contents:
+            return None
+        return FakeKey(self.contents[key_name])
+
+
+@override_settings(AWS_ACCESS_KEY_ID='access_key', AWS_SECRET_ACCESS_KEY='secret_key')
+class S3ReportStoreTestCase(TestCase):
+    """
+    Test that S3ReportStore streams reports to S3 in parts.
+    """
+    def setUp(self):
+        self.course_id = SlashSeparatedCourseKey('edX', 'report_store', '2014')
+        self.bucket = FakeBucket()
+        with patch('instructor_task.models.S3Connection') as mock_connection:
+            mock_connection.return_value.get_bucket.return_value = self.bucket
+            self.report_store = S3ReportStore('bucket', 'root')
+
+    def _rows(self, num_rows):
+        """Generate `num_rows` rows of csv data."""
+        for number in xrange(num_rows):
+            yield [number, os.urandom(20).encode('hex')]
+
+    def test_store_rows_in_parts(self):
+        with patch.object(S3ReportStore, 'MULTIPART_PART_SIZE', 1024):
+            self.report_store.store_rows(self.course_id, 'report.csv', self._rows(500))
+
+        upload = self.bucket.uploads[0]
+        self.assertFalse(upload.cancelled)
+        self.assertGreater(len(upload.parts), 1)
+        for part in upload.parts[:-1]:
+            self.assertGreaterEqual(len(part), 1024)
+        self.assertEqual(upload.headers['Content-Encoding'], 'gzip')
+
+        data = GzipFile(fileobj=StringIO(self.bucket.contents[upload.key_name])).read()
+        self.assertEqual(len(data.splitlines()), 500)
+
+        rows = self.report_store.read_rows(self.course_id, 'report.csv')
+        self.assertEqual(len(rows), 500)
+        self.assertEqual(rows[499][0], '499')
+
+    def test_store_no_rows(self):
+        self.report_store.store_rows(self.course_id, 'report.csv', [])
+        self.assertEqual(len(self.bucket.uploads[0].parts), 1)
+        self.assertEqual(self.report_store.read_rows(self.course_id, 'report.csv'), [])
+
+    def test_failure_cancels_upload(self):
+        def failing_rows():
+            """Fail after producing a single row."""
+            yield ['a', 'b']
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            self.report_store.store_rows(self.course_id, 'report.csv', failing_rows())
+        self.assertTrue(self.bucket.uploads[0].cancelled)
+        self.assertEqual(self.bucket.contents, {})
+
+    def test_read_missing_file(self):
+        self.assertEqual(self.report_store.read_rows(self.course_id, 'missing.csv'), [])
+
+
+class LocalFSReportStoreTestCase(TestCase):
+    """
+    Test that LocalFSReportStore writes reports incrementally.
+    """
+    def setUp(self):
+        self.course_id = SlashSeparatedCourseKey('edX', 'report_store', '2014')
+        self.root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_path)
+        self.report_store = LocalFSReportStore(self.root_path)
+
+    def test_store_rows_from_generator(self):
+        rows = ([number, 'row {}'.format(number)] for number in xrange(100))
+        self.report_store.store_rows(self.course_id, 'report.csv', rows)
+
+        stored_rows = self.report_store.read_rows(self.course_id, 'report.csv')
+        self.assertEqual(len(stored_rows), 100)
+        self.assertEqual(stored_rows[42], ['42', 'row 42'])
+        self.assertEqual([filename for filename, _ in self.report_store.links_for(self.course_id)], ['report.csv'])
+
+    def test_failure_leaves_no_file(self):
+        def failing_rows():
+            """Fail after producing a single row."""
+            yield ['a', 'b']
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            self.report_store.store_rows(self.course_id, 'report.csv', failing_rows())
+        self.assertEqual(self.report_store.links_for(self.course_id), [])
+        # No temporary files are left behind either, just the course directory
+        self.assertEqual(len(os.listdir(self.root_path)), 1)
+
+    def test_partial_files_not_listed(self):
+        self.report_store.store_rows(self.course_id, 'report.csv', [['a']])
+        self.report_store.store_rows(self.course_id, LocalFSReportStore.partial_filename('report.csv', 3), [['b']])
+        self.assertEqual([filename for filename, _ in self.report_store.links_for(self.course_id)], ['report.csv'])
+
+        self.report_store.delete(self.course_id, 'report.csv')
+        self.assertEqual(self.report_store.links_for(self.course_id), [])
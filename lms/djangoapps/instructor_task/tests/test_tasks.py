@@ -6,12 +6,17 @@ paths actually work.
 
 """
 import json
+import os
+import shutil
+import tempfile
 from uuid import uuid4
 
 from mock import Mock, MagicMock, patch
 
 from celery.states import SUCCESS, FAILURE
 
+from django.test.utils import override_settings
+
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.locations import i4xEncoder
 
@@ -19,10 +24,11 @@ from courseware.models import StudentModule
 from courseware.tests.factories import StudentModuleFactory
 from student.tests.factories import UserFactory, CourseEnrollmentFactory
 
-from instructor_task.models import InstructorTask
-from instructor_task.tests.test_base import InstructorTaskModuleTestCase
+from instructor_task.models import InstructorTask, LocalFSReportStore
+from instructor_task.tests.test_base import InstructorTaskCourseTestCase, InstructorTaskModuleTestCase
 from instructor_task.tests.factories import InstructorTaskFactory
-from instructor_task.tasks import rescore_problem, reset_problem_attempts, delete_problem_state
+from instructor_task.tasks import rescore_problem, reset_problem_attempts, delete_problem_state, calculate_grades_csv
+from instructor_task import tasks_helper
 from instructor_task.tasks_helper import UpdateProblemModuleStateError
 
 PROBLEM_URL_NAME = "test_urlname"
@@ -438,3 +444,131 @@ class TestDeleteStateInstructorTask(TestInstructorTasks):
                 StudentModule.objects.get(course_id=self.course.id,
                                           student=student,
                                           module_state_key=self.location)
+
+
+class TestGradeReportTask(InstructorTaskCourseTestCase):
+    """
+    Tests that grade reports are graded in shards and merged back together.
+    """
+    def setUp(self):
+        super(TestGradeReportTask, self).setUp()
+        self.initialize_course()
+        self.instructor = self.create_instructor('instructor')
+        self.report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.report_dir)
+
+    def _run_grade_report(self):
+        """Run the calculate_grades_csv task, and return its InstructorTask entry."""
+        task_id = str(uuid4())
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            requester=self.instructor,
+            task_input=json.dumps({}),
+            task_key='dummy value',
+            task_id=task_id,
+        )
+        current_task = Mock()
+        current_task.request = Mock()
+        current_task.request.id = task_id
+        grades_download = {'STORAGE_TYPE': 'localfs', 'ROOT_PATH': self.report_dir}
+        with override_settings(GRADES_DOWNLOAD=grades_download,
+                               GRADES_DOWNLOAD_STUDENTS_PER_TASK=2,
+                               GRADES_DOWNLOAD_STUDENTS_PER_QUERY=4):
+            with patch('instructor_task.tasks_helper._get_current_task') as mock_get_task:
+                mock_get_task.return_value = current_task
+                calculate_grades_csv.apply([entry.id, {}], task_id=task_id).get()
+        return InstructorTask.objects.get(id=entry.id)
+
+    def _report_rows(self):
+        """Return the filename and rows of the single report that was stored."""
+        report_store = LocalFSReportStore(self.report_dir)
+        links = report_store.links_for(self.course.id)
+        self.assertEqual(len(links), 1)
+        filename = links[0][0]
+        return filename, report_store.read_rows(self.course.id, filename)
+
+    def test_sharded_report(self):
+        students = [self.create_student('student{}'.format(number)) for number in range(6)]
+        entry = self._run_grade_report()
+
+        self.assertEqual(entry.task_state, SUCCESS)
+        subtasks = json.loads(entry.subtasks)
+        self.assertEqual(subtasks['total'], 4)
+        self.assertEqual(subtasks['succeeded'], 4)
+        task_output = json.loads(entry.task_output)
+        self.assertEqual(task_output['succeeded'], 7)
+        self.assertEqual(task_output['failed'], 0)
+
+        # Every enrolled user shows up once, in order, under a single header
+        _, rows = self._report_rows()
+        self.assertEqual(rows[0][:4], ["id", "email", "username", "grade"])
+        self.assertEqual(
+            [row[2] for row in rows[1:]],
+            ['instructor'] + [student.username for student in students]
+        )
+
+    @patch('instructor_task.tasks_helper.iterate_grades_for')
+    def test_sharded_error_report(self, mock_iterate_grades_for):
+        mock_iterate_grades_for.side_effect = lambda course_id, students: (
+            (student, {}, "Cannot grade {}".format(student.username)) for student in students
+        )
+        for number in range(2):
+            self.create_student('student{}'.format(number))
+        entry = self._run_grade_report()
+
+        task_output = json.loads(entry.task_output)
+        self.assertEqual(task_output['failed'], 3)
+
+        report_store = LocalFSReportStore(self.report_dir)
+        filenames = sorted(filename for filename, _ in report_store.links_for(self.course.id))
+        self.assertEqual(len(filenames), 2)
+        self.assertTrue(filenames[1].endswith('_err.csv'))
+        err_rows = report_store.read_rows(self.course.id, filenames[1])
+        self.assertEqual(err_rows[0], ["id", "username", "error_msg"])
+        self.assertEqual(len(err_rows), 4)
+
+        # The partial files were all cleaned up after being merged
+        self.assertEqual(sorted(os.listdir(report_store.path_to(self.course.id, ''))), filenames)
+
+    def test_failed_shard(self):
+        students = [self.create_student('student{}'.format(number)) for number in range(6)]
+        grade_report_rows = tasks_helper._grade_report_rows  # pylint: disable=protected-access
+
+        def _failing_grade_report_rows(course_id, shard_students):
+            """Fail to grade the shard with student0 in it."""
+            if any(student.username == 'student0' for student in shard_students):
+                raise Exception("Grading is broken")
+            return grade_report_rows(course_id, shard_students)
+
+        with patch('instructor_task.tasks_helper._grade_report_rows', side_effect=_failing_grade_report_rows):
+            entry = self._run_grade_report()
+
+        task_output = json.loads(entry.task_output)
+        self.assertEqual(task_output['succeeded'], 5)
+        self.assertEqual(task_output['failed'], 2)
+
+        # The students of the failed shard are in the error report instead of the grade report
+        report_store = LocalFSReportStore(self.report_dir)
+        filenames = sorted(filename for filename, _ in report_store.links_for(self.course.id))
+        self.assertEqual(len(filenames), 2)
+        rows = report_store.read_rows(self.course.id, filenames[0])
+        self.assertEqual([row[2] for row in rows[1:]], [student.username for student in students[1:]])
+        err_rows = report_store.read_rows(self.course.id, filenames[1])
+        self.assertEqual(
+            [row[:2] for row in err_rows[1:]],
+            [[str(self.instructor.id), 'instructor'], [str(students[0].id), 'student0']]
+        )
+        self.assertIn("Grading is broken", err_rows[1][2])
+
+    def test_failed_merge(self):
+        for number in range(3):
+            self.create_student('student{}'.format(number))
+
+        with patch('instructor_task.tasks_helper._merged_grade_rows', side_effect=Exception("Merging is broken")):
+            entry = self._run_grade_report()
+
+        # The task failed, and left no report or partial files behind
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertEqual(json.loads(entry.task_output)['message'], "Merging is broken")
+        report_store = LocalFSReportStore(self.report_dir)
+        self.assertEqual(os.listdir(report_store.path_to(self.course.id, '')), [])
@@ -49,6 +49,16 @@ def set_commit_id(course, commit_id):
     # def_ms.courses[reload_dir].GIT_COMMIT_ID = new_commit_id
 
 
+def get_course_in_dir(def_ms, course_dir):
+    '''
+    Return the course loaded from course_dir, or None.
+    '''
+    for course in def_ms.get_courses():
+        if course.data_dir == course_dir:
+            return course
+    return None
+
+
 def manage_modulestores(request, reload_dir=None, commit_id=None):
     '''
     Manage the static in-memory modulestores.
@@ -84,12 +94,13 @@ def manage_modulestores(request, reload_dir=None, commit_id=None):
     # reload course if specified; handle optional commit_id
 
     if reload_dir is not None:
-        if reload_dir not in def_ms.courses:
+        course = get_course_in_dir(def_ms, reload_dir)
+        if course is None:
             html += '<h2 class="inline-error">Error: "%s" is not a valid course directory</h2>' % reload_dir
         else:
             # reloading based on commit_id is needed when running mutiple worker threads,
             # so that a given thread doesn't reload the same commit multiple times
-            current_commit_id = get_commit_id(def_ms.courses[reload_dir])
+            current_commit_id = get_commit_id(course)
             log.debug('commit_id="%s"' % commit_id)
             log.debug('current_commit_id="%s"' % current_commit_id)
 
@@ -106,7 +117,7 @@ def manage_modulestores(request, reload_dir=None, commit_id=None):
                 def_ms.try_load_course(reload_dir)
                 gdir = settings.DATA_DIR / reload_dir
                 new_commit_id = os.popen('cd %s; git log -n 1 | head -1' % gdir).read().strip().split(' ')[1]
-                set_commit_id(def_ms.courses[reload_dir], new_commit_id)
+                set_commit_id(get_course_in_dir(def_ms, reload_dir), new_commit_id)
                 html += '<p>commit_id=%s</p>' % new_commit_id
                 track.views.server_track(request, 'reloaded %s now at %s (pid=%s)' % (reload_dir,
                                                                                       new_commit_id,
@@ -116,7 +127,8 @@ def manage_modulestores(request, reload_dir=None, commit_id=None):
 
     html += '<h2>Courses loaded in the modulestore</h2>'
     html += '<ol>'
-    for cdir, course in def_ms.courses.items():
+    for course in def_ms.get_courses():
+        cdir = course.data_dir
         html += '<li><a href="%s/migrate/reload/%s">%s</a> (%s)</li>' % (
             settings.EDX_ROOT_URL,
             escape(cdir),
@@ -130,7 +142,8 @@ def manage_modulestores(request, reload_dir=None, commit_id=None):
     #dumpfields = ['definition', 'location', 'metadata']
     dumpfields = ['location', 'metadata']
 
-    for cdir, course in def_ms.courses.items():
+    for course in def_ms.get_courses():
+        cdir = course.data_dir
         html += '<hr width="100%"/>'
         html += '<h2>Course: %s (%s)</h2>' % (course.display_name_with_default, cdir)
 
@@ -221,7 +234,7 @@ def gitreload(request, reload_dir=None):
 
     if reload_dir is not None:
         def_ms = modulestore()
-        if reload_dir not in def_ms.courses:
+        if get_course_in_dir(def_ms, reload_dir) is None:
             html += '<h2 class="inline-error">Error: "%s" is not a valid course directory</font></h2>' % reload_dir
         else:
             html += "<h2>Reloaded course directory '%s'</h2>" % reload_dir
@@ -210,6 +210,10 @@ FEATURES = {
     # grades CSV files to S3 and give links for downloads.
     'ENABLE_S3_GRADE_DOWNLOADS': False,
 
+    # Persist each student's per-section grading results, so that grading
+    # only recomputes the sections whose scores have changed
+    'ENABLE_GRADE_CACHE': False,
+
     # whether to use password policy enforcement or not
     'ENFORCE_PASSWORD_POLICY': False,
 
@@ -463,10 +467,16 @@ MODULESTORE = {
         'OPTIONS': {
             'data_dir': DATA_DIR,
             'default_class': 'xmodule.hidden_module.HiddenDescriptor',
+            # load each course the first time it's asked for, rather than at startup
+            'lazy': True,
         }
     }
 }
 CONTENTSTORE = None
+
+# Keep copies of large static content (of at least 'min_size' bytes) served from the
+# contentstore in a local directory, e.g. {'directory': '/tmp/static_content'}.
+STATIC_CONTENT_DISK_CACHE = None
 DOC_STORE_CONFIG = {
     'host': 'localhost',
     'db': 'xmodule',
@@ -500,6 +510,14 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Warm sandboxed interpreters for capa's safe_exec.  A size of 0 starts
+    # a fresh interpreter for each execution instead.
+    'worker_pool': {
+        'size': 0,
+        # How many executions each interpreter runs before it's replaced.
+        'max_jobs': 100,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1118,11 +1136,11 @@ BULK_EMAIL_ROUTING_KEY = HIGH_PRIORITY_QUEUE
 # a bulk email message.
 BULK_EMAIL_LOG_SENT_EMAILS = False
 
-# Delay in seconds to sleep between individual mail messages being sent,
-# when a bulk email task is retried for rate-related reasons.  Choose this
-# value depending on the number of workers that might be sending email in
-# parallel, and what the SES rate is.
-BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = 0.02
+# Most individual mail messages to send per second, across all of the workers,
+# once a bulk email task has been retried for rate-related reasons.  Choose
+# this value depending on what the SES rate is.  The workers share the count
+# through the default cache.
+BULK_EMAIL_MAX_SENDS_PER_SECOND = 50
 
 
 ############################## Video ##########################################
@@ -1328,6 +1346,15 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Number of students whose scores are prefetched together when grading a
+# whole course (see courseware.grades.iterate_grades_for)
+GRADES_BATCH_SIZE = 100
+
+# Grade reports are generated by subtasks that each grade at most this many
+# students, fetched from the database this many at a time.
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = 1000
+GRADES_DOWNLOAD_STUDENTS_PER_QUERY = 10000
+
 ######################## PROGRESS SUCCESS BUTTON ##############################
 # The following fields are available in the URL: {course_id} {student_id}
 PROGRESS_SUCCESS_BUTTON_URL = 'http://<domain>/<path>/{course_id}'
@@ -6,3 +6,8 @@ else:
     SERVICE_HOST = 'http://localhost:4567'
 
 PREFIX = SERVICE_HOST + '/api/v1'
+
+# How many connections to the comments service each process keeps open, and
+# how long to wait for it to respond, in seconds
+POOL_SIZE = getattr(settings, "COMMENTS_SERVICE_POOL_SIZE", 10)
+TIMEOUT = getattr(settings, "COMMENTS_SERVICE_TIMEOUT", 5)
@@ -1,14 +1,29 @@
 from contextlib import contextmanager
 from dogapi import dog_stats_api
 import logging
+import os
+import re
+import sys
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 from time import time
+from urlparse import urlparse
 from uuid import uuid4
-from django.utils.translation import get_language
+from django.utils.translation import get_language, override
+
+import settings as cc_settings
 
 log = logging.getLogger(__name__)
 
+# Path segments which are ids of threads, comments or users
+ID_RE = re.compile(r'^([0-9a-f]{24}|\d+)$')
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -50,6 +65,71 @@ def request_timer(request_id, method, url, tags=None):
     )
 
 
+def get_session():
+    """
+    Return this process's requests.Session, which keeps up to
+    COMMENTS_SERVICE_POOL_SIZE connections to the comments service alive
+    between requests. (Processes forked from this one make their own, rather
+    than sharing connections.)
+    """
+    global _session, _session_pid  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=cc_settings.POOL_SIZE,
+                pool_maxsize=cc_settings.POOL_SIZE
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+
+def endpoint(url):
+    """
+    The endpoint of the comments service that `url` is for, e.g.
+    "/api/v1/threads/:id/comments", for tagging metrics.
+    """
+    path = urlparse(url).path
+    return "/".join(":id" if ID_RE.match(segment) else segment for segment in path.split("/"))
+
+
+def perform_concurrently(*functions):
+    """
+    Call each of `functions` (which take no arguments, and make requests to
+    the comments service) at the same time, each but the first in a thread
+    of its own. Returns a list of their results, or raises the exception
+    raised by the first of them to fail, once they've all finished.
+
+    The functions mustn't use the database, as each thread would need a
+    connection of its own.
+    """
+    language = get_language()
+    results = [None] * len(functions)
+    errors = [None] * len(functions)
+
+    def call(index):
+        try:
+            with override(language):
+                results[index] = functions[index]()
+        except Exception:  # pylint: disable=broad-except
+            errors[index] = sys.exc_info()
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(1, len(functions))]
+    for thread in threads:
+        thread.start()
+    if functions:
+        call(0)
+    for thread in threads:
+        thread.join()
+
+    for error in errors:
+        if error is not None:
+            raise error[0], error[1], error[2]
+    return results
+
+
 def perform_request(method, url, data_or_params=None, raw=False,
                     metric_action=None, metric_tags=None, paged_results=False):
 
@@ -57,6 +137,7 @@ def perform_request(method, url, data_or_params=None, raw=False,
         metric_tags = []
 
     metric_tags.append(u'method:{}'.format(method))
+    metric_tags.append(u'endpoint:{}'.format(endpoint(url)))
     if metric_action:
         metric_tags.append(u'action:{}'.format(metric_action))
 
@@ -76,13 +157,13 @@ def perform_request(method, url, data_or_params=None, raw=False,
         data = None
         params = merge_dict(data_or_params, request_id_dict)
     with request_timer(request_id, method, url, metric_tags):
-        response = requests.request(
+        response = get_session().request(
             method,
             url,
             data=data,
             params=params,
             headers=headers,
-            timeout=5
+            timeout=cc_settings.TIMEOUT
         )
 
     metric_tags.append(u'status_code:{}'.format(response.status_code))
@@ -29,6 +29,8 @@ def run():
     if settings.FEATURES.get('ENABLE_THIRD_PARTY_AUTH', False):
         enable_third_party_auth()
 
+    configure_safe_exec_pool()
+
 
 def enable_theme():
     """
@@ -111,3 +113,14 @@ def enable_third_party_auth():
 
     from third_party_auth import settings as auth_settings
     auth_settings.apply_settings(settings.THIRD_PARTY_AUTH, settings)
+
+
+def configure_safe_exec_pool():
+    """
+    Run capa's sandboxed code in a pool of warm interpreters, if the
+    CODE_JAIL setting asks for one.
+    """
+    pool_settings = settings.CODE_JAIL.get('worker_pool', {})
+    if pool_settings.get('size'):
+        from capa.safe_exec import worker_pool
+        worker_pool.configure(**pool_settings)